@@ -5,6 +5,7 @@ from alembic import context
 
 from src.config.settings import settings
 from src.db.data_base import Base
+from src.db import models  # noqa: F401  registers tables on Base.metadata
 
 config = context.config
 fileConfig(config.config_file_name)
@@ -25,6 +26,7 @@ def run_migrations_offline():
 
 
 def run_migrations_online():
+    # migrations run on the sync psycopg2 driver; the app uses asyncpg
     connectable = create_engine(settings.DB_URL, poolclass=pool.NullPool, echo=False)
 
     with connectable.connect() as connection:
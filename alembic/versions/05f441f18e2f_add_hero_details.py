@@ -0,0 +1,40 @@
+"""add hero details
+
+Revision ID: 05f441f18e2f
+Revises: 3b8d0f6c2a71
+Create Date: 2026-10-18 16:41:27.205913
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "05f441f18e2f"
+down_revision: Union[str, None] = "3b8d0f6c2a71"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # a table of its own, not a column of `heroes`: filling in details is then
+    # not a write to `heroes`, which would flush every hero list cache and run
+    # the stats summary triggers for nothing
+    op.create_table(
+        "hero_sections",
+        sa.Column(
+            "hero_id",
+            sa.Integer,
+            sa.ForeignKey("heroes.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("sections", postgresql.JSONB, nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("hero_sections")
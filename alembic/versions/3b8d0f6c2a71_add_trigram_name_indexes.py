@@ -0,0 +1,47 @@
+"""add trigram name indexes
+
+Revision ID: 3b8d0f6c2a71
+Revises: ea9eeaab030b
+Create Date: 2026-10-18 14:02:11.384512
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3b8d0f6c2a71"
+down_revision: Union[str, None] = "ea9eeaab030b"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = ("name", "full_name")
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # built CONCURRENTLY so large tables stay writable during the migration
+    with op.get_context().autocommit_block():
+        for column in COLUMNS:
+            op.create_index(
+                f"ix_heroes_{column}_trgm",
+                "heroes",
+                [column],
+                postgresql_using="gin",
+                postgresql_ops={column: "gin_trgm_ops"},
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for column in COLUMNS:
+            op.drop_index(
+                f"ix_heroes_{column}_trgm",
+                table_name="heroes",
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
@@ -0,0 +1,42 @@
+"""add upstream id and sync checkpoints
+
+Revision ID: 58669ba6ed7b
+Revises: 6f74f3ff68cd
+Create Date: 2026-10-18 11:20:04.118512
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "58669ba6ed7b"
+down_revision: Union[str, None] = "6f74f3ff68cd"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("heroes", sa.Column("upstream_id", sa.Integer, nullable=True))
+    op.create_index("ix_heroes_upstream_id", "heroes", ["upstream_id"])
+
+    op.create_table(
+        "sync_checkpoints",
+        sa.Column("job", sa.String, primary_key=True),
+        sa.Column("last_id", sa.Integer, nullable=False, server_default="0"),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.func.now(),
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("sync_checkpoints")
+    op.drop_index("ix_heroes_upstream_id", table_name="heroes")
+    op.drop_column("heroes", "upstream_id")
@@ -0,0 +1,49 @@
+"""add heroes version
+
+Revision ID: 9d2b7c4e1a53
+Revises: 05f441f18e2f
+Create Date: 2026-10-18 21:07:44.518230
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9d2b7c4e1a53"
+down_revision: Union[str, None] = "05f441f18e2f"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# A sequence rather than a counter row: nextval() takes no row lock, so
+# concurrent writers never queue on it. It is not rolled back either, and a
+# statement that changed no rows still bumps it; both only cost a cache miss.
+BUMP_FUNCTION = """
+CREATE FUNCTION heroes_version_bump() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM nextval('heroes_version');
+    RETURN NULL;
+END;
+$$
+"""
+
+
+def upgrade() -> None:
+    op.execute("CREATE SEQUENCE heroes_version")
+    # called once, so last_value moves with the first write
+    op.execute("SELECT nextval('heroes_version')")
+    op.execute(BUMP_FUNCTION)
+    op.execute(
+        "CREATE TRIGGER heroes_version_bump "
+        "AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON heroes "
+        "FOR EACH STATEMENT EXECUTE FUNCTION heroes_version_bump()"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER heroes_version_bump ON heroes")
+    op.execute("DROP FUNCTION heroes_version_bump()")
+    op.execute("DROP SEQUENCE heroes_version")
@@ -0,0 +1,93 @@
+"""count non-null powerstats in hero stats summary
+
+Revision ID: b6e1f09a7c32
+Revises: 9d2b7c4e1a53
+Create Date: 2026-10-18 21:42:19.803114
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b6e1f09a7c32"
+down_revision: Union[str, None] = "9d2b7c4e1a53"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+POWERSTATS = ("intelligence", "strength", "speed", "power")
+SUMS = [f"sum_{stat}" for stat in POWERSTATS]
+# non-NULL values per stat, so averages ignore NULLs like avg() does
+COUNTS = [f"count_{stat}" for stat in POWERSTATS]
+
+
+def _apply_function(columns):
+    """hero_stats_summary_apply() of ea9eeaab030b, maintaining `columns` too."""
+    aggregates = {
+        "hero_count": "count(*)",
+        **{f"sum_{stat}": f"coalesce(sum({stat}), 0)" for stat in POWERSTATS},
+        **{f"count_{stat}": f"count({stat})" for stat in POWERSTATS},
+    }
+    columns = ["hero_count", *columns]
+    grouped = f"""
+        SELECT coalesce(publisher, '') AS publisher,
+               coalesce(alignment, '') AS alignment,
+               {", ".join(f"{aggregates[c]} AS {c}" for c in columns)}
+        FROM {{rows}}
+        GROUP BY 1, 2
+    """
+    return f"""
+CREATE OR REPLACE FUNCTION hero_stats_summary_apply() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO hero_stats_summary AS s (publisher, alignment, {", ".join(columns)})
+        {grouped.format(rows="new_rows")}
+        ON CONFLICT (publisher, alignment) DO UPDATE SET
+            {", ".join(f"{c} = s.{c} + excluded.{c}" for c in columns)};
+    END IF;
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        UPDATE hero_stats_summary AS s SET
+            {", ".join(f"{c} = s.{c} - d.{c}" for c in columns)}
+        FROM ({grouped.format(rows="old_rows")}) AS d
+        WHERE s.publisher = d.publisher AND s.alignment = d.alignment;
+        DELETE FROM hero_stats_summary WHERE hero_count <= 0;
+    END IF;
+    RETURN NULL;
+END;
+$$
+"""
+
+
+def upgrade() -> None:
+    for column in COUNTS:
+        op.add_column(
+            "hero_stats_summary",
+            sa.Column(column, sa.BigInteger, nullable=False, server_default="0"),
+        )
+    # the ALTERs hold the table's lock until commit, so no trigger runs between
+    # the backfill and the new function
+    op.execute(
+        f"""
+        UPDATE hero_stats_summary AS s SET
+            {", ".join(f"{c} = h.{c}" for c in COUNTS)}
+        FROM (
+            SELECT coalesce(publisher, '') AS publisher,
+                   coalesce(alignment, '') AS alignment,
+                   {", ".join(f"count({stat}) AS count_{stat}" for stat in POWERSTATS)}
+            FROM heroes
+            GROUP BY 1, 2
+        ) AS h
+        WHERE s.publisher = h.publisher AND s.alignment = h.alignment
+        """
+    )
+    op.execute(_apply_function(SUMS + COUNTS))
+
+
+def downgrade() -> None:
+    op.execute(_apply_function(SUMS))
+    for column in COUNTS:
+        op.drop_column("hero_stats_summary", column)
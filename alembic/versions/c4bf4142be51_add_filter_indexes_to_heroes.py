@@ -0,0 +1,58 @@
+"""add filter indexes to heroes
+
+Revision ID: c4bf4142be51
+Revises: 58669ba6ed7b
+Create Date: 2026-10-18 11:31:47.520934
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c4bf4142be51"
+down_revision: Union[str, None] = "58669ba6ed7b"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+POWERSTATS = ("intelligence", "strength", "speed", "power")
+
+
+def upgrade() -> None:
+    # built CONCURRENTLY so large tables stay writable during the migration
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_heroes_lower_name",
+            "heroes",
+            [sa.text("lower(name)")],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        for column in POWERSTATS:
+            op.create_index(
+                f"ix_heroes_{column}",
+                "heroes",
+                [column],
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for column in POWERSTATS:
+            op.drop_index(
+                f"ix_heroes_{column}",
+                table_name="heroes",
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
+        op.drop_index(
+            "ix_heroes_lower_name",
+            table_name="heroes",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,91 @@
+"""add hero stats summary
+
+Revision ID: ea9eeaab030b
+Revises: c4bf4142be51
+Create Date: 2026-10-18 11:52:10.402617
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "ea9eeaab030b"
+down_revision: Union[str, None] = "c4bf4142be51"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+POWERSTATS = ("intelligence", "strength", "speed", "power")
+
+SUMS = ", ".join(f"sum_{stat}" for stat in POWERSTATS)
+GROUPED = f"""
+    SELECT coalesce(publisher, '') AS publisher,
+           coalesce(alignment, '') AS alignment,
+           count(*) AS hero_count,
+           {", ".join(f"coalesce(sum({stat}), 0) AS sum_{stat}" for stat in POWERSTATS)}
+    FROM {{rows}}
+    GROUP BY 1, 2
+"""
+
+# Statement-level triggers with transition tables, so a multi-row INSERT from
+# the bulk import or the catalog sync updates the summary once per statement.
+APPLY_FUNCTION = f"""
+CREATE FUNCTION hero_stats_summary_apply() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO hero_stats_summary AS s (publisher, alignment, hero_count, {SUMS})
+        {GROUPED.format(rows="new_rows")}
+        ON CONFLICT (publisher, alignment) DO UPDATE SET
+            hero_count = s.hero_count + excluded.hero_count,
+            {", ".join(f"sum_{stat} = s.sum_{stat} + excluded.sum_{stat}" for stat in POWERSTATS)};
+    END IF;
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        UPDATE hero_stats_summary AS s SET
+            hero_count = s.hero_count - d.hero_count,
+            {", ".join(f"sum_{stat} = s.sum_{stat} - d.sum_{stat}" for stat in POWERSTATS)}
+        FROM ({GROUPED.format(rows="old_rows")}) AS d
+        WHERE s.publisher = d.publisher AND s.alignment = d.alignment;
+        DELETE FROM hero_stats_summary WHERE hero_count <= 0;
+    END IF;
+    RETURN NULL;
+END;
+$$
+"""
+
+TRIGGERS = {
+    "INSERT": "REFERENCING NEW TABLE AS new_rows",
+    "UPDATE": "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows",
+    "DELETE": "REFERENCING OLD TABLE AS old_rows",
+}
+
+
+def upgrade() -> None:
+    op.create_table(
+        "hero_stats_summary",
+        sa.Column("publisher", sa.String, primary_key=True),
+        sa.Column("alignment", sa.String, primary_key=True),
+        sa.Column("hero_count", sa.BigInteger, nullable=False),
+        *(sa.Column(f"sum_{stat}", sa.Float, nullable=False) for stat in POWERSTATS),
+    )
+    op.execute(
+        f"INSERT INTO hero_stats_summary (publisher, alignment, hero_count, {SUMS}) "
+        + GROUPED.format(rows="heroes")
+    )
+    op.execute(APPLY_FUNCTION)
+    for event, referencing in TRIGGERS.items():
+        op.execute(
+            f"CREATE TRIGGER heroes_stats_summary_{event.lower()} "
+            f"AFTER {event} ON heroes {referencing} "
+            "FOR EACH STATEMENT EXECUTE FUNCTION hero_stats_summary_apply()"
+        )
+
+
+def downgrade() -> None:
+    for event in TRIGGERS:
+        op.execute(f"DROP TRIGGER heroes_stats_summary_{event.lower()} ON heroes")
+    op.execute("DROP FUNCTION hero_stats_summary_apply()")
+    op.drop_table("hero_stats_summary")
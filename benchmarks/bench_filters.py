@@ -0,0 +1,92 @@
+"""
+Benchmark for the filter engine in src/app/_filters.py.
+
+Times parsing/validation, plan compilation with a cold and a warm plan
+cache, and rendering the final SELECT, for a few representative filters.
+Pure Python, no database needed.
+
+    python -m benchmarks.bench_filters --repeat 20000 --json filters.json
+"""
+
+import json
+import time
+import statistics
+import typing as t
+from pathlib import Path
+
+import typer
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from src.db.models import Hero
+from src.app._filters import compile_filter, parse_filters
+
+
+FILTERS: t.Dict[str, dict] = {
+    "single_range": {"power": {"gte": 90}},
+    "four_stats": {
+        "intelligence": {"gte": 50},
+        "strength": {"lte": 80},
+        "speed": {"between": [20, 70]},
+        "power": {"gt": 60},
+    },
+    "nested_groups": {
+        "or": [
+            {"publisher": {"in": ["Marvel Comics", "DC Comics"]}},
+            {"and": [{"name": {"prefix": "Bat"}}, {"power": {"gte": 50}}]},
+        ],
+        "not": {"alignment": {"eq": "bad"}},
+    },
+}
+
+
+def _time(fn: t.Callable[[], t.Any], repeat: int) -> t.Dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1_000_000)
+    return {
+        "p50_us": round(statistics.median(timings), 2),
+        "mean_us": round(statistics.fmean(timings), 2),
+    }
+
+
+def _measure(raw: str, repeat: int) -> t.Dict[str, dict]:
+    tree = parse_filters(raw)
+    dialect = postgresql.dialect()
+
+    def cold():
+        compile_filter.cache_clear()
+        compile_filter(tree)
+
+    def render():
+        select(Hero).filter(compile_filter(tree)).compile(dialect=dialect)
+
+    return {
+        "parse": _time(lambda: parse_filters(raw), repeat),
+        "compile_cold": _time(cold, repeat),
+        "compile_cached": _time(lambda: compile_filter(tree), repeat),
+        "render_select": _time(render, repeat),
+    }
+
+
+def main(
+    repeat: int = typer.Option(20_000, help="Timed runs per measurement"),
+    json_path: t.Optional[Path] = typer.Option(None, "--json", help="Write results"),
+):
+    results = {}
+    for label, filters in FILTERS.items():
+        results[label] = _measure(json.dumps(filters), repeat)
+        typer.echo(f"\n-- {label}")
+        for stage, timing in results[label].items():
+            typer.echo(
+                f"{stage:>16}: p50 {timing['p50_us']} us, mean {timing['mean_us']} us"
+            )
+
+    if json_path:
+        json_path.write_text(json.dumps({"repeat": repeat, **results}, indent=2))
+
+
+if __name__ == "__main__":
+    typer.run(main)
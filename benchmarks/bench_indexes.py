@@ -0,0 +1,160 @@
+"""
+Benchmark for the indexes added in revision c4bf4142be51.
+
+Seeds a scratch copy of ``heroes`` in a ``bench`` schema, runs the filter
+paths used by get_heroes/create_hero without and then with the indexes,
+and prints EXPLAIN ANALYZE plans and latency for both. Needs a Postgres
+reachable through the usual DB_* settings.
+
+    python -m benchmarks.bench_indexes --rows 1000000 --json indexes.json
+"""
+
+import json
+import time
+import statistics
+import typing as t
+from pathlib import Path
+
+import typer
+from sqlalchemy import create_engine, text
+
+from src.config.settings import settings
+
+
+SCHEMA = "bench"
+
+CREATE_TABLE = f"""
+CREATE TABLE {SCHEMA}.heroes (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR NOT NULL UNIQUE,
+    intelligence FLOAT,
+    strength FLOAT,
+    speed FLOAT,
+    power FLOAT,
+    full_name VARCHAR,
+    publisher VARCHAR,
+    alignment VARCHAR,
+    image_url VARCHAR
+)
+"""
+
+SEED = f"""
+INSERT INTO {SCHEMA}.heroes
+    (name, intelligence, strength, speed, power, full_name, publisher, alignment, image_url)
+SELECT
+    'Hero ' || g,
+    floor(random() * 101),
+    floor(random() * 101),
+    floor(random() * 101),
+    floor(random() * 101),
+    'Full Name ' || g,
+    (ARRAY['Marvel Comics', 'DC Comics', 'Dark Horse Comics', 'Image Comics'])[1 + g % 4],
+    (ARRAY['good', 'bad', 'neutral'])[1 + g % 3],
+    'https://example.com/' || g || '.jpg'
+FROM generate_series(1, :rows) AS g
+"""
+
+# same definitions as the migration, on the scratch table
+INDEXES = [
+    f"CREATE INDEX ix_bench_lower_name ON {SCHEMA}.heroes (lower(name))",
+    f"CREATE INDEX ix_bench_intelligence ON {SCHEMA}.heroes (intelligence)",
+    f"CREATE INDEX ix_bench_strength ON {SCHEMA}.heroes (strength)",
+    f"CREATE INDEX ix_bench_speed ON {SCHEMA}.heroes (speed)",
+    f"CREATE INDEX ix_bench_power ON {SCHEMA}.heroes (power)",
+]
+
+QUERIES: t.Dict[str, t.Tuple[str, dict]] = {
+    "name_lower_eq": (
+        f"SELECT * FROM {SCHEMA}.heroes WHERE lower(name) = lower(:name) LIMIT 1",
+        {"name": "HERO 424242"},
+    ),
+    "power_gte": (
+        f"SELECT * FROM {SCHEMA}.heroes WHERE power >= :power",
+        {"power": 100},
+    ),
+    "intelligence_range": (
+        f"SELECT * FROM {SCHEMA}.heroes "
+        "WHERE intelligence >= :low AND intelligence <= :high",
+        {"low": 40, "high": 40},
+    ),
+    "power_and_speed": (
+        f"SELECT * FROM {SCHEMA}.heroes WHERE power >= :power AND speed <= :speed",
+        {"power": 95, "speed": 5},
+    ),
+}
+
+
+def _measure(conn, repeat: int) -> t.Dict[str, dict]:
+    results = {}
+    for label, (sql, params) in QUERIES.items():
+        plan = conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"), params).scalars()
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            conn.execute(text(sql), params).all()
+            timings.append((time.perf_counter() - started) * 1000)
+        results[label] = {
+            "plan": "\n".join(plan),
+            "p50_ms": round(statistics.median(timings), 3),
+            "mean_ms": round(statistics.fmean(timings), 3),
+            "max_ms": round(max(timings), 3),
+        }
+    return results
+
+
+def _report(title: str, results: t.Dict[str, dict]) -> None:
+    typer.echo(f"\n=== {title} ===")
+    for label, result in results.items():
+        typer.echo(
+            f"\n-- {label}: p50 {result['p50_ms']} ms, "
+            f"mean {result['mean_ms']} ms, max {result['max_ms']} ms"
+        )
+        typer.echo(result["plan"])
+
+
+def main(
+    rows: int = typer.Option(1_000_000, help="Rows to seed"),
+    repeat: int = typer.Option(20, help="Timed runs per query"),
+    json_path: t.Optional[Path] = typer.Option(None, "--json", help="Write results"),
+    keep: bool = typer.Option(False, help="Keep the bench schema afterwards"),
+):
+    engine = create_engine(settings.DB_URL)
+    with engine.connect() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        conn.execute(text(CREATE_TABLE))
+        typer.echo(f"Seeding {rows} rows...")
+        conn.execute(text(SEED), {"rows": rows})
+        conn.execute(text(f"ANALYZE {SCHEMA}.heroes"))
+        conn.commit()
+
+        try:
+            before = _measure(conn, repeat)
+            _report("without indexes", before)
+
+            for statement in INDEXES:
+                conn.execute(text(statement))
+            conn.execute(text(f"ANALYZE {SCHEMA}.heroes"))
+            conn.commit()
+
+            after = _measure(conn, repeat)
+            _report("with indexes", after)
+        finally:
+            if not keep:
+                conn.rollback()
+                conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+                conn.commit()
+
+    typer.echo("\n=== summary (p50 ms) ===")
+    for label in QUERIES:
+        typer.echo(
+            f"{label:>20}: {before[label]['p50_ms']:>10} -> {after[label]['p50_ms']}"
+        )
+    if json_path:
+        json_path.write_text(
+            json.dumps({"rows": rows, "before": before, "after": after}, indent=2)
+        )
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,369 @@
+"""
+Load test for the HTTP API against a local fake superheroapi.com.
+
+Seeds ``heroes`` with synthetic rows, serves a generated upstream catalog
+(tests/fake_upstream.py) with configurable latency and error rate, and drives
+each scenario at several concurrency levels. Reports requests/s, p50/p95/p99
+latency, status codes and memory per run, and writes JSON that ``compare``
+diffs between commits.
+
+    python -m benchmarks.bench_load seed --rows 100000
+    python -m benchmarks.bench_load run --concurrency 1,16,64 --json head.json
+    python -m benchmarks.bench_load compare base.json head.json
+
+By default the app runs in this process behind httpx's ASGI transport, with
+API_HERO pointed at the fake. With ``--url`` a running server is driven
+instead: start it with API_HERO set to the address printed by
+``python -m benchmarks.bench_load fake-upstream`` and pass its ``--pid`` to
+report its memory. The upstream rate limiter applies as configured; set
+API_RATE_LIMIT=0 to measure without it.
+"""
+
+import os
+import json
+import time
+import random
+import asyncio
+import platform
+import statistics
+import subprocess
+import typing as t
+from pathlib import Path
+from collections import Counter
+from datetime import datetime, timezone
+
+import httpx
+import typer
+from sqlalchemy import create_engine, text
+
+from src.config.settings import settings
+from tests.fake_upstream import FakeUpstream, character
+
+
+app = typer.Typer(add_completion=False)
+
+SEED = """
+INSERT INTO heroes (
+    name, intelligence, strength, speed, power,
+    full_name, publisher, alignment, image_url, upstream_id
+)
+SELECT
+    'Bench Hero ' || g,
+    floor(random() * 101),
+    floor(random() * 101),
+    floor(random() * 101),
+    floor(random() * 101),
+    'Full Name ' || g,
+    (ARRAY['Marvel Comics', 'DC Comics', 'Dark Horse Comics', 'Image Comics'])[1 + g % 4],
+    (ARRAY['good', 'bad', 'neutral'])[1 + g % 3],
+    'https://example.com/' || g || '.jpg',
+    g
+FROM generate_series(1, :rows) AS g
+ON CONFLICT (name) DO NOTHING
+"""
+
+# heroes created through POST /hero during a run, removed before each run
+CREATED = "Load Hero %"
+
+PUBLISHERS = ["Marvel Comics", "DC Comics", "Dark Horse Comics", "Image Comics"]
+
+FILTERS: t.List[t.Callable[[random.Random], dict]] = [
+    lambda rng: {"power": {"gte": rng.randint(80, 100)}},
+    lambda rng: {
+        "intelligence": {"between": sorted([rng.randint(0, 100), rng.randint(0, 100)])}
+    },
+    lambda rng: {
+        "or": [
+            {"publisher": {"eq": rng.choice(PUBLISHERS)}},
+            {"speed": {"gte": rng.randint(90, 100)}},
+        ]
+    },
+    lambda rng: {"name": {"prefix": f"Bench Hero {rng.randint(1, 999)}"}},
+    lambda rng: {"not": {"strength": {"lt": rng.randint(0, 100)}}},
+]
+
+Send = t.Callable[[httpx.AsyncClient, random.Random], t.Awaitable[httpx.Response]]
+
+
+def _catalog(size: int) -> t.List[dict]:
+    # zero-padded so a search for one name does not substring-match others
+    return [character(i, f"Load Hero {i:06d}", 30 + i % 70) for i in range(1, size + 1)]
+
+
+def _scenarios(catalog_size: int) -> t.Dict[str, Send]:
+    created = iter(range(1, catalog_size + 1))
+
+    async def create(client, rng):
+        number = next(created, None) or rng.randint(1, catalog_size)
+        return await client.post("/hero", json={"name": f"Load Hero {number:06d}"})
+
+    async def list_heroes(client, rng):
+        params = {"filters": json.dumps(rng.choice(FILTERS)(rng)), "limit": 50}
+        return await client.get("/hero/", params=params)
+
+    async def search(client, rng):
+        return await client.get(
+            "/hero/search", params={"q": f"bench {rng.randint(1, 999)}"}
+        )
+
+    async def mixed(client, rng):
+        send = rng.choices([list_heroes, search, create], weights=[80, 15, 5])[0]
+        return await send(client, rng)
+
+    return {"create": create, "list": list_heroes, "search": search, "mixed": mixed}
+
+
+def _memory_mb(pid: t.Optional[int]) -> t.Dict[str, t.Optional[float]]:
+    """Current and peak RSS of a process, from /proc (Linux only)."""
+    memory = {"rss_mb": None, "peak_rss_mb": None}
+    if pid is None:
+        return memory
+    try:
+        status = Path(f"/proc/{pid}/status").read_text().splitlines()
+    except OSError:
+        return memory
+    for line in status:
+        key, _, value = line.partition(":")
+        if key in ("VmRSS", "VmHWM"):
+            name = "rss_mb" if key == "VmRSS" else "peak_rss_mb"
+            memory[name] = round(int(value.split()[0]) / 1024, 1)
+    return memory
+
+
+def _summary(latencies: t.List[float], elapsed: float) -> t.Dict[str, float]:
+    if len(latencies) < 2:
+        latencies = latencies * 2 or [0.0, 0.0]
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(cuts[49], 3),
+        "p95_ms": round(cuts[94], 3),
+        "p99_ms": round(cuts[98], 3),
+        "max_ms": round(max(latencies), 3),
+    }
+
+
+async def _drive(
+    client: httpx.AsyncClient, send: Send, concurrency: int, duration: float
+) -> dict:
+    latencies: t.List[float] = []
+    statuses: t.Counter[str] = Counter()
+    deadline = time.perf_counter() + duration
+
+    async def worker(seed: int):
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                status = str((await send(client, rng)).status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[status] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(seed) for seed in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    errors = sum(n for s, n in statuses.items() if not s.isdigit() or int(s) >= 500)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": dict(sorted(statuses.items())),
+        **_summary(latencies, elapsed),
+    }
+
+
+def _reset(engine, in_process: bool) -> None:
+    """Starts every run from the same state: no created heroes, cold caches."""
+    with engine.begin() as conn:
+        conn.execute(
+            text("DELETE FROM heroes WHERE name LIKE :name"), {"name": CREATED}
+        )
+    if in_process:
+        from src.app._cache import hero_list_cache, upstream_cache
+        from src.app._columnar import hero_index
+
+        hero_list_cache.clear()
+        upstream_cache.clear()
+        hero_index.clear()
+
+
+def _commit() -> t.Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def _run(
+    scenarios: t.List[str],
+    levels: t.List[int],
+    duration: float,
+    warmup: float,
+    catalog_size: int,
+    latency: float,
+    error_rate: float,
+    url: t.Optional[str],
+    pid: t.Optional[int],
+) -> t.List[dict]:
+    engine = create_engine(settings.DB_URL)
+    results = []
+    async with FakeUpstream(_catalog(catalog_size), latency, error_rate) as fake:
+        if url is None:
+            from main import app as asgi_app
+            from src.app._upstream import close_upstream_client
+
+            settings.API_HERO = fake.url
+            transport = httpx.ASGITransport(app=asgi_app)
+            client = httpx.AsyncClient(transport=transport, base_url="http://bench")
+            pid = os.getpid()
+        else:
+            client = httpx.AsyncClient(base_url=url, timeout=30)
+
+        try:
+            for name in scenarios:
+                for concurrency in levels:
+                    _reset(engine, in_process=url is None)
+                    send = _scenarios(catalog_size)[name]
+                    if warmup:
+                        await _drive(client, send, concurrency, warmup)
+                    upstream_before = fake.requests
+                    result = await _drive(client, send, concurrency, duration)
+                    result = {
+                        "scenario": name,
+                        "concurrency": concurrency,
+                        **result,
+                        "upstream_requests": fake.requests - upstream_before,
+                        **_memory_mb(pid),
+                    }
+                    typer.echo(
+                        f"{name:>8} c={concurrency:<4} {result['rps']:>9} req/s  "
+                        f"p50 {result['p50_ms']:>8} ms  p95 {result['p95_ms']:>8} ms  "
+                        f"p99 {result['p99_ms']:>8} ms  errors {result['errors']}  "
+                        f"rss {result['rss_mb']} MB"
+                    )
+                    results.append(result)
+        finally:
+            _reset(engine, in_process=url is None)
+            await client.aclose()
+            if url is None:
+                await close_upstream_client()
+    return results
+
+
+@app.command()
+def seed(
+    rows: int = typer.Option(100_000, help="Heroes to insert"),
+    remove: bool = typer.Option(False, help="Delete seeded heroes instead"),
+):
+    """Inserts synthetic 'Bench Hero N' rows into heroes (or removes them)."""
+    engine = create_engine(settings.DB_URL)
+    with engine.begin() as conn:
+        if remove:
+            conn.execute(text("DELETE FROM heroes WHERE name LIKE 'Bench Hero %'"))
+            return
+        typer.echo(f"Seeding {rows} rows...")
+        conn.execute(text(SEED), {"rows": rows})
+        conn.execute(text("ANALYZE heroes"))
+
+
+@app.command("fake-upstream")
+def fake_upstream(
+    port: int = typer.Option(9000, help="Port to listen on"),
+    catalog: int = typer.Option(5000, help="Characters in the catalog"),
+    latency: float = typer.Option(0.05, help="Seconds added to every response"),
+    error_rate: float = typer.Option(0.0, help="Fraction of responses that are 503"),
+):
+    """Serves the fake superheroapi.com until interrupted."""
+
+    async def serve():
+        async with FakeUpstream(_catalog(catalog), latency, error_rate, port) as fake:
+            typer.echo(f"Fake upstream on {fake.url}, set API_HERO to it")
+            await asyncio.Event().wait()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+@app.command()
+def run(
+    scenario: t.List[str] = typer.Option(
+        ["create", "list", "search", "mixed"], help="Scenarios to run, repeatable"
+    ),
+    concurrency: str = typer.Option("1,8,32", help="Comma-separated levels"),
+    duration: float = typer.Option(10.0, help="Seconds per scenario and level"),
+    warmup: float = typer.Option(2.0, help="Untimed seconds before each run"),
+    catalog: int = typer.Option(5000, help="Characters in the fake upstream"),
+    latency: float = typer.Option(0.05, help="Fake upstream latency in seconds"),
+    error_rate: float = typer.Option(0.0, help="Fake upstream 503 rate"),
+    url: t.Optional[str] = typer.Option(None, help="Drive a running server instead"),
+    pid: t.Optional[int] = typer.Option(None, help="Server pid, to report memory"),
+    json_path: t.Optional[Path] = typer.Option(None, "--json", help="Write results"),
+):
+    """Drives the scenarios and reports throughput, latency and memory."""
+    known = _scenarios(catalog)
+    unknown = [name for name in scenario if name not in known]
+    if unknown:
+        raise typer.BadParameter(f"unknown scenario(s): {', '.join(unknown)}")
+    levels = [int(level) for level in concurrency.split(",")]
+
+    results = asyncio.run(
+        _run(scenario, levels, duration, warmup, catalog, latency, error_rate, url, pid)
+    )
+    if json_path:
+        meta = {
+            "commit": _commit(),
+            "date": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "target": url or "in-process",
+            "duration": duration,
+            "upstream_latency": latency,
+            "upstream_error_rate": error_rate,
+        }
+        json_path.write_text(json.dumps({"meta": meta, "results": results}, indent=2))
+
+
+@app.command()
+def compare(
+    base: Path = typer.Argument(..., help="Results of the baseline commit"),
+    head: Path = typer.Argument(..., help="Results to check"),
+    threshold: float = typer.Option(10.0, help="Allowed regression in percent"),
+):
+    """Diffs two result files; exits 1 if p95 or req/s regressed past threshold."""
+    before = {
+        (r["scenario"], r["concurrency"]): r
+        for r in json.loads(base.read_text())["results"]
+    }
+    regressed = False
+    for result in json.loads(head.read_text())["results"]:
+        old = before.get((result["scenario"], result["concurrency"]))
+        if old is None:
+            continue
+        rps = (result["rps"] - old["rps"]) / old["rps"] * 100 if old["rps"] else 0.0
+        p95 = (
+            (result["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100
+            if old["p95_ms"]
+            else 0.0
+        )
+        flag = ""
+        if rps < -threshold or p95 > threshold:
+            regressed = True
+            flag = "  REGRESSED"
+        typer.echo(
+            f"{result['scenario']:>8} c={result['concurrency']:<4} "
+            f"req/s {old['rps']} -> {result['rps']} ({rps:+.1f}%)  "
+            f"p95 {old['p95_ms']} -> {result['p95_ms']} ms ({p95:+.1f}%){flag}"
+        )
+    raise typer.Exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,100 @@
+"""
+Benchmark for POST /hero/matchups: scoring every pair of two hero sets.
+
+Builds a HeroColumns snapshot of synthetic heroes, takes two disjoint sets
+of ``n`` heroes per size and times the top-N path, scoring the full matrix,
+and streaming it as NDJSON the way the endpoint does. With ``--naive`` the
+client-side Python double loop is timed as the baseline.
+
+    python -m benchmarks.bench_matchups --sizes 1000,3000,5000 --naive
+"""
+
+import json
+import math
+import typing as t
+from pathlib import Path
+
+import typer
+
+from src.config.settings import settings
+from src.app._columnar import POWERSTATS, HeroColumns
+from src.app._matchups import score_blocks, top_matchups, weight_vector
+from src.app.routers import _matchup_matrix
+from benchmarks.bench_read_engine import _rows, _time
+
+WEIGHTS = {"intelligence": 1.0, "strength": 2.0, "speed": 1.0, "power": 1.0}
+
+
+def _naive(left: t.List[dict], right: t.List[dict], top: int) -> t.List[tuple]:
+    """What clients do today: score every pair in a Python double loop."""
+    total = sum(WEIGHTS.values())
+    scores = [
+        (
+            sum(
+                WEIGHTS[stat]
+                / total
+                / (1 + math.exp(-(a[stat] - b[stat]) / settings.MATCHUP_SCALE))
+                for stat in POWERSTATS
+            ),
+            a["id"],
+            b["id"],
+        )
+        for a in left
+        for b in right
+    ]
+    return sorted(scores, reverse=True)[:top]
+
+
+def main(
+    sizes: str = typer.Option("1000,3000,5000", help="Comma-separated set sizes"),
+    top: int = typer.Option(100, help="Pairs returned by the top-N path"),
+    repeat: int = typer.Option(10, help="Timed runs per measurement"),
+    naive: bool = typer.Option(False, help="Also time a Python double loop"),
+    json_path: t.Optional[Path] = typer.Option(None, "--json", help="Write results"),
+):
+    sizes_ = [int(s) for s in sizes.split(",")]
+    rows = _rows(2 * max(sizes_))
+    columns = HeroColumns(rows)
+    weights = weight_vector(WEIGHTS)
+    scale = settings.MATCHUP_SCALE
+
+    results = {}
+    for size in sizes_:
+        left, right = slice(0, size), slice(size, 2 * size)
+        sets = (
+            columns.ids[left],
+            columns.vectors[left],
+            columns.ids[right],
+            columns.vectors[right],
+        )
+
+        def scores():
+            for _ in score_blocks(sets[1], sets[3], weights, scale):
+                pass
+
+        def ndjson():
+            for _ in _matchup_matrix(*sets, weights):
+                pass
+
+        results[size] = {
+            "top": _time(lambda: top_matchups(*sets, weights, scale, top), repeat),
+            "matrix_scores": _time(scores, repeat),
+            "matrix_ndjson": _time(ndjson, max(1, repeat // 2)),
+        }
+        if naive:
+            results[size]["naive"] = _time(
+                lambda: _naive(rows[left], rows[right], top), 1
+            )
+
+        typer.echo(f"\n-- {size} x {size} heroes")
+        for label, result in results[size].items():
+            typer.echo(
+                f"{label:>14}: p50 {result['p50_ms']} ms, "
+                f"mean {result['mean_ms']} ms, max {result['max_ms']} ms"
+            )
+    if json_path:
+        json_path.write_text(json.dumps({"top": top, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,143 @@
+"""
+Benchmark for the GET /hero/ read engines: SQL vs the in-memory columnar index.
+
+Generates synthetic heroes, builds a HeroColumns snapshot and times a few
+filtered page reads on it. With ``--sql`` the same rows are loaded into a
+scratch ``bench`` schema and the same compiled filters are timed against
+Postgres (needs the usual DB_* settings).
+
+    python -m benchmarks.bench_read_engine --rows 100000 --sql --json engines.json
+"""
+
+import json
+import time
+import random
+import statistics
+import typing as t
+from pathlib import Path
+
+import typer
+from sqlalchemy import create_engine, insert, select, text
+
+from src.db.models import Hero
+from src.config.settings import settings
+from src.app._columnar import HeroColumns
+from src.app._filters import compile_filter, parse_filters
+
+
+SCHEMA = "bench"
+PAGE = 100
+
+FILTERS: t.Dict[str, dict] = {
+    "power_gte": {"power": {"gte": 95}},
+    "two_ranges": {"power": {"gte": 50}, "speed": {"between": [10, 20]}},
+    "publisher_or_prefix": {
+        "or": [{"publisher": {"eq": "Image Comics"}}, {"name": {"prefix": "Hero 99"}}]
+    },
+    "negated_range": {"not": {"intelligence": {"lt": 99}}},
+}
+
+
+def _rows(count: int) -> t.List[t.Dict[str, t.Any]]:
+    rng = random.Random(42)
+    publishers = ["Marvel Comics", "DC Comics", "Dark Horse Comics", "Image Comics"]
+    return [
+        {
+            "id": hero_id,
+            "name": f"Hero {hero_id}",
+            "intelligence": float(rng.randint(0, 100)),
+            "strength": float(rng.randint(0, 100)),
+            "speed": float(rng.randint(0, 100)),
+            "power": float(rng.randint(0, 100)),
+            "full_name": f"Full Name {hero_id}",
+            "publisher": publishers[hero_id % 4],
+            "alignment": ("good", "bad", "neutral")[hero_id % 3],
+            "image_url": None,
+            "upstream_id": hero_id,
+        }
+        for hero_id in range(1, count + 1)
+    ]
+
+
+def _time(fn: t.Callable[[], t.Any], repeat: int) -> t.Dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        "p50_ms": round(statistics.median(timings), 3),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "max_ms": round(max(timings), 3),
+    }
+
+
+def _measure_memory(columns: HeroColumns, repeat: int) -> t.Dict[str, dict]:
+    return {
+        label: _time(
+            lambda: columns.select(None, parse_filters(json.dumps(f)), None, PAGE),
+            repeat,
+        )
+        for label, f in FILTERS.items()
+    }
+
+
+def _measure_sql(rows: t.List[dict], repeat: int) -> t.Dict[str, dict]:
+    engine = create_engine(settings.DB_URL)
+    with engine.connect() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        conn = conn.execution_options(schema_translate_map={None: SCHEMA})
+        Hero.__table__.create(conn)
+        typer.echo(f"Seeding {len(rows)} rows...")
+        conn.execute(insert(Hero.__table__), rows)
+        conn.execute(text(f"ANALYZE {SCHEMA}.heroes"))
+        conn.commit()
+        try:
+            return {
+                label: _time(
+                    lambda: conn.execute(
+                        select(Hero)
+                        .filter(compile_filter(parse_filters(json.dumps(f))))
+                        .order_by(Hero.id)
+                        .limit(PAGE + 1)
+                    ).all(),
+                    repeat,
+                )
+                for label, f in FILTERS.items()
+            }
+        finally:
+            conn.rollback()
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+            conn.commit()
+
+
+def main(
+    rows: int = typer.Option(100_000, help="Synthetic heroes to generate"),
+    repeat: int = typer.Option(200, help="Timed runs per query"),
+    sql: bool = typer.Option(False, help="Also time the SQL engine on Postgres"),
+    json_path: t.Optional[Path] = typer.Option(None, "--json", help="Write results"),
+):
+    data = _rows(rows)
+    started = time.perf_counter()
+    columns = HeroColumns(data)
+    build_ms = round((time.perf_counter() - started) * 1000, 3)
+    typer.echo(f"Built columnar snapshot of {rows} heroes in {build_ms} ms")
+
+    results = {"rows": rows, "build_ms": build_ms}
+    results["memory"] = _measure_memory(columns, repeat)
+    if sql:
+        results["sql"] = _measure_sql(data, repeat)
+
+    typer.echo("\n=== p50 ms per page ===")
+    for label in FILTERS:
+        line = f"{label:>20}: memory {results['memory'][label]['p50_ms']:>8}"
+        if sql:
+            line += f"  sql {results['sql'][label]['p50_ms']:>8}"
+        typer.echo(line)
+    if json_path:
+        json_path.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,125 @@
+"""
+Benchmark for GET /hero/search and the trigram indexes of revision 3b8d0f6c2a71.
+
+Seeds a scratch copy of ``heroes`` in a ``bench`` schema (same data as
+bench_indexes), runs the search query for prefix, typo and full-name input
+without and then with the trigram indexes, and prints EXPLAIN ANALYZE plans
+and latency for both. Needs a Postgres with the pg_trgm extension available.
+
+    python -m benchmarks.bench_search --rows 1000000 --json search.json
+"""
+
+import json
+import time
+import statistics
+import typing as t
+from pathlib import Path
+
+import typer
+from sqlalchemy import create_engine, text
+from sqlalchemy.dialects import postgresql
+
+from src.config.settings import settings
+from src.app._search import search_query
+from benchmarks.bench_indexes import CREATE_TABLE, SCHEMA, SEED
+
+
+INDEXES = [
+    f"CREATE INDEX ix_bench_name_trgm ON {SCHEMA}.heroes "
+    "USING gin (name gin_trgm_ops)",
+    f"CREATE INDEX ix_bench_full_name_trgm ON {SCHEMA}.heroes "
+    "USING gin (full_name gin_trgm_ops)",
+]
+
+QUERIES: t.Dict[str, str] = {
+    "prefix": "Hero 42424",
+    "typo": "Hreo 424242",
+    "full_name": "Name 424242",
+    "no_match": "Zzyzx",
+}
+
+
+def _measure(conn, limit: int, repeat: int) -> t.Dict[str, dict]:
+    results = {}
+    for label, q in QUERIES.items():
+        query = search_query(q, limit)
+        # literal SQL without %-escaping, run as-is by the driver
+        sql = query.compile(
+            dialect=postgresql.dialect(paramstyle="named"),
+            compile_kwargs={"literal_binds": True},
+        )
+        plan = conn.exec_driver_sql(f"EXPLAIN (ANALYZE, BUFFERS) {sql}").scalars()
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            rows = conn.execute(query).all()
+            timings.append((time.perf_counter() - started) * 1000)
+        results[label] = {
+            "plan": "\n".join(plan),
+            "top": [row.name for row in rows[:3]],
+            "p50_ms": round(statistics.median(timings), 3),
+            "mean_ms": round(statistics.fmean(timings), 3),
+            "max_ms": round(max(timings), 3),
+        }
+    return results
+
+
+def _report(title: str, results: t.Dict[str, dict]) -> None:
+    typer.echo(f"\n=== {title} ===")
+    for label, result in results.items():
+        typer.echo(
+            f"\n-- {label} {result['top']}: p50 {result['p50_ms']} ms, "
+            f"mean {result['mean_ms']} ms, max {result['max_ms']} ms"
+        )
+        typer.echo(result["plan"])
+
+
+def main(
+    rows: int = typer.Option(1_000_000, help="Rows to seed"),
+    limit: int = typer.Option(20, help="Results per search"),
+    repeat: int = typer.Option(20, help="Timed runs per query"),
+    json_path: t.Optional[Path] = typer.Option(None, "--json", help="Write results"),
+    keep: bool = typer.Option(False, help="Keep the bench schema afterwards"),
+):
+    engine = create_engine(settings.DB_URL)
+    with engine.connect() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        conn.execute(text(CREATE_TABLE))
+        typer.echo(f"Seeding {rows} rows...")
+        conn.execute(text(SEED), {"rows": rows})
+        conn.execute(text(f"ANALYZE {SCHEMA}.heroes"))
+        conn.commit()
+        conn.execute(text(f"SET search_path TO {SCHEMA}, public"))
+
+        try:
+            before = _measure(conn, limit, repeat)
+            _report("without trigram indexes", before)
+
+            for statement in INDEXES:
+                conn.execute(text(statement))
+            conn.execute(text(f"ANALYZE {SCHEMA}.heroes"))
+            conn.commit()
+
+            after = _measure(conn, limit, repeat)
+            _report("with trigram indexes", after)
+        finally:
+            if not keep:
+                conn.rollback()
+                conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+                conn.commit()
+
+    typer.echo("\n=== summary (p50 ms) ===")
+    for label in QUERIES:
+        typer.echo(
+            f"{label:>12}: {before[label]['p50_ms']:>10} -> {after[label]['p50_ms']}"
+        )
+    if json_path:
+        json_path.write_text(
+            json.dumps({"rows": rows, "before": before, "after": after}, indent=2)
+        )
+
+
+if __name__ == "__main__":
+    typer.run(main)
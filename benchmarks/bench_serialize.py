@@ -0,0 +1,103 @@
+"""
+Benchmark for GET /hero/ serialization: ORM instances + jsonable_encoder vs
+plain rows + orjson.
+
+Loads synthetic heroes into an in-memory SQLite database and, for each path,
+reads a page of ``--rows`` heroes and encodes it to JSON bytes the way
+get_heroes does. Reports CPU time (query + hydration + encoding) and the
+peak memory traced while doing it.
+
+    python -m benchmarks.bench_serialize --rows 10000 --json serialize.json
+"""
+
+import gc
+import json
+import time
+import statistics
+import tracemalloc
+import typing as t
+from pathlib import Path
+
+import orjson
+import typer
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from src.db.models import Hero
+from src.app._helpers import HERO_COLUMNS
+from benchmarks.bench_read_engine import _rows
+
+
+def orm_path(session: Session, rows: int) -> bytes:
+    """Before: ORM instances through jsonable_encoder and json.dumps."""
+    heroes = session.scalars(select(Hero).order_by(Hero.id).limit(rows)).all()
+    return json.dumps(jsonable_encoder(heroes), separators=(",", ":")).encode()
+
+
+def rows_path(session: Session, rows: int) -> bytes:
+    """After: plain rows as dicts, encoded by orjson."""
+    result = session.execute(select(*HERO_COLUMNS).order_by(Hero.id).limit(rows))
+    keys = [column.key for column in HERO_COLUMNS]
+    return orjson.dumps([dict(zip(keys, row)) for row in result.all()])
+
+
+PATHS: t.Dict[str, t.Callable[[Session, int], bytes]] = {
+    "orm_jsonable_encoder": orm_path,
+    "rows_orjson": rows_path,
+}
+
+
+def _measure(engine, path, rows: int, repeat: int) -> t.Dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        # a fresh session each time, so ORM instances are hydrated again
+        with Session(engine) as session:
+            started = time.process_time()
+            body = path(session, rows)
+            timings.append((time.process_time() - started) * 1000)
+
+    gc.collect()
+    with Session(engine) as session:
+        tracemalloc.start()
+        path(session, rows)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {
+        "cpu_p50_ms": round(statistics.median(timings), 3),
+        "cpu_mean_ms": round(statistics.fmean(timings), 3),
+        "peak_mb": round(peak / 1024 / 1024, 2),
+        "body_bytes": len(body),
+    }
+
+
+def main(
+    rows: int = typer.Option(10_000, help="Heroes per response"),
+    repeat: int = typer.Option(20, help="Timed runs per path"),
+    json_path: t.Optional[Path] = typer.Option(None, "--json", help="Write results"),
+):
+    engine = create_engine("sqlite://")
+    Hero.__table__.create(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Hero), _rows(rows))
+
+    with Session(engine) as session:
+        bodies = [json.loads(path(session, rows)) for path in PATHS.values()]
+    assert all(body == bodies[0] for body in bodies), "paths disagree"
+
+    results = {}
+    for label, path in PATHS.items():
+        results[label] = _measure(engine, path, rows, repeat)
+        result = results[label]
+        typer.echo(
+            f"{label:>22}: cpu p50 {result['cpu_p50_ms']} ms, "
+            f"mean {result['cpu_mean_ms']} ms, peak {result['peak_mb']} MB, "
+            f"{result['body_bytes']} bytes"
+        )
+    if json_path:
+        json_path.write_text(json.dumps({"rows": rows, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    typer.run(main)
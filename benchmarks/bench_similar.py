@@ -0,0 +1,97 @@
+"""
+Benchmark for GET /hero/{id}/similar and POST /hero/similar: k-NN over the
+powerstat matrix of the in-memory index.
+
+Builds a HeroColumns snapshot of synthetic heroes per size and times single
+queries, publisher-prefiltered queries and a batch of queries. With
+``--naive`` a pure-Python scan over the rows is timed as the baseline.
+
+    python -m benchmarks.bench_similar --sizes 100000,1000000 --json similar.json
+"""
+
+import json
+import time
+import random
+import statistics
+import typing as t
+from pathlib import Path
+
+import typer
+
+from src.app._columnar import POWERSTATS, HeroColumns
+from src.app._filters import condition
+from benchmarks.bench_read_engine import _rows
+
+
+def _time(fn: t.Callable[[], t.Any], repeat: int) -> t.Dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        "p50_ms": round(statistics.median(timings), 3),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "max_ms": round(max(timings), 3),
+    }
+
+
+def _naive(rows: t.List[dict], hero: dict, k: int) -> t.List[dict]:
+    """What a per-request Python scan would do."""
+    return sorted(
+        (row for row in rows if row is not hero),
+        key=lambda row: sum((row[s] - hero[s]) ** 2 for s in POWERSTATS),
+    )[:k]
+
+
+def main(
+    sizes: str = typer.Option("100000,1000000", help="Comma-separated hero counts"),
+    k: int = typer.Option(10, help="Neighbours per query"),
+    batch: int = typer.Option(32, help="Queries per batch request"),
+    repeat: int = typer.Option(20, help="Timed runs per measurement"),
+    naive: bool = typer.Option(False, help="Also time a pure-Python scan"),
+    json_path: t.Optional[Path] = typer.Option(None, "--json", help="Write results"),
+):
+    rng = random.Random(7)
+    publisher = condition("publisher", "eq", "DC Comics")
+    results = {}
+    for size in (int(s) for s in sizes.split(",")):
+        rows = _rows(size)
+        started = time.perf_counter()
+        columns = HeroColumns(rows)
+        columns.nearest([0], k)  # builds the cached candidate matrix
+        build_ms = round((time.perf_counter() - started) * 1000, 1)
+
+        def single():
+            columns.nearest([rng.randrange(size)], k)
+
+        def prefiltered():
+            columns.nearest([rng.randrange(size)], k, publisher)
+
+        def batched():
+            columns.nearest([rng.randrange(size) for _ in range(batch)], k)
+
+        results[size] = {
+            "build_ms": build_ms,
+            "single": _time(single, repeat),
+            "prefiltered": _time(prefiltered, repeat),
+            f"batch_{batch}": _time(batched, max(1, repeat // 4)),
+        }
+        if naive:
+            results[size]["naive"] = _time(
+                lambda: _naive(rows, rows[rng.randrange(size)], k), max(1, repeat // 10)
+            )
+
+        typer.echo(f"\n-- {size} heroes (snapshot built in {build_ms} ms)")
+        for label, result in results[size].items():
+            if label != "build_ms":
+                typer.echo(
+                    f"{label:>12}: p50 {result['p50_ms']} ms, "
+                    f"mean {result['mean_ms']} ms, max {result['max_ms']} ms"
+                )
+    if json_path:
+        json_path.write_text(json.dumps({"k": k, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    typer.run(main)
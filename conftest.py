@@ -1,14 +1,28 @@
 import pytest
 
 from unittest.mock import MagicMock
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from src.helpers.models import HeroCreate
+from src.config.settings import settings
+from src.app._cache import hero_list_cache
+from src.app._columnar import HeroColumns
+
+
+@pytest.fixture(autouse=True)
+def clear_response_cache():
+    hero_list_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def no_image_prefetch(monkeypatch):
+    # heroes_changed would start background downloads through a real session
+    monkeypatch.setattr(settings, "IMAGE_PREFETCH", False)
 
 
 @pytest.fixture
 def mock_db():
-    db = MagicMock()
-    db.query.return_value.filter.return_value.first.return_value = None
+    db = MagicMock(spec=AsyncSession)
+    db.scalar.return_value = None
     return db
 
 
@@ -19,7 +33,38 @@ def hero_data():
 
 @pytest.fixture
 def db():
-    db = MagicMock(spec=Session)
-    db.query.return_value.filter.return_value = db.query.return_value
-    db.query.return_value.all.return_value = []
+    db = MagicMock(spec=AsyncSession)
+    db.execute.return_value = MagicMock()
+    db.execute.return_value.scalars.return_value.all.return_value = []
+    db.execute.return_value.all.return_value = []
     return db
+
+
+def hero(hero_id, stats, publisher="Marvel Comics", alignment="good"):
+    """A heroes row for HeroColumns, with powerstats `stats` in column order."""
+    intelligence, strength, speed, power = stats
+    return {
+        "id": hero_id,
+        "name": f"Hero {hero_id}",
+        "intelligence": intelligence,
+        "strength": strength,
+        "speed": speed,
+        "power": power,
+        "full_name": None,
+        "publisher": publisher,
+        "alignment": alignment,
+        "image_url": None,
+        "upstream_id": hero_id,
+    }
+
+
+@pytest.fixture
+def columns(request, monkeypatch):
+    """Serves the test module's ROWS from hero_index instead of the database."""
+    columns = HeroColumns(request.module.ROWS)
+
+    async def fake_columns(db):
+        return columns
+
+    monkeypatch.setattr("src.app.routers.hero_index.columns", fake_columns)
+    return columns
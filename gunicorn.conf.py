@@ -0,0 +1,59 @@
+"""
+Production server settings: uvicorn workers under gunicorn, app preloaded.
+
+    gunicorn main:app -c gunicorn.conf.py
+
+The app is imported once in the master and forked into the workers, which
+then run its lifespan (warm-up on start, drain on SIGTERM). Each worker has
+its own DB pool of DB_POOL_SIZE + DB_MAX_OVERFLOW connections.
+"""
+
+import os
+import math
+import shutil
+import tempfile
+
+from src.config.settings import settings
+
+
+def _cpu_count() -> int:
+    """CPUs this process may use: its affinity, capped by a cgroup v2 quota."""
+    try:
+        count = len(os.sched_getaffinity(0))
+    except AttributeError:
+        count = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            count = min(count, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return count
+
+
+bind = f"{settings.HOST}:{settings.PORT}"
+workers = settings.WEB_WORKERS or _cpu_count()
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = settings.WEB_TIMEOUT
+graceful_timeout = settings.WEB_GRACEFUL_TIMEOUT
+keepalive = settings.WEB_KEEPALIVE
+
+# metrics are per process: with several workers they are written to files and
+# merged on /metrics. This must be set before prometheus_client is imported,
+# i.e. before the app is preloaded, and must not hold a previous run's files.
+if workers > 1:
+    metrics_dir = os.environ.setdefault(
+        "PROMETHEUS_MULTIPROC_DIR",
+        os.path.join(tempfile.gettempdir(), "superhero-metrics"),
+    )
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir)
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,18 +1,39 @@
-import os
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from os.path import join, dirname
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.staticfiles import StaticFiles
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
 from src.app.routers import router
-from src.helpers.static_content import description, title, PUBLIC_ASSETS, FRONTEND_ROOT
+from src.app._lifecycle import shutdown, startup
+from src.app._static import frontend_static, public_static
+from src.app._compression import CompressionMiddleware
+from src.app._metrics import (
+    MetricsMiddleware,
+    PoolCollector,
+    metrics_registry,
+    register_live,
+)
+from src.db.data_base import engine
+from src.config.settings import settings
+from src.utils.custom_logger import REQUEST_ID_HEADER, RequestContextMiddleware
+from src.helpers.static_content import description, title
 
 dotenv_path = join(dirname(__file__), ".env")
 load_dotenv(dotenv_path)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await startup()
+    yield
+    await shutdown()
+
+
 app = FastAPI(
+    lifespan=lifespan,
     title=title,
     description=description,
     version="0.1.0",
@@ -28,22 +49,34 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", REQUEST_ID_HEADER],
 )
+# middleware added later runs further out: metrics and request logging wrap
+# compression, so they see the response as sent
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestContextMiddleware)
+register_live(PoolCollector(engine.sync_engine.pool))
 
 
 app.include_router(router)
-app.mount("/static", StaticFiles(directory=str(FRONTEND_ROOT)), name="static")
-app.mount(
-    "/super-hero/public",
-    StaticFiles(directory=str(PUBLIC_ASSETS)),
-    name="public",
-)
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(generate_latest(metrics_registry()), media_type=CONTENT_TYPE_LATEST)
+
+
+app.mount("/static", frontend_static, name="static")
+app.mount("/super-hero/public", public_static, name="public")
 
 if __name__ == "__main__":
+    # single-process development server; production runs
+    # `gunicorn main:app -c gunicorn.conf.py`
     uvicorn.run(
         "main:app",
-        host=str(os.getenv("HOST")),
-        port=int(os.getenv("PORT")),
-        reload=bool(os.getenv("DEBUG")),
-        log_level="debug" if os.getenv("DEBUG") else "info",
+        host=settings.HOST,
+        port=int(settings.PORT),
+        reload=settings.DEBUG,
+        log_level="debug" if settings.DEBUG else "info",
     )
@@ -0,0 +1,142 @@
+import asyncio
+import typing as t
+
+import httpx
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.models import Hero
+from src.config.settings import settings
+from src.app._events import heroes_changed
+from src.utils.custom_logger import get_logger
+from src.app._helpers import _call_api_method, Endpoint, find_character, hero_values
+
+
+logger = get_logger(__name__)
+
+
+async def _lookup(name: str) -> t.Tuple[str, t.Union[dict, str]]:
+    """Searches upstream for one name; returns ("found", values) or (status, detail)."""
+    try:
+        response = await _call_api_method(endpoint=Endpoint.SEARCH, search_name=name)
+    except httpx.HTTPError as e:
+        return "error", f"Error calling superheroapi.com: {str(e)}"
+
+    if response.status_code != 200:
+        return "error", f"superheroapi.com returned {response.status_code}"
+
+    try:
+        data = response.json()
+    except ValueError as e:
+        return "error", f"superheroapi.com returned invalid JSON: {str(e)}"
+    if data.get("response") == "error" or not data.get("results"):
+        return "not_found", f"Hero '{name}' not found in superheroapi.com"
+
+    character = find_character(data["results"], name)
+    if not character:
+        return "not_found", f"No exact match found for hero '{name}' in API results"
+
+    try:
+        return "found", hero_values(character)
+    except Exception as e:
+        return "error", f"Invalid payload for hero '{name}': {str(e)}"
+
+
+async def _insert_batch(
+    db: AsyncSession, batch: t.List[t.Tuple[str, dict]]
+) -> t.List[t.Dict[str, t.Any]]:
+    """Inserts one batch with a single INSERT ... ON CONFLICT DO NOTHING."""
+    stmt = (
+        insert(Hero)
+        .values([values for _, values in batch])
+        .on_conflict_do_nothing(index_elements=[Hero.name])
+        .returning(Hero.id, Hero.name)
+    )
+    try:
+        inserted = {name: hero_id for hero_id, name in await db.execute(stmt)}
+        await db.commit()
+        if inserted:
+            heroes_changed(list(inserted.values()))
+    except Exception as e:
+        await db.rollback()
+        logger.error("Bulk insert of %d heroes failed: %s", len(batch), e)
+        return [
+            {
+                "name": name,
+                "status": "error",
+                "detail": f"Error creating hero: {str(e)}",
+            }
+            for name, _ in batch
+        ]
+
+    results = []
+    for name, values in batch:
+        if values["name"] in inserted:
+            results.append(
+                {"name": name, "status": "created", "id": inserted[values["name"]]}
+            )
+        else:
+            results.append({"name": name, "status": "exists"})
+    return results
+
+
+async def import_heroes(
+    names: t.Iterable[str],
+    db: AsyncSession,
+    batch_size: t.Optional[int] = None,
+    concurrency: t.Optional[int] = None,
+) -> t.AsyncIterator[t.Dict[str, t.Any]]:
+    """
+    Imports many heroes at once, yielding a result per name as it completes.
+
+    Names already in the database are skipped with one set-based lookup,
+    upstream searches run with bounded concurrency, and found heroes are
+    written in multi-row inserts of ``batch_size`` rows.
+    """
+    batch_size = batch_size or settings.BULK_BATCH_SIZE
+    semaphore = asyncio.Semaphore(concurrency or settings.BULK_FETCH_CONCURRENCY)
+
+    pending: t.Dict[str, str] = {}
+    for name in names:
+        name = name.strip()
+        if name:
+            pending.setdefault(name.lower(), name)
+
+    existing = set(
+        await db.scalars(
+            select(func.lower(Hero.name)).where(
+                func.lower(Hero.name).in_(list(pending))
+            )
+        )
+    )
+    for lowered in existing:
+        yield {"name": pending.pop(lowered), "status": "exists"}
+
+    logger.info(
+        "Bulk import: %d already exist, %d to fetch", len(existing), len(pending)
+    )
+
+    async def fetch(name: str):
+        async with semaphore:
+            return name, await _lookup(name)
+
+    tasks = [asyncio.ensure_future(fetch(name)) for name in pending.values()]
+    batch: t.List[t.Tuple[str, dict]] = []
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            name, (status, result) = await next_done
+            if status != "found":
+                yield {"name": name, "status": status, "detail": result}
+                continue
+            batch.append((name, result))
+            if len(batch) >= batch_size:
+                for item in await _insert_batch(db, batch):
+                    yield item
+                batch = []
+        if batch:
+            for item in await _insert_batch(db, batch):
+                yield item
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,380 @@
+import abc
+import json
+import asyncio
+import time
+import hashlib
+import typing as t
+from collections import OrderedDict
+
+import httpx
+from fastapi import Response
+
+from src.config.settings import settings
+from src.app._events import on_heroes_changed
+from src.app._metrics import UPSTREAM_CACHE_LOOKUPS
+from src.utils.custom_logger import get_logger
+
+logger = get_logger(__name__)
+
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    In-process LRU mapping with a per-entry TTL.
+
+    Bounded by entry count and, when ``maxweight`` is given, by the total
+    ``weigh(value)`` of the entries (e.g. bytes).
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        maxweight: t.Optional[int] = None,
+        weigh: t.Callable[[t.Any], int] = len,
+    ):
+        self.maxsize = maxsize
+        self.maxweight = maxweight
+        self.weigh = weigh
+        self.weight = 0
+        self._data: "OrderedDict[t.Hashable, t.Tuple[float, t.Any]]" = OrderedDict()
+
+    def get(self, key: t.Hashable, default: t.Any = None) -> t.Any:
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            self._pop(key)
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: t.Hashable, value: t.Any, ttl: float) -> None:
+        if key in self._data:
+            self._pop(key)
+        if self.maxweight is not None:
+            weight = self.weigh(value)
+            if weight > self.maxweight:
+                return
+            self.weight += weight
+        self._data[key] = (time.monotonic() + ttl, value)
+        while len(self._data) > self.maxsize or (
+            self.maxweight is not None and self.weight > self.maxweight
+        ):
+            self._pop(next(iter(self._data)))
+
+    def _pop(self, key: t.Hashable) -> None:
+        _, value = self._data.pop(key)
+        if self.maxweight is not None:
+            self.weight -= self.weigh(value)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.weight = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class CacheBackend(abc.ABC):
+    """Shared storage for cached upstream responses, visible to all workers."""
+
+    @abc.abstractmethod
+    async def get(self, key: str) -> t.Optional[t.Tuple[bytes, t.Optional[float]]]:
+        """The value and the seconds it has left (None if it never expires)."""
+
+    @abc.abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        ...
+
+
+class InMemoryBackend(CacheBackend):
+    """Process-local stand-in for a shared backend, used in tests."""
+
+    def __init__(self):
+        self._data: t.Dict[str, t.Tuple[float, bytes]] = {}
+
+    async def get(self, key: str) -> t.Optional[t.Tuple[bytes, t.Optional[float]]]:
+        entry = self._data.get(key)
+        if entry is None or entry[0] <= time.time():
+            self._data.pop(key, None)
+            return None
+        return entry[1], entry[0] - time.time()
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._data[key] = (time.time() + ttl, value)
+
+
+class RedisBackend(CacheBackend):
+    """Shared backend on Redis. Requires the optional ``redis`` package."""
+
+    def __init__(self, url: str, prefix: str = "superhero:upstream:"):
+        try:
+            from redis import asyncio as aioredis
+        except ImportError as e:
+            raise RuntimeError(
+                "API_CACHE_URL is set but the 'redis' package is not installed"
+            ) from e
+        self._redis = aioredis.from_url(url)
+        self._prefix = prefix
+
+    async def get(self, key: str) -> t.Optional[t.Tuple[bytes, t.Optional[float]]]:
+        key = self._prefix + key
+        pipeline = self._redis.pipeline(transaction=False)
+        value, ttl_ms = await pipeline.get(key).pttl(key).execute()
+        if value is None:
+            return None
+        # -1: no expiry; -2: expired between the two commands
+        return value, None if ttl_ms == -1 else max(ttl_ms, 0) / 1000
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self._redis.set(self._prefix + key, value, ex=max(int(ttl), 1))
+
+
+def _encode(response: httpx.Response) -> bytes:
+    return b"%d\n" % response.status_code + response.content
+
+
+def _decode(value: bytes) -> httpx.Response:
+    status, _, content = value.partition(b"\n")
+    return httpx.Response(
+        int(status), content=content, headers={"content-type": "application/json"}
+    )
+
+
+def _is_negative(response: httpx.Response) -> bool:
+    if response.status_code == 404:
+        return True
+    try:
+        return response.json().get("response") == "error"
+    except ValueError:
+        return False
+
+
+class UpstreamCache:
+    """
+    Read-through cache for superheroapi.com responses.
+
+    Lookups go to the in-process LRU first, then the optional shared backend,
+    then upstream. Successful results and "not found" results are cached with
+    separate TTLs; anything else (5xx, rate limiting) is never cached.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        hit_ttl: float,
+        miss_ttl: float,
+        backend: t.Optional[CacheBackend] = None,
+    ):
+        self.hit_ttl = hit_ttl
+        self.miss_ttl = miss_ttl
+        self.backend = backend
+        self._local = LRUCache(maxsize)
+        self.hits = 0
+        self.misses = 0
+
+    async def get_or_fetch(
+        self, key: str, fetch: t.Callable[[], t.Awaitable[httpx.Response]]
+    ) -> httpx.Response:
+        value = self._local.get(key)
+        if value is not None:
+            self.hits += 1
+            UPSTREAM_CACHE_LOOKUPS.labels(result="local_hit").inc()
+            return _decode(value)
+        if self.backend is not None:
+            shared = await self._backend_get(key)
+            if shared is not None:
+                value, remaining = shared
+                response = _decode(value)
+                ttl = self._ttl_for(response)
+                # don't keep it here for longer than it has left there
+                if remaining is not None:
+                    ttl = min(ttl, remaining)
+                self._local.set(key, value, ttl)
+                self.hits += 1
+                UPSTREAM_CACHE_LOOKUPS.labels(result="shared_hit").inc()
+                return response
+
+        self.misses += 1
+        UPSTREAM_CACHE_LOOKUPS.labels(result="miss").inc()
+        response = await fetch()
+        ttl = self._ttl_for(response)
+        if ttl:
+            value = _encode(response)
+            self._local.set(key, value, ttl)
+            if self.backend is not None:
+                await self._backend_set(key, value, ttl)
+        return response
+
+    async def _backend_get(
+        self, key: str
+    ) -> t.Optional[t.Tuple[bytes, t.Optional[float]]]:
+        """The shared entry, or None if the backend fails: it is only a cache."""
+        try:
+            return await self.backend.get(key)
+        except Exception as e:
+            logger.warning("Reading %r from the shared cache failed: %s", key, e)
+            return None
+
+    async def _backend_set(self, key: str, value: bytes, ttl: float) -> None:
+        try:
+            await self.backend.set(key, value, ttl)
+        except Exception as e:
+            logger.warning("Writing %r to the shared cache failed: %s", key, e)
+
+    def _ttl_for(self, response: httpx.Response) -> float:
+        if _is_negative(response):
+            return self.miss_ttl
+        if response.status_code == 200:
+            return self.hit_ttl
+        return 0
+
+    def stats(self) -> t.Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._local)}
+
+    def clear(self) -> None:
+        self._local.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+upstream_cache = UpstreamCache(
+    maxsize=settings.API_CACHE_MAXSIZE,
+    hit_ttl=settings.API_CACHE_HIT_TTL,
+    miss_ttl=settings.API_CACHE_MISS_TTL,
+    backend=RedisBackend(settings.API_CACHE_URL) if settings.API_CACHE_URL else None,
+)
+
+
+class CachedResponse(t.NamedTuple):
+    body: bytes
+    etag: str
+    headers: t.Dict[str, str]
+
+    def __len__(self) -> int:
+        return len(self.body)
+
+    def render(self, if_none_match: t.Optional[str] = None) -> Response:
+        """Builds the response, or a 304 when the client already has this body."""
+        headers = {"ETag": self.etag, **self.headers}
+        if if_none_match and _etag_matches(if_none_match, self.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(
+            content=self.body, media_type="application/json", headers=headers
+        )
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(
+        tag.removeprefix("W/") == etag for tag in candidates
+    )
+
+
+def make_etag(body: bytes) -> str:
+    return '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+class ResponseCache:
+    """
+    Pre-serialized JSON responses keyed on canonical request parameters.
+
+    Every write bumps ``version``, which is part of the key, so entries from
+    before the write are never served again and simply age out of the LRU.
+    Writes by this process bump it directly. Writes by other workers or the
+    sync CLI move the shared ``heroes_version`` sequence, which ``watch``
+    polls in the background, so they show within RESPONSE_CACHE_VERSION_INTERVAL
+    without a query on every request.
+    """
+
+    def __init__(self, maxsize: int, maxbytes: int, ttl: float):
+        self.ttl = ttl
+        self.version = 0
+        self.shared_version = 0
+        self._unsettled = False
+        self._local = LRUCache(maxsize, maxweight=maxbytes)
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, **params: t.Any) -> str:
+        params = {k: v for k, v in params.items() if v is not None}
+        return f"{self.version}:" + json.dumps(
+            params, sort_keys=True, separators=(",", ":")
+        )
+
+    def get(self, key: str) -> t.Optional[CachedResponse]:
+        cached = self._local.get(key)
+        if cached is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return cached
+
+    def set(
+        self, key: str, body: bytes, headers: t.Optional[t.Dict[str, str]] = None
+    ) -> CachedResponse:
+        cached = CachedResponse(body, make_etag(body), headers or {})
+        if key.startswith(f"{self.version}:"):
+            self._local.set(key, cached, self.ttl)
+        return cached
+
+    def bump(self) -> None:
+        self.version += 1
+        self._local.clear()
+
+    def observe(self, shared_version: int) -> None:
+        """
+        Bumps if the shared version moved on since the last call, and again
+        on the call after: writers take a new version before they commit, so
+        results computed in between may not include their rows yet.
+        """
+        if shared_version > self.shared_version:
+            self.shared_version = shared_version
+            self._unsettled = True
+            self.bump()
+        elif self._unsettled:
+            self._unsettled = False
+            self.bump()
+
+    async def watch(
+        self, read_version: t.Callable[[], t.Awaitable[int]], interval: float
+    ) -> None:
+        """Observes `read_version()` every `interval` seconds, until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.observe(await read_version())
+            except Exception as e:
+                logger.warning("Reading the shared heroes version failed: %s", e)
+
+    def stats(self) -> t.Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._local),
+            "bytes": self._local.weight,
+            "version": self.version,
+            "shared_version": self.shared_version,
+        }
+
+    def clear(self) -> None:
+        self.bump()
+        self.shared_version = 0
+        self._unsettled = False
+        self.hits = 0
+        self.misses = 0
+
+
+hero_list_cache = ResponseCache(
+    maxsize=settings.RESPONSE_CACHE_MAXSIZE,
+    maxbytes=settings.RESPONSE_CACHE_MAXBYTES,
+    ttl=settings.RESPONSE_CACHE_TTL,
+)
+
+
+@on_heroes_changed
+def _invalidate_hero_lists(hero_ids: t.Sequence[int]) -> None:
+    hero_list_cache.bump()
@@ -0,0 +1,608 @@
+import re
+import time
+import asyncio
+import typing as t
+from functools import cached_property, lru_cache
+
+import numpy as np
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import String, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.models import Hero
+from src.config.settings import settings
+from src.app._events import on_heroes_changed
+from src.app._filters import FILTERABLE_COLUMNS, Node
+from src.app._helpers import HERO_COLUMNS
+from src.utils.custom_logger import get_logger
+
+logger = get_logger(__name__)
+
+POWERSTATS = ("intelligence", "strength", "speed", "power")
+RANGE_OPERATORS = {"eq", "lt", "lte", "gt", "gte", "between"}
+
+# float64 cells per distance-matrix block in nearest(): about 32 MB
+DISTANCE_BLOCK = 4_000_000
+
+Mask = t.Tuple[np.ndarray, np.ndarray]
+
+
+@lru_cache(maxsize=256)
+def _like_regex(pattern: str) -> "re.Pattern[str]":
+    """Translates an ILIKE pattern (`%`, `_`, backslash escapes) to a regex."""
+    parts, chars = [], iter(pattern)
+    for char in chars:
+        if char == "\\":
+            parts.append(re.escape(next(chars, "\\")))
+        elif char == "%":
+            parts.append(".*")
+        elif char == "_":
+            parts.append(".")
+        else:
+            parts.append(re.escape(char))
+    return re.compile("".join(parts), re.IGNORECASE | re.DOTALL)
+
+
+# changed rows checked one by one, until there are enough to be worth
+# merging into the sorted copies and the name map, which copies those
+MAX_LOOSE_ROWS = 2048
+
+
+def _column(
+    rows: t.List[t.Dict[str, t.Any]], field: str
+) -> t.Tuple[np.ndarray, np.ndarray]:
+    """One column of `rows` as (values, NULL mask); NULL is "" or NaN in values."""
+    column = [row[field] for row in rows]
+    nulls = np.fromiter((v is None for v in column), bool, len(column))
+    if FILTERABLE_COLUMNS[field] is String:
+        values = np.array(["" if v is None else v for v in column], dtype=str)
+    else:
+        values = np.array(
+            [np.nan if v is None else v for v in column], dtype=np.float64
+        )
+    return values, nulls
+
+
+def _columns(rows: t.List[t.Dict[str, t.Any]]) -> t.Dict[t.Any, np.ndarray]:
+    """Everything `_Storage` holds, for `rows`."""
+    columns: t.Dict[t.Any, np.ndarray] = {
+        "ids": np.fromiter((row["id"] for row in rows), np.int64, len(rows))
+    }
+    for field in FILTERABLE_COLUMNS:
+        columns["values", field], columns["nulls", field] = _column(rows, field)
+    columns["vectors"] = np.column_stack(
+        [columns["values", field] for field in POWERSTATS]
+    )
+    # heroes with a NULL powerstat have no position in powerstat space
+    columns["complete"] = ~np.isnan(columns["vectors"]).any(axis=1)
+    return columns
+
+
+def _merged(
+    values: np.ndarray,
+    order: np.ndarray,
+    dropped: np.ndarray,
+    new_values: np.ndarray,
+    new_positions: np.ndarray,
+) -> t.Tuple[np.ndarray, np.ndarray]:
+    """
+    A sorted column and its argsort without the entries of `dropped`
+    positions, and with `new_values` at `new_positions` inserted in order.
+    """
+    keep = ~np.isin(order, dropped)
+    values, order = values[keep], order[keep]
+    by = np.argsort(new_values, kind="stable")
+    new_values, new_positions = new_values[by], new_positions[by]
+    at = np.searchsorted(values, new_values, side="right")
+    # a longer string must not be truncated to the old width
+    values = values.astype(np.result_type(values, new_values), copy=False)
+    return np.insert(values, at, new_values), np.insert(order, at, new_positions)
+
+
+class _Storage:
+    """
+    Column buffers with room to grow, shared by a snapshot and the ones
+    `HeroColumns.apply` makes from it. Each snapshot views its first `size`
+    entries; `end` is where the newest one stops, and only a snapshot ending
+    there may append in place, past what older snapshots can see.
+    """
+
+    def __init__(self, columns: t.Dict[t.Any, np.ndarray], size: int):
+        capacity = size + max(1024, size // 4)
+        self.buffers = {}
+        for key, column in columns.items():
+            buffer = np.empty((capacity, *column.shape[1:]), column.dtype)
+            buffer[:size] = column
+            self.buffers[key] = buffer
+        self.end = size
+
+    def fits(self, size: int, columns: t.Dict[t.Any, np.ndarray]) -> bool:
+        return all(
+            len(self.buffers[key]) >= size
+            and np.can_cast(column.dtype, self.buffers[key].dtype)
+            for key, column in columns.items()
+        )
+
+    def views(self, size: int) -> t.Dict[t.Any, np.ndarray]:
+        return {key: buffer[:size] for key, buffer in self.buffers.items()}
+
+
+class HeroColumns:
+    """
+    Immutable column-array snapshot of ``heroes``, ordered by id.
+
+    Each filterable column is a NumPy array plus a NULL mask; powerstats also
+    keep a sorted copy and its argsort so ranges are two binary searches, and
+    text columns the same over lowercased values for prefix matches. Names
+    are looked up through a lowercase hash map. The four powerstats also
+    form an (n, 4) matrix for nearest-neighbour search.
+
+    `apply` makes a new snapshot from changed rows without copying the
+    whole index. Rows changed since the sorted copies and the name map were
+    built are "loose": they are checked directly, and merged in once there
+    are more than MAX_LOOSE_ROWS of them.
+    """
+
+    # text columns sorted for prefix matches, powerstats for ranges
+    sorted_fields = [
+        field
+        for field, column_type in FILTERABLE_COLUMNS.items()
+        if column_type is String or field in POWERSTATS
+    ]
+
+    def __init__(self, rows: t.List[t.Dict[str, t.Any]]):
+        self.rows = rows
+        self.size = len(rows)
+        self._attach(_Storage(_columns(rows), self.size))
+        self.prefixes: t.Dict[str, t.Tuple[np.ndarray, np.ndarray]] = {}
+        self.sorted: t.Dict[str, t.Tuple[np.ndarray, np.ndarray, int]] = {}
+        for field in self.sorted_fields:
+            values = self._sort_key(field, self.values[field])
+            order = np.argsort(values, kind="stable")
+            self._set_sorted(field, values[order], order)
+
+        self.names: t.Dict[str, t.List[int]] = {}
+        for position, row in enumerate(rows):
+            self.names.setdefault(row["name"].lower(), []).append(position)
+        self._loose = np.empty(0, np.int64)
+        self._loose_names: t.Dict[str, t.List[int]] = {}
+
+    def _attach(self, storage: _Storage) -> None:
+        self._storage = storage
+        views = storage.views(self.size)
+        self.ids = views["ids"]
+        self.values = {field: views["values", field] for field in FILTERABLE_COLUMNS}
+        self.nulls = {field: views["nulls", field] for field in FILTERABLE_COLUMNS}
+        self.vectors = views["vectors"]
+        self.complete = views["complete"]
+
+    @staticmethod
+    def _sort_key(field: str, values: np.ndarray) -> np.ndarray:
+        if FILTERABLE_COLUMNS[field] is String:
+            return np.char.lower(values)
+        return values
+
+    def _set_sorted(self, field: str, values: np.ndarray, order: np.ndarray) -> None:
+        if FILTERABLE_COLUMNS[field] is String:
+            self.prefixes[field] = (values, order)
+        else:
+            # NaN sorts last, so the first `valid` entries are the non-NULL ones
+            valid = len(values) - int(np.isnan(values).sum())
+            self.sorted[field] = (values, order, valid)
+
+    def _name_positions(self, name: str) -> t.List[int]:
+        if name in self._loose_names:
+            return self._loose_names[name]
+        return self.names.get(name, [])
+
+    def apply(self, changed: t.List[t.Dict[str, t.Any]]) -> t.Optional["HeroColumns"]:
+        """
+        A new snapshot with `changed` rows replaced or appended; this one is
+        left as it is, for readers still holding it.
+
+        Appended rows are written past the end of this snapshot's buffers;
+        updating rows in place copies the columns first. Either way only the
+        changed rows are sorted into the index, and only once enough pile up.
+        Returns None if a new id sorts before the high-water mark, which takes
+        a full rebuild.
+        """
+        if not changed:
+            return self
+        changed = sorted(changed, key=lambda row: row["id"])
+        columns = _columns(changed)
+        ids = columns["ids"]
+        positions = np.searchsorted(self.ids, ids)
+        present = positions < self.size
+        present[present] = self.ids[positions[present]] == ids[present]
+        if not present.all() and ids[~present][0] <= self.high_water_mark:
+            return None
+        size = self.size + int((~present).sum())
+        positions[~present] = np.arange(self.size, size)
+
+        storage = self._storage
+        if present.any() or storage.end != self.size or not storage.fits(size, columns):
+            current = storage.views(self.size)
+            storage = _Storage(
+                {
+                    key: view.astype(np.result_type(view, columns[key]), copy=False)
+                    for key, view in current.items()
+                },
+                self.size,
+            )
+        for key, column in columns.items():
+            storage.buffers[key][positions] = column
+        storage.end = size
+
+        new = HeroColumns.__new__(HeroColumns)
+        new.rows = list(self.rows)
+        for position, row in zip(positions.tolist(), changed):
+            if position < self.size:
+                new.rows[position] = row
+            else:
+                new.rows.append(row)
+        new.size = size
+        new._attach(storage)
+        new.prefixes, new.sorted, new.names = self.prefixes, self.sorted, self.names
+        new._loose = np.union1d(self._loose, positions)
+        new._loose_names = dict(self._loose_names)
+        for position in positions[present].tolist():
+            name = self.rows[position]["name"].lower()
+            new._loose_names[name] = [
+                p for p in new._name_positions(name) if p != position
+            ]
+        for position, row in zip(positions.tolist(), changed):
+            name = row["name"].lower()
+            new._loose_names[name] = sorted(new._name_positions(name) + [position])
+        if len(new._loose) > MAX_LOOSE_ROWS:
+            new._merge_loose()
+        return new
+
+    def _merge_loose(self) -> None:
+        """Sorts the loose rows into fresh copies of the index; O(n)."""
+        loose = self._loose
+        prefixes, sorted_ = self.prefixes, self.sorted
+        self.prefixes, self.sorted = {}, {}
+        for field in self.sorted_fields:
+            if FILTERABLE_COLUMNS[field] is String:
+                values, order = prefixes[field]
+            else:
+                values, order, _ = sorted_[field]
+            new_values = self._sort_key(field, self.values[field][loose])
+            self._set_sorted(field, *_merged(values, order, loose, new_values, loose))
+
+        names = dict(self.names)
+        for name, positions in self._loose_names.items():
+            if positions:
+                names[name] = positions
+            else:
+                names.pop(name, None)
+        self.names = names
+        self._loose = np.empty(0, np.int64)
+        self._loose_names = {}
+
+    @property
+    def high_water_mark(self) -> int:
+        return int(self.ids[-1]) if self.size else 0
+
+    def select(
+        self,
+        name: t.Optional[str],
+        tree: t.Optional[Node],
+        cursor: t.Optional[int],
+        limit: int,
+        fields: t.Optional[t.List[str]] = None,
+    ) -> t.Tuple[t.List[t.Dict[str, t.Any]], t.Optional[int]]:
+        """Same page as the SQL path: rows by id after `cursor`, and the next cursor."""
+        if name:
+            mask = np.zeros(self.size, bool)
+            mask[self._name_positions(name.lower())] = True
+        else:
+            mask = np.ones(self.size, bool)
+        if tree is not None:
+            mask &= self.mask(tree)[0]
+        if cursor is not None:
+            mask[: np.searchsorted(self.ids, cursor, side="right")] = False
+
+        positions = np.flatnonzero(mask)[: limit + 1]
+        next_cursor = None
+        if len(positions) > limit:
+            positions = positions[:limit]
+            next_cursor = int(self.ids[positions[-1]])
+
+        rows = [self.rows[position] for position in positions]
+        if fields:
+            rows = [{field: row[field] for field in fields} for row in rows]
+        return rows, next_cursor
+
+    def position(self, hero_id: int) -> t.Optional[int]:
+        """Row position of a hero id, or None if it is not in the snapshot."""
+        position = int(np.searchsorted(self.ids, hero_id))
+        if position < self.size and self.ids[position] == hero_id:
+            return position
+        return None
+
+    @cached_property
+    def _all_candidates(self) -> t.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return self._candidates(self.complete)
+
+    def _candidates(
+        self, mask: np.ndarray
+    ) -> t.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        positions = np.flatnonzero(mask)
+        vectors = self.vectors[positions]
+        return positions, vectors, np.einsum("ij,ij->i", vectors, vectors)
+
+    def nearest(
+        self, positions: t.Sequence[int], k: int, tree: t.Optional[Node] = None
+    ) -> t.List[t.List[t.Tuple[int, float]]]:
+        """
+        For each hero position, the `k` closest heroes by Euclidean distance
+        over the powerstats, nearest first, as (position, distance) pairs.
+
+        The hero itself, heroes with a NULL powerstat and heroes that do not
+        match `tree` are left out. Distances for a block of queries come from
+        one matrix product, |a - b|^2 = |a|^2 + |b|^2 - 2ab, and their top k
+        from one partial sort.
+        """
+        if tree is None:
+            candidates, vectors, squared = self._all_candidates
+        else:
+            candidates, vectors, squared = self._candidates(
+                self.complete & self.mask(tree)[0]
+            )
+
+        results = []
+        block = max(1, DISTANCE_BLOCK // max(1, len(candidates)))
+        for start in range(0, len(positions), block):
+            queries = np.asarray(positions[start : start + block], dtype=np.int64)
+            points = self.vectors[queries]
+            distances = (
+                squared[None, :]
+                + np.einsum("ij,ij->i", points, points)[:, None]
+                - 2 * points @ vectors.T
+            )
+            # a query never matches itself
+            own = np.searchsorted(candidates, queries)
+            own_found = own < len(candidates)
+            own_found[own_found] = candidates[own[own_found]] == queries[own_found]
+            distances[np.flatnonzero(own_found), own[own_found]] = np.inf
+
+            if not len(candidates):
+                results.extend([] for _ in queries)
+                continue
+            take = min(k, len(candidates))
+            tops = np.argpartition(distances, take - 1, axis=1)[:, :take]
+            for row, top in zip(distances, tops):
+                # the query itself is partitioned in when k covers every candidate
+                top = top[np.isfinite(row[top])]
+                top = top[np.lexsort((candidates[top], row[top]))]
+                results.append(
+                    [
+                        (int(candidates[i]), float(np.sqrt(max(row[i], 0.0))))
+                        for i in top
+                    ]
+                )
+        return results
+
+    def mask(self, node: Node) -> Mask:
+        """
+        Evaluates a filter tree to (true, false) masks.
+
+        Both are tracked so NULLs follow SQL three-valued logic: a comparison
+        with NULL is neither, and `not` swaps the two instead of inverting.
+        """
+        kind = node[0]
+        if kind in ("and", "or"):
+            masks = [self.mask(child) for child in node[1]]
+            true, false = masks[0]
+            for child_true, child_false in masks[1:]:
+                if kind == "and":
+                    true, false = true & child_true, false | child_false
+                else:
+                    true, false = true | child_true, false & child_false
+            return true, false
+        if kind == "not":
+            true, false = self.mask(node[1])
+            return false, true
+
+        _, field, op, value = node
+        null = self.nulls[field]
+        if value is None:
+            true = null if op == "eq" else ~null
+            return true, ~true
+        if field in self.sorted and op in RANGE_OPERATORS:
+            true = self._range(field, op, value)
+        else:
+            true = self._compare(field, op, value) & ~null
+        return true, ~true & ~null
+
+    def _range(self, field: str, op: str, value: t.Any) -> np.ndarray:
+        values, order, valid = self.sorted[field]
+        values = values[:valid]
+        low, high = 0, valid
+        if op == "between":
+            low = np.searchsorted(values, value[0], side="left")
+            high = np.searchsorted(values, value[1], side="right")
+        if op in ("eq", "gte"):
+            low = np.searchsorted(values, value, side="left")
+        if op == "gt":
+            low = np.searchsorted(values, value, side="right")
+        if op in ("eq", "lte"):
+            high = np.searchsorted(values, value, side="right")
+        if op == "lt":
+            high = np.searchsorted(values, value, side="left")
+
+        mask = np.zeros(self.size, bool)
+        mask[order[low : max(low, high)]] = True
+        if len(self._loose):
+            # the sorted copy is out of date for these
+            mask[self._loose] = _compared(self.values[field][self._loose], op, value)
+        return mask
+
+    def _prefix(self, field: str, prefix: str) -> np.ndarray:
+        lowered, order = self.prefixes[field]
+        low = np.searchsorted(lowered, prefix, side="left")
+        high = np.searchsorted(lowered, prefix + "\U0010ffff", side="left")
+        mask = np.zeros(self.size, bool)
+        mask[order[low:high]] = True
+        if len(self._loose):
+            mask[self._loose] = np.char.startswith(
+                np.char.lower(self.values[field][self._loose]), prefix
+            )
+        return mask
+
+    def _compare(self, field: str, op: str, value: t.Any) -> np.ndarray:
+        if op == "prefix":
+            return self._prefix(field, value.lower())
+        return _compared(self.values[field], op, value)
+
+
+def _compared(values: np.ndarray, op: str, value: t.Any) -> np.ndarray:
+    """`values <op> value`, elementwise, for any operator but prefix."""
+    if op == "eq":
+        return values == value
+    if op == "ne":
+        return values != value
+    if op == "lt":
+        return values < value
+    if op == "lte":
+        return values <= value
+    if op == "gt":
+        return values > value
+    if op == "gte":
+        return values >= value
+    if op == "in":
+        return np.isin(values, list(value))
+    if op == "between":
+        return (values >= value[0]) & (values <= value[1])
+    regex = _like_regex(value)
+    return np.fromiter(
+        (regex.fullmatch(v) is not None for v in values), bool, len(values)
+    )
+
+
+class HeroIndex:
+    """
+    In-process read engine for GET /hero/ (HERO_READ_ENGINE=memory), and the
+    powerstat matrix behind similar heroes and matchups.
+
+    The first read loads ``heroes`` into a `HeroColumns` snapshot. Writes in
+    this process mark their ids through `heroes_changed` and are applied on
+    the next read; writes by other processes are picked up by polling for ids
+    above the high-water mark every HERO_INDEX_POLL_INTERVAL seconds, and
+    updates to existing rows by a full reload every HERO_INDEX_RELOAD_INTERVAL.
+
+    Changed rows are applied to a copy of the snapshot; full loads build a
+    new one. Both run in the threadpool and are swapped in when done, so the
+    event loop keeps serving the old snapshot meanwhile, except to readers
+    waiting for writes made by this process.
+    """
+
+    def __init__(self, poll_interval: float, reload_interval: float):
+        self.poll_interval = poll_interval
+        self.reload_interval = reload_interval
+        self._columns: t.Optional[HeroColumns] = None
+        self._pending: t.Set[int] = set()
+        self._stale = False
+        # calls to mark_changed, and how many of them the snapshot includes
+        self._changes = 0
+        self._applied = 0
+        self._loaded_at = 0.0
+        self._polled_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def mark_changed(self, hero_ids: t.Sequence[int]) -> None:
+        self._changes += 1
+        if hero_ids:
+            self._pending.update(hero_ids)
+        else:
+            self._stale = True
+
+    async def columns(self, db: AsyncSession) -> HeroColumns:
+        """Returns a snapshot that includes every write seen by this process."""
+        if not self._needs_refresh():
+            return self._columns
+        if (
+            self._columns is not None
+            and self._lock.locked()
+            and self._applied == self._changes
+        ):
+            # only a timed poll or reload is due, and one is under way
+            return self._columns
+        async with self._lock:
+            if self._needs_refresh():
+                await self._refresh(db)
+        return self._columns
+
+    def _needs_refresh(self) -> bool:
+        now = time.monotonic()
+        return (
+            self._columns is None
+            or self._applied != self._changes
+            or now - self._polled_at >= self.poll_interval
+            or now - self._loaded_at >= self.reload_interval
+        )
+
+    async def _refresh(self, db: AsyncSession) -> None:
+        now = time.monotonic()
+        changes = self._changes
+        stale, self._stale = self._stale, False
+        pending, self._pending = self._pending, set()
+        try:
+            if (
+                self._columns is None
+                or stale
+                or now - self._loaded_at >= self.reload_interval
+            ):
+                result = await db.execute(select(*HERO_COLUMNS).order_by(Hero.id))
+                self._columns = await run_in_threadpool(_snapshot, result.mappings())
+                self._loaded_at = self._polled_at = now
+                logger.info("Hero index loaded %d heroes", self._columns.size)
+            else:
+                await self._apply_changes(db, pending)
+                self._polled_at = now
+        except BaseException:
+            # picked up again by the next read
+            self._stale |= stale
+            self._pending |= pending
+            raise
+        self._applied = changes
+
+    async def _apply_changes(self, db: AsyncSession, pending: t.Set[int]) -> None:
+        query = select(*HERO_COLUMNS).where(
+            or_(Hero.id > self._columns.high_water_mark, Hero.id.in_(list(pending)))
+        )
+        changed = [dict(row) for row in (await db.execute(query)).mappings()]
+        if not changed:
+            return
+        columns = await run_in_threadpool(self._columns.apply, changed)
+        if columns is None:
+            # an id below the high-water mark, from a transaction that
+            # committed after a later one
+            rows = {row["id"]: row for row in self._columns.rows}
+            rows.update((row["id"], row) for row in changed)
+            columns = await run_in_threadpool(
+                _snapshot, [rows[key] for key in sorted(rows)]
+            )
+        self._columns = columns
+
+    def clear(self) -> None:
+        self._columns = None
+        self._pending.clear()
+        self._stale = False
+        self._applied = self._changes
+
+
+def _snapshot(rows: t.Iterable[t.Mapping[str, t.Any]]) -> HeroColumns:
+    return HeroColumns([dict(row) for row in rows])
+
+
+hero_index = HeroIndex(
+    poll_interval=settings.HERO_INDEX_POLL_INTERVAL,
+    reload_interval=settings.HERO_INDEX_RELOAD_INTERVAL,
+)
+
+
+@on_heroes_changed
+def _track_hero_changes(hero_ids: t.Sequence[int]) -> None:
+    hero_index.mark_changed(hero_ids)
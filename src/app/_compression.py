@@ -0,0 +1,217 @@
+"""
+Content-Encoding negotiation, shared by precompressed static assets and
+`CompressionMiddleware` for API responses.
+
+gzip is always available; brotli is offered when the optional ``brotli``
+package is installed.
+"""
+
+import zlib
+import typing as t
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.config.settings import settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# in order of preference when the client likes several equally
+ENCODINGS: t.Tuple[str, ...] = ("br", "gzip") if brotli is not None else ("gzip",)
+
+# text-like responses worth compressing; images and archives already are
+COMPRESSIBLE_TYPES = {
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/openapi+json",
+    "image/svg+xml",
+    "text/css",
+    "text/csv",
+    "text/html",
+    "text/javascript",
+    "text/plain",
+}
+
+
+def choose_encoding(
+    accept_encoding: t.Optional[str], available: t.Iterable[str] = ENCODINGS
+) -> t.Optional[str]:
+    """
+    The best of `available` for an Accept-Encoding header, or None for identity.
+
+    Honours q-values, including `q=0` to refuse an encoding and `*`; ties go
+    to the order of `available`.
+    """
+    if not accept_encoding:
+        return None
+    weights: t.Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        weights[name.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in available:
+        quality = weights.get(encoding, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compresses a whole body as tightly as possible, for content served often."""
+    if encoding == "br":
+        return brotli.compress(body, quality=11)
+    compressor = _gzip_compressor(9)
+    return compressor.compress(body) + compressor.flush()
+
+
+def _gzip_compressor(level: int):
+    return zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+
+class _StreamCompressor:
+    """Compresses a body chunk by chunk, flushing each so streams stay live."""
+
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=settings.COMPRESS_BROTLI_QUALITY)
+            self._gzip = None
+        else:
+            self._brotli = None
+            self._gzip = _gzip_compressor(settings.COMPRESS_GZIP_LEVEL)
+
+    def write(self, chunk: bytes, last: bool) -> bytes:
+        if self._brotli is not None:
+            data = self._brotli.process(chunk)
+            return data + (self._brotli.finish() if last else self._brotli.flush())
+        data = self._gzip.compress(chunk)
+        return data + self._gzip.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+def _vary(headers: MutableHeaders) -> None:
+    varies = [value.strip().lower() for value in headers.get("vary", "").split(",")]
+    if "accept-encoding" not in varies and "*" not in varies:
+        headers.add_vary_header("Accept-Encoding")
+
+
+def _encoded_etag(etag: str, encoding: str) -> str:
+    """
+    The ETag of a response after `encoding`: a strong one names exact bytes,
+    so it gets the encoding appended like `_static.Asset` does; weak ones
+    are unchanged.
+    """
+    if etag.startswith('"') and etag.endswith('"'):
+        return f'{etag[:-1]}-{encoding}"'
+    return etag
+
+
+def _decoded_etags(if_none_match: str) -> str:
+    """If-None-Match with `_encoded_etag` undone, for the app to compare."""
+    tags = []
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        for encoding in ENCODINGS:
+            if tag.endswith(f'-{encoding}"'):
+                tag = tag[: -len(encoding) - 2] + '"'
+                break
+        tags.append(tag)
+    return ", ".join(tags)
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing text-like responses with br or gzip.
+
+    Like Starlette's GZipMiddleware, but negotiates brotli too, leaves
+    binary content types and responses that are already encoded alone, and
+    flushes streamed bodies chunk by chunk so NDJSON lines still arrive as
+    they are produced. Bodies under COMPRESS_MIN_SIZE sent in one message are
+    not worth compressing.
+
+    A compressed response's strong ETag gets the encoding appended, and
+    If-None-Match is translated back before the app sees it, so conditional
+    requests keep working. Every response that could have been compressed,
+    and every 304, carries ``Vary: Accept-Encoding``.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        request_headers = Headers(scope=scope)
+        encoding = choose_encoding(request_headers.get("accept-encoding"))
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match:
+            decoded = _decoded_etags(if_none_match).encode("latin-1")
+            scope = {
+                **scope,
+                "headers": [
+                    (name, decoded if name == b"if-none-match" else value)
+                    for name, value in scope["headers"]
+                ],
+            }
+
+        start: t.Optional[Message] = None
+        compressor: t.Optional[_StreamCompressor] = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                return await send(message)
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                headers = MutableHeaders(raw=start["headers"])
+                media_type = headers.get("content-type", "").split(";")[0].strip()
+                if media_type in COMPRESSIBLE_TYPES or start["status"] == 304:
+                    _vary(headers)
+                if start["status"] == 304 and encoding and if_none_match:
+                    # keep the tag the client has, if it has the encoded one
+                    etag = _encoded_etag(headers.get("etag", ""), encoding)
+                    if etag in [tag.strip() for tag in if_none_match.split(",")]:
+                        headers["ETag"] = etag
+                if (
+                    encoding is None
+                    or "content-encoding" in headers
+                    or media_type not in COMPRESSIBLE_TYPES
+                    or start["status"] in (204, 304)
+                    or (not more_body and len(body) < settings.COMPRESS_MIN_SIZE)
+                ):
+                    passthrough = True
+                    await send(start)
+                    return await send(message)
+
+                compressor = _StreamCompressor(encoding)
+                headers["Content-Encoding"] = encoding
+                if "etag" in headers:
+                    headers["ETag"] = _encoded_etag(headers["etag"], encoding)
+                if "content-length" in headers:
+                    del headers["Content-Length"]
+                body = compressor.write(body, last=not more_body)
+                if not more_body:
+                    headers["Content-Length"] = str(len(body))
+                await send(start)
+            else:
+                body = compressor.write(body, last=not more_body)
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,214 @@
+"""
+Hero details from the superheroapi.com sub-endpoints, fetched on demand.
+
+`hero_sections.sections` holds one object per section (appearance, work,
+...) in the upstream format, without the `response`, `id` and `name` keys
+every sub-endpoint repeats. Sections are fetched the first time they are
+asked for, all at once, and merged into the row; sections that fail or miss
+HERO_DETAILS_DEADLINE are reported as missing and tried again next time.
+
+Heroes without an `upstream_id` (created before it was stored) are looked
+up by name first, like POST /hero/ does, and the id found is saved.
+"""
+
+import asyncio
+import typing as t
+
+import httpx
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.models import Hero, HeroSections
+from src.config.settings import settings
+from src.app._events import heroes_changed
+from src.app._metrics import stage_timer
+from src.utils.custom_logger import get_logger
+from src.app._helpers import _call_api_method, Endpoint, HERO_COLUMNS, find_character
+
+logger = get_logger(__name__)
+
+SECTIONS: t.Dict[str, Endpoint] = {
+    endpoint.path: endpoint
+    for endpoint in (
+        Endpoint.POWERSTATS,
+        Endpoint.BIOGRAPHY,
+        Endpoint.APPEARANCE,
+        Endpoint.WORK,
+        Endpoint.CONNECTIONS,
+        Endpoint.IMAGE,
+    )
+}
+
+# repeated in every sub-endpoint response, or already in the hero row
+_ENVELOPE_KEYS = {"response", "id", "name"}
+
+
+def parse_expand(expand: str) -> t.List[str]:
+    """
+    Turns an `expand=` value into section names, in SECTIONS order.
+
+    Raises:
+        ValueError: If a section is unknown
+    """
+    names = {name.strip().lower() for name in expand.split(",") if name.strip()}
+    unknown = sorted(names - SECTIONS.keys())
+    if unknown:
+        raise ValueError(
+            f"Unknown sections: {', '.join(unknown)}; "
+            f"expected some of {', '.join(SECTIONS)}"
+        )
+    return [section for section in SECTIONS if section in names]
+
+
+async def _fetch_section(upstream_id: int, section: str) -> t.Optional[dict]:
+    response = await _call_api_method(SECTIONS[section], hero_id=upstream_id)
+    if response.status_code != 200:
+        logger.warning(
+            "superheroapi.com returned %s for %s of %s",
+            response.status_code,
+            section,
+            upstream_id,
+        )
+        return None
+    data = response.json()
+    if data.get("response") != "success":
+        return None
+    return {key: value for key, value in data.items() if key not in _ENVELOPE_KEYS}
+
+
+async def fetch_sections(
+    upstream_id: int, sections: t.List[str]
+) -> t.Tuple[t.Dict[str, dict], t.List[str]]:
+    """
+    Fetches sections of an upstream character concurrently.
+
+    Returns the sections that arrived within HERO_DETAILS_DEADLINE, and the
+    names of those that failed or were still pending, which are cancelled.
+    """
+    tasks = {
+        section: asyncio.create_task(_fetch_section(upstream_id, section))
+        for section in sections
+    }
+    with stage_timer("hero_details.fetch"):
+        _, pending = await asyncio.wait(
+            tasks.values(), timeout=settings.HERO_DETAILS_DEADLINE
+        )
+    for task in pending:
+        task.cancel()
+
+    found, missing = {}, []
+    for section, task in tasks.items():
+        if task in pending:
+            logger.warning("Timed out fetching %s of %s", section, upstream_id)
+        elif task.exception() is not None:
+            logger.warning(
+                "Error fetching %s of %s: %s", section, upstream_id, task.exception()
+            )
+        elif task.result() is not None:
+            found[section] = task.result()
+            continue
+        missing.append(section)
+    return found, missing
+
+
+async def resolve_upstream_id(
+    name: str, full_name: t.Optional[str]
+) -> t.Tuple[t.Optional[int], t.Optional[str]]:
+    """
+    Looks a hero up in superheroapi.com by name.
+
+    Of several exact name matches, the one with the same full name is taken.
+
+    Returns:
+        The upstream id, or None and the reason it could not be found
+    """
+    unavailable = "superheroapi.com could not be searched for this hero"
+    try:
+        with stage_timer("hero_details.resolve"):
+            response = await asyncio.wait_for(
+                _call_api_method(Endpoint.SEARCH, search_name=name),
+                timeout=settings.HERO_DETAILS_DEADLINE,
+            )
+        if response.status_code not in (200, 404):
+            logger.warning(
+                "superheroapi.com returned %s searching %s", response.status_code, name
+            )
+            return None, unavailable
+        results = response.json().get("results") or []
+    except (httpx.HTTPError, asyncio.TimeoutError, ValueError) as e:
+        logger.warning("Error searching %s in superheroapi.com: %r", name, e)
+        return None, unavailable
+
+    same_person = [
+        result
+        for result in results
+        if result.get("biography", {}).get("full-name") == full_name
+    ]
+    character = find_character(same_person, name) or find_character(results, name)
+    if character is None:
+        return None, f"No superheroapi.com character is named '{name}'"
+    return int(character["id"]), None
+
+
+async def hero_with_details(
+    db: AsyncSession, hero_id: int, sections: t.List[str]
+) -> t.Optional[t.Dict[str, t.Any]]:
+    """
+    A hero row with the requested `details` sections, or None if no such hero.
+
+    Sections not stored yet are fetched and stored; those that could not be
+    fetched are listed in `missing`, with `missing_reason` set when none could
+    be because the hero is not known upstream.
+    """
+    row = (
+        await db.execute(
+            select(*HERO_COLUMNS, HeroSections.sections)
+            .outerjoin(HeroSections, HeroSections.hero_id == Hero.id)
+            .where(Hero.id == hero_id)
+        )
+    ).first()
+    if row is None:
+        return None
+    hero = row._asdict()
+    stored = hero.pop("sections") or {}
+
+    wanted = [section for section in sections if section not in stored]
+    found, missing, reason = {}, wanted, None
+    if wanted and not hero["upstream_id"]:
+        upstream_id, reason = await resolve_upstream_id(hero["name"], hero["full_name"])
+        if upstream_id is not None:
+            # the only write to `heroes` here, once per hero
+            await db.execute(
+                update(Hero).where(Hero.id == hero_id).values(upstream_id=upstream_id)
+            )
+            await db.commit()
+            heroes_changed([hero_id])
+            hero["upstream_id"] = upstream_id
+    if wanted and hero["upstream_id"]:
+        found, missing = await fetch_sections(hero["upstream_id"], wanted)
+    if found:
+        # merged in the database, so concurrent fills of other sections survive
+        statement = insert(HeroSections).values(hero_id=hero_id, sections=found)
+        await db.execute(
+            statement.on_conflict_do_update(
+                index_elements=[HeroSections.hero_id],
+                set_={
+                    "sections": HeroSections.sections.op("||")(
+                        statement.excluded.sections
+                    )
+                },
+            )
+        )
+        await db.commit()
+        logger.info("Stored %s of hero %s", ", ".join(found), hero_id)
+
+    details = {**stored, **found}
+    return {
+        **hero,
+        "details": {
+            section: details[section] for section in sections if section in details
+        },
+        "missing": missing,
+        "missing_reason": reason,
+    }
@@ -0,0 +1,22 @@
+import typing as t
+
+
+HeroesChanged = t.Callable[[t.Sequence[int]], None]
+
+_listeners: t.List[HeroesChanged] = []
+
+
+def on_heroes_changed(listener: HeroesChanged) -> HeroesChanged:
+    """Registers a callback run after any write to ``heroes`` commits."""
+    _listeners.append(listener)
+    return listener
+
+
+def heroes_changed(hero_ids: t.Sequence[int] = ()) -> None:
+    """
+    Notifies listeners that heroes were inserted or updated.
+
+    An empty ``hero_ids`` means the affected rows are not known individually.
+    """
+    for listener in _listeners:
+        listener(hero_ids)
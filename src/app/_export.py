@@ -0,0 +1,46 @@
+import io
+import csv
+import json
+import typing as t
+
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+async def iter_chunks(
+    db: AsyncSession, query: Select, chunk_size: int
+) -> t.AsyncIterator[t.Sequence[t.Any]]:
+    """
+    Reads query rows in chunks through a server-side cursor.
+
+    ``yield_per`` keeps only one chunk of rows in memory at a time instead of
+    buffering the whole result set client-side.
+    """
+    result = await db.stream(query.execution_options(yield_per=chunk_size))
+    try:
+        async for rows in result.partitions():
+            yield rows
+    finally:
+        await result.close()
+
+
+async def ndjson_lines(
+    db: AsyncSession, query: Select, columns: t.List[str], chunk_size: int
+) -> t.AsyncIterator[str]:
+    async for rows in iter_chunks(db, query, chunk_size):
+        yield "".join(json.dumps(dict(zip(columns, row))) + "\n" for row in rows)
+
+
+async def csv_lines(
+    db: AsyncSession, query: Select, columns: t.List[str], chunk_size: int
+) -> t.AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    async for rows in iter_chunks(db, query, chunk_size):
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,236 @@
+import json
+import math
+import typing as t
+from functools import lru_cache
+
+from sqlalchemy import Float, Integer, String, and_, not_, or_
+
+from src.db.models import Hero
+from src.config.settings import settings
+
+
+# columns that may appear in `filters`, with the type their values must have
+FILTERABLE_COLUMNS: t.Dict[str, type] = {
+    "id": Integer,
+    "name": String,
+    "full_name": String,
+    "publisher": String,
+    "alignment": String,
+    "intelligence": Float,
+    "strength": Float,
+    "speed": Float,
+    "power": Float,
+    "upstream_id": Integer,
+}
+
+COMPARISONS = {"eq", "ne", "lt", "lte", "gt", "gte"}
+STRING_OPERATORS = {"prefix", "ilike"}
+OPERATORS = COMPARISONS | STRING_OPERATORS | {"in", "between"}
+
+# Canonical filter tree, hashable so it can key the plan cache:
+#   ("cmp", field, op, value)  value is a scalar, None or a tuple (in/between)
+#   ("and", (node, ...)) / ("or", (node, ...)) / ("not", node)
+Node = t.Tuple[t.Any, ...]
+
+
+class FilterError(ValueError):
+    """Raised for a `filters` expression that is malformed or too complex."""
+
+
+class _Budget:
+    def __init__(self):
+        self.conditions = 0
+
+    def spend(self, count: int = 1) -> None:
+        self.conditions += count
+        if self.conditions > settings.FILTER_MAX_CONDITIONS:
+            raise FilterError(
+                f"Too many conditions, at most {settings.FILTER_MAX_CONDITIONS}"
+            )
+
+
+def parse_filters(filters: str) -> t.Optional[Node]:
+    """
+    Parses and validates a `filters` JSON string into its canonical tree.
+
+    Example input:
+    {
+        "power": {"gte": 90},
+        "or": [{"publisher": {"eq": "DC Comics"}}, {"name": {"prefix": "Bat"}}],
+        "not": {"alignment": {"in": ["bad", "neutral"]}}
+    }
+
+    Keys of one object are combined with AND; `and`/`or` take a list of
+    objects and `not` a single object. Returns None for an empty filter.
+
+    Raises:
+        FilterError: If the JSON is invalid, a column or operator is unknown,
+            a value has the wrong type, or the expression is too complex
+    """
+    if len(filters) > settings.FILTER_MAX_LENGTH:
+        raise FilterError(
+            f"Filters too long, at most {settings.FILTER_MAX_LENGTH} characters"
+        )
+    try:
+        data = json.loads(filters)
+    except (json.JSONDecodeError, RecursionError) as e:
+        raise FilterError(f"Invalid JSON filters format: {str(e)}")
+    return canonicalize(data)
+
+
+def canonicalize(data: t.Any, *extra: Node) -> t.Optional[Node]:
+    """
+    Validates decoded filters and reduces them to a canonical tree.
+
+    Nested groups of the same kind are flattened, children are de-duplicated
+    and sorted, and ints on float columns become floats, so filters that only
+    differ in spelling share one tree. `extra` conditions are ANDed in.
+    """
+    budget = _Budget()
+    budget.spend(len(extra))
+    children = list(extra)
+    if data != {}:
+        children.append(_parse_object(data, 1, budget))
+    return _group("and", children) if children else None
+
+
+def condition(field: str, op: str, value: t.Any) -> Node:
+    """Builds one validated condition, e.g. for query parameters."""
+    return _parse_condition(field, op, value)
+
+
+def canonical_json(node: t.Optional[Node]) -> t.Optional[str]:
+    return None if node is None else json.dumps(node, separators=(",", ":"))
+
+
+@lru_cache(maxsize=settings.FILTER_PLAN_CACHE_SIZE)
+def compile_filter(node: Node):
+    """Compiles a canonical tree into a single SQLAlchemy boolean expression."""
+    kind = node[0]
+    if kind == "and":
+        return and_(*(compile_filter(child) for child in node[1]))
+    if kind == "or":
+        return or_(*(compile_filter(child) for child in node[1]))
+    if kind == "not":
+        return not_(compile_filter(node[1]))
+
+    _, field, op, value = node
+    column = getattr(Hero, field)
+    if op == "eq":
+        return column == value
+    if op == "ne":
+        return column != value
+    if op == "lt":
+        return column < value
+    if op == "lte":
+        return column <= value
+    if op == "gt":
+        return column > value
+    if op == "gte":
+        return column >= value
+    if op == "in":
+        return column.in_(value)
+    if op == "between":
+        return column.between(*value)
+    if op == "prefix":
+        return column.istartswith(value, autoescape=True)
+    return column.ilike(value)
+
+
+def _parse_object(data: t.Any, depth: int, budget: _Budget) -> Node:
+    if not isinstance(data, dict) or not data:
+        raise FilterError("Filters must be a non-empty JSON object")
+    if depth > settings.FILTER_MAX_DEPTH:
+        raise FilterError(
+            f"Filters nested too deeply, at most {settings.FILTER_MAX_DEPTH} levels"
+        )
+
+    children = []
+    for key, value in data.items():
+        if key in ("and", "or"):
+            if not isinstance(value, list) or not value:
+                raise FilterError(f"'{key}' takes a non-empty list of objects")
+            children.append(
+                _group(key, [_parse_object(item, depth + 1, budget) for item in value])
+            )
+        elif key == "not":
+            children.append(_negate(_parse_object(value, depth + 1, budget)))
+        elif key in FILTERABLE_COLUMNS:
+            if not isinstance(value, dict) or not value:
+                raise FilterError(f"'{key}' takes an object of operators")
+            for op, operand in value.items():
+                budget.spend()
+                children.append(_parse_condition(key, op, operand))
+        else:
+            raise FilterError(f"Unknown filter field: {key}")
+    return _group("and", children)
+
+
+def _parse_condition(field: str, op: str, value: t.Any) -> Node:
+    column_type = FILTERABLE_COLUMNS.get(field)
+    if column_type is None:
+        raise FilterError(f"Unknown filter field: {field}")
+    if op not in OPERATORS:
+        raise FilterError(f"Unknown operator '{op}' for '{field}'")
+
+    if op in STRING_OPERATORS:
+        if column_type is not String:
+            raise FilterError(f"'{op}' only applies to text fields, not '{field}'")
+        if not isinstance(value, str) or not value:
+            raise FilterError(f"'{field}.{op}' takes a non-empty string")
+        return ("cmp", field, op, value)
+
+    if op == "in":
+        if not isinstance(value, list) or not value:
+            raise FilterError(f"'{field}.in' takes a non-empty list")
+        if len(value) > settings.FILTER_MAX_IN_VALUES:
+            raise FilterError(
+                f"'{field}.in' takes at most {settings.FILTER_MAX_IN_VALUES} values"
+            )
+        values = {_scalar(field, column_type, item) for item in value}
+        return ("cmp", field, op, tuple(sorted(values)))
+
+    if op == "between":
+        if not isinstance(value, list) or len(value) != 2:
+            raise FilterError(f"'{field}.between' takes a [low, high] pair")
+        low, high = (_scalar(field, column_type, item) for item in value)
+        return ("cmp", field, op, (low, high))
+
+    if value is None and op in ("eq", "ne"):
+        return ("cmp", field, op, None)
+    return ("cmp", field, op, _scalar(field, column_type, value))
+
+
+def _scalar(field: str, column_type: type, value: t.Any) -> t.Any:
+    if column_type is String:
+        if isinstance(value, str):
+            return value
+        raise FilterError(f"'{field}' takes string values")
+
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise FilterError(f"'{field}' takes numeric values")
+    if not math.isfinite(value):
+        raise FilterError(f"'{field}' takes finite numbers")
+    if column_type is Integer:
+        if isinstance(value, float) and not value.is_integer():
+            raise FilterError(f"'{field}' takes integer values")
+        return int(value)
+    return float(value)
+
+
+def _group(kind: str, children: t.List[Node]) -> Node:
+    flat = set()
+    for child in children:
+        if child[0] == kind:
+            flat.update(child[1])
+        else:
+            flat.add(child)
+    if len(flat) == 1:
+        return flat.pop()
+    return (kind, tuple(sorted(flat, key=canonical_json)))
+
+
+def _negate(node: Node) -> Node:
+    if node[0] == "not":
+        return node[1]
+    return ("not", node)
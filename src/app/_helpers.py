@@ -1,15 +1,17 @@
-import requests
+import httpx
 import typing as t
 from enum import Enum, auto
 
 
 from src.db.models import Hero
 from src.config.settings import settings
+from src.app._cache import upstream_cache
+from src.app._resilience import upstream
+from src.app._metrics import stage_timer
 from src.utils.custom_logger import get_logger
 
 
 logger = get_logger(__name__)
-logger.propagate = False
 
 
 class Endpoint(Enum):
@@ -30,11 +32,12 @@ class Endpoint(Enum):
         return self.name.lower()
 
 
-def _call_api_method(
+async def _call_api_method(
     endpoint: t.Union[Endpoint, str],
     hero_id: t.Union[int, None] = None,
     search_name: t.Union[str, None] = None,
-) -> requests.Response:
+    use_cache: bool = True,
+) -> httpx.Response:
     """
     Universal method for working with the Superhero API.
 
@@ -42,15 +45,20 @@ def _call_api_method(
         endpoint: One of the predefined Endpoint enum values
         hero_id: Hero ID (required for most endpoints)
         search_name: Name for search (required for SEARCH endpoint)
+        use_cache: Serve from / store into the upstream response cache
 
     Returns:
         API response
 
     Raises:
         ValueError: If required parameters are missing
+        httpx.HTTPError: On connection errors or timeouts
     """
     logger.info(
-        f"Calling API method. Endpoint: {endpoint}, hero_id: {hero_id}, search_name: {search_name}"
+        "Calling API method. Endpoint: %s, hero_id: %s, search_name: %s",
+        endpoint,
+        hero_id,
+        search_name,
     )
 
     base_url = f"{settings.API_HERO}/{settings.TOKEN}"
@@ -58,7 +66,7 @@ def _call_api_method(
     if isinstance(endpoint, str):
         try:
             endpoint = Endpoint[endpoint.upper()]
-            logger.debug(f"Converted string endpoint to Enum: {endpoint}")
+            logger.debug("Converted string endpoint to Enum: %s", endpoint)
         except KeyError:
             error_msg = f"Unknown endpoint: {endpoint}"
             logger.error(error_msg)
@@ -70,6 +78,7 @@ def _call_api_method(
             logger.error(error_msg)
             raise ValueError(error_msg)
         url = f"{base_url}/search/{search_name}"
+        cache_key = f"{endpoint.path}:{search_name.lower()}"
     elif endpoint in [
         Endpoint.POWERSTATS,
         Endpoint.BIOGRAPHY,
@@ -83,48 +92,93 @@ def _call_api_method(
             logger.error(error_msg)
             raise ValueError(error_msg)
         url = f"{base_url}/{hero_id}/{endpoint.path}"
+        cache_key = f"{endpoint.path}:{hero_id}"
     elif endpoint == Endpoint.ID:
         if not hero_id:
             error_msg = "hero_id must be provided when fetching by ID"
             logger.error(error_msg)
             raise ValueError(error_msg)
         url = f"{base_url}/{hero_id}"
+        cache_key = f"{endpoint.path}:{hero_id}"
     else:
         error_msg = f"Unsupported endpoint: {endpoint}"
         logger.error(error_msg)
         raise ValueError(error_msg)
 
-    logger.debug(f"Constructed API URL: {url}")
-    response = requests.get(url)
-    logger.debug(f"API response status: {response.status_code}")
+    logger.debug("Constructed API URL: %s", url)
+
+    async def fetch() -> httpx.Response:
+        with stage_timer("upstream.fetch"):
+            response = await upstream.get(url)
+        logger.debug("API response status: %s", response.status_code)
+        return response
+
+    with stage_timer("upstream.call"):
+        if not use_cache:
+            return await fetch()
+        return await upstream_cache.get_or_fetch(cache_key, fetch)
+
+
+def find_character(results: t.List[dict], name: str) -> t.Optional[dict]:
+    """Returns the search result whose name matches exactly (case-insensitive)."""
+    for result in results:
+        if result["name"].lower() == name.lower():
+            return result
+    return None
+
+
+def safe_float(value, default=0.0):
+    """Safely convert value to float, handling 'null' string and None cases."""
+    if value is None or str(value).lower() == "null":
+        return default
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return default
+
+
+def hero_values(character: dict) -> dict:
+    """Maps a superheroapi.com character payload onto Hero column values."""
+    powerstats = character.get("powerstats", {})
+    biography = character.get("biography", {})
+    image = character.get("image", {})
+    upstream_id = character.get("id")
+
+    return dict(
+        upstream_id=int(upstream_id) if upstream_id else None,
+        name=character.get("name", "").strip(),
+        intelligence=safe_float(powerstats.get("intelligence")),
+        strength=safe_float(powerstats.get("strength")),
+        speed=safe_float(powerstats.get("speed")),
+        power=safe_float(powerstats.get("power")),
+        full_name=biography.get("full-name", "").strip(),
+        publisher=biography.get("publisher", "").strip(),
+        alignment=biography.get("alignment", "").strip(),
+        image_url=image.get("url", "").strip(),
+    )
+
 
-    return response
+# every Hero column, selected as plain rows rather than ORM instances
+HERO_COLUMNS = [getattr(Hero, column.key) for column in Hero.__table__.columns]
 
 
-def apply_json_filters(query, filters):
+def parse_fields(fields: str) -> t.List[t.Any]:
     """
-    Applies JSON-based filters to SQLAlchemy query.
-
-    Supported operators:
-    - eq: Equal to
-    - gte: Greater than or equal
-    - lte: Less than or equal
-
-    Example input:
-    {
-        "power": {"gte": 90},
-        "speed": {"lte": 50}
-    }
+    Turns a comma-separated `fields=` value into Hero columns to select.
+
+    `id` is always included since it is the pagination cursor.
+
+    Raises:
+        ValueError: If a field is not a Hero column
     """
-    for field, conditions in filters.items():
-        column = getattr(Hero, field, None)
-        if not column:
-            continue
-        for op, value in conditions.items():
-            if op == "eq":
-                query = query.filter(column == value)
-            elif op == "gte":
-                query = query.filter(column >= value)
-            elif op == "lte":
-                query = query.filter(column <= value)
-    return query
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    keys = {column.key for column in HERO_COLUMNS}
+    unknown = [name for name in names if name not in keys]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    columns = [Hero.id]
+    for name in names:
+        column = getattr(Hero, name)
+        if column not in columns:
+            columns.append(column)
+    return columns
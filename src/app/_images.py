@@ -0,0 +1,392 @@
+"""
+Disk cache of hero images and their thumbnails, behind GET /hero/{id}/image.
+
+Files are content-addressed: ``blobs/ab/ab12....jpg`` is named after the
+SHA-256 of its bytes, which doubles as a strong ETag, and ``refs/<key>``
+maps an (image URL, size) pair to its blob. An image that changes upstream
+gets new files; identical images share one. Each original is downloaded
+once and thumbnails are made from the cached copy.
+
+Blobs are evicted least recently used once they add up to
+IMAGE_CACHE_MAX_BYTES, together with the refs to them. Workers share the
+directory but each tracks the blobs it has seen, so a ref whose blob another
+worker evicted is a miss; dangling refs are removed at startup. Responses
+stream from a file opened before they start, which outlives eviction. All
+file-system work runs in the threadpool, off the event loop.
+"""
+
+import os
+import asyncio
+import contextlib
+import hashlib
+import mimetypes
+import tempfile
+import typing as t
+from collections import OrderedDict
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+
+from src.db.models import Hero
+from src.config.settings import settings
+from src.db.data_base import SessionFactory
+from src.app._events import on_heroes_changed
+from src.app._metrics import stage_timer
+from src.app._singleflight import SingleFlight
+from src.app._upstream import get_upstream_client
+from src.utils.custom_logger import get_logger
+
+logger = get_logger(__name__)
+
+ORIGINAL = "original"
+# SingleFlight key of the startup scan; image keys are hex digests
+_SCAN = "scan"
+_CHUNK_SIZE = 64 * 1024
+
+
+class ImageError(Exception):
+    """Raised when upstream sends something that is not a usable image."""
+
+
+class CachedImage(t.NamedTuple):
+    path: str
+    digest: str
+    media_type: str
+    size: int
+
+
+class ImageCache:
+    def __init__(self, directory: str, max_bytes: int, sizes: t.Dict[str, int]):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.sizes = sizes
+        self._blobs: "OrderedDict[str, int]" = OrderedDict()
+        # blob path -> keys of the refs to it seen by this worker
+        self._refs: t.Dict[str, t.Set[str]] = {}
+        self._bytes = 0
+        self._scanned = False
+        self._flight = SingleFlight()
+        self._prefetches: t.Set[asyncio.Task] = set()
+
+    async def get(self, url: str, size: str = ORIGINAL) -> CachedImage:
+        """
+        The cached image for `url` at `size`, downloading or resizing it first
+        if needed; concurrent misses for the same image share the work.
+
+        Raises:
+            ImageError: If upstream did not send a usable image
+            httpx.HTTPError: If the download failed
+        """
+        key = hashlib.sha256(f"{url}\n{size}".encode()).hexdigest()
+        cached = await self._lookup(key)
+        if cached is not None:
+            return cached
+        return await self._flight.do(key, lambda: self._fill(url, size, key))
+
+    async def open(
+        self, url: str, size: str = ORIGINAL
+    ) -> t.Tuple[CachedImage, t.BinaryIO]:
+        """
+        Like `get`, with the blob opened for reading. The open file can still
+        be read after the blob is evicted, so responses should be sent from it
+        rather than the path.
+        """
+        image = await self.get(url, size)
+        try:
+            return image, await run_in_threadpool(open, image.path, "rb")
+        except FileNotFoundError:
+            # evicted since, so the ref is now a miss and this stores it again
+            image = await self.get(url, size)
+            return image, await run_in_threadpool(open, image.path, "rb")
+
+    async def _lookup(self, key: str) -> t.Optional[CachedImage]:
+        found = await run_in_threadpool(self._read_ref, key)
+        if found is None:
+            return None
+        path, size = found
+        await self._use(path, size, key)
+        return self._image(path, size)
+
+    def _read_ref(self, key: str) -> t.Optional[t.Tuple[str, int]]:
+        """Runs in a thread: the blob `key` refers to and its size, if both exist."""
+        path = self._ref_target(key)
+        if path is None:
+            return None
+        try:
+            return path, os.stat(path).st_size
+        except FileNotFoundError:
+            return None
+
+    async def _fill(self, url: str, size: str, key: str) -> CachedImage:
+        if size == ORIGINAL:
+            with stage_timer("image.download"):
+                image = await self._download(url)
+        else:
+            original = await self.get(url, ORIGINAL)
+            with stage_timer("image.resize"):
+                async with self._temporary() as file:
+                    digest = await run_in_threadpool(
+                        self._resize, original.path, self.sizes[size], file
+                    )
+                    image = await self._store(
+                        file.name, digest, os.path.splitext(original.path)[1]
+                    )
+        await run_in_threadpool(self._write_ref, key, os.path.basename(image.path))
+        self._add_ref(image.path, key)
+        return image
+
+    async def _download(self, url: str) -> CachedImage:
+        """Streams the image to disk, hashing it on the way; never held in memory."""
+        async with get_upstream_client().stream("GET", url) as response:
+            response.raise_for_status()
+            media_type = response.headers.get("content-type", "").split(";")[0]
+            if not media_type.startswith("image/"):
+                raise ImageError(f"Not an image: {media_type or 'no content type'}")
+            digest, received = hashlib.sha256(), 0
+            async with self._temporary() as file:
+                async for chunk in response.aiter_bytes(_CHUNK_SIZE):
+                    received += len(chunk)
+                    if received > settings.IMAGE_MAX_BYTES:
+                        raise ImageError(
+                            f"Image larger than {settings.IMAGE_MAX_BYTES} bytes"
+                        )
+                    digest.update(chunk)
+                    await run_in_threadpool(file.write, chunk)
+                await run_in_threadpool(file.flush)
+                extension = mimetypes.guess_extension(media_type) or ""
+                return await self._store(file.name, digest.hexdigest(), extension)
+
+    @staticmethod
+    def _resize(path: str, max_side: int, file: t.IO[bytes]) -> str:
+        """
+        Runs in a thread: writes the original scaled down to fit `max_side`
+        pixels, in its own format, to `file`; returns the SHA-256 written.
+        """
+        try:
+            from PIL import Image
+        except ImportError as e:
+            raise RuntimeError("Resizing images requires the 'Pillow' package") from e
+
+        try:
+            with Image.open(path) as image:
+                image_format = image.format
+                if image_format == "JPEG" and image.mode not in ("RGB", "L"):
+                    image = image.convert("RGB")
+                image.thumbnail((max_side, max_side))
+                image.save(file, format=image_format, optimize=True)
+            file.flush()
+        # UnidentifiedImageError is an OSError, as are truncated files
+        except (OSError, ValueError, Image.DecompressionBombError) as e:
+            raise ImageError(f"Cannot resize image: {e}") from e
+
+        digest = hashlib.sha256()
+        with open(file.name, "rb") as resized:
+            for chunk in iter(lambda: resized.read(_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @contextlib.asynccontextmanager
+    async def _temporary(self) -> t.AsyncIterator[t.IO[bytes]]:
+        """A file in the cache directory, so storing it is a rename; else removed."""
+        file = await run_in_threadpool(self._open_temporary)
+        try:
+            yield file
+        finally:
+            await run_in_threadpool(self._discard, file)
+
+    def _open_temporary(self) -> t.IO[bytes]:
+        directory = self._path("tmp")
+        os.makedirs(directory, exist_ok=True)
+        return tempfile.NamedTemporaryFile(dir=directory, delete=False)
+
+    @staticmethod
+    def _discard(file: t.IO[bytes]) -> None:
+        file.close()
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(file.name)
+
+    async def _store(self, temporary: str, digest: str, extension: str) -> CachedImage:
+        name = digest + extension
+        path = self._path("blobs", name[:2], name)
+        size = await run_in_threadpool(self._place, temporary, path)
+        await self._use(path, size)
+        await self._evict(keep=path)
+        return self._image(path, size)
+
+    @staticmethod
+    def _place(temporary: str, path: str) -> int:
+        """Runs in a thread: moves the file to `path`; returns its size."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # same name, same bytes: replacing a blob another worker stored is harmless
+        os.replace(temporary, path)
+        return os.stat(path).st_size
+
+    def _write_ref(self, key: str, name: str) -> None:
+        path = self._path("refs", key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w") as ref:
+            ref.write(name)
+        os.replace(temporary, path)
+
+    async def _use(self, path: str, size: int, key: t.Optional[str] = None) -> None:
+        await self._scan()
+        if path in self._blobs:
+            self._blobs.move_to_end(path)
+        else:
+            self._blobs[path] = size
+            self._bytes += size
+        if key is not None:
+            self._add_ref(path, key)
+
+    def _add_ref(self, path: str, key: str) -> None:
+        # a blob evicted meanwhile is not tracked; its ref is a miss
+        if path in self._blobs:
+            self._refs.setdefault(path, set()).add(key)
+
+    async def _scan(self) -> None:
+        """Picks up blobs and refs left by earlier runs, oldest blobs first."""
+        if self._scanned:
+            return
+        blobs, refs = await self._flight.do(
+            _SCAN, lambda: run_in_threadpool(self._walk)
+        )
+        # whoever resumes first records them
+        if self._scanned:
+            return
+        self._scanned = True
+        for path, size in blobs:
+            self._blobs[path] = size
+            self._bytes += size
+        for key, path in refs:
+            self._add_ref(path, key)
+
+    def _walk(self) -> t.Tuple[t.List[t.Tuple[str, int]], t.List[t.Tuple[str, str]]]:
+        """
+        Runs in a thread: the blobs on disk and their sizes, oldest first, and
+        the (key, blob path) of each ref; refs to missing blobs are removed.
+        """
+        found = []
+        for root, _, names in os.walk(self._path("blobs")):
+            for name in names:
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                found.append((stat.st_mtime, path, stat.st_size))
+        refs = []
+        for _, _, keys in os.walk(self._path("refs")):
+            for key in keys:
+                path = None if key.endswith(".tmp") else self._ref_target(key)
+                if path is None:
+                    continue
+                if os.path.exists(path):
+                    refs.append((key, path))
+                else:
+                    self._remove_ref(key, os.path.basename(path))
+        return [(path, size) for _, path, size in sorted(found)], refs
+
+    def _ref_target(self, key: str) -> t.Optional[str]:
+        """Runs in a thread: the path of the blob ref `key` names, if it exists."""
+        try:
+            with open(self._path("refs", key)) as ref:
+                name = ref.read()
+        except FileNotFoundError:
+            return None
+        return self._path("blobs", name[:2], name)
+
+    def _remove_ref(self, key: str, name: str) -> None:
+        """Runs in a thread: removes ref `key` if it still names blob `name`."""
+        path = self._ref_target(key)
+        # another worker may have pointed it at a newer blob since
+        if path is not None and os.path.basename(path) == name:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self._path("refs", key))
+
+    async def _evict(self, keep: str) -> None:
+        evicted = []
+        while self._bytes > self.max_bytes and len(self._blobs) > 1:
+            path, size = next(iter(self._blobs.items()))
+            if path == keep:
+                self._blobs.move_to_end(path)
+                continue
+            del self._blobs[path]
+            self._bytes -= size
+            evicted.append((path, self._refs.pop(path, set())))
+        if evicted:
+            await run_in_threadpool(self._remove, evicted)
+
+    def _remove(self, evicted: t.List[t.Tuple[str, t.Set[str]]]) -> None:
+        """Runs in a thread: removes blobs and the refs to them."""
+        for path, keys in evicted:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+            for key in keys:
+                self._remove_ref(key, os.path.basename(path))
+            logger.debug("Evicted image %s", path)
+
+    def _path(self, *parts: str) -> str:
+        return os.path.join(self.directory, *parts)
+
+    def _image(self, path: str, size: int) -> CachedImage:
+        name = os.path.basename(path)
+        media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        return CachedImage(path, os.path.splitext(name)[0], media_type, size)
+
+    def prefetch(self, hero_ids: t.Sequence[int]) -> None:
+        """Warms the cache for these heroes in the background."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(self._prefetch(hero_ids))
+        self._prefetches.add(task)
+        task.add_done_callback(self._prefetches.discard)
+
+    async def _prefetch(self, hero_ids: t.Sequence[int]) -> None:
+        async with SessionFactory() as db:
+            urls = (
+                await db.scalars(
+                    select(Hero.image_url).where(
+                        Hero.id.in_(list(hero_ids)), Hero.image_url != ""
+                    )
+                )
+            ).all()
+        semaphore = asyncio.Semaphore(settings.IMAGE_PREFETCH_CONCURRENCY)
+
+        async def warm(url: str) -> None:
+            async with semaphore:
+                for size in settings.IMAGE_PREFETCH_SIZES:
+                    try:
+                        await self.get(url, size)
+                    except Exception as e:
+                        logger.warning("Prefetching %s (%s) failed: %s", url, size, e)
+                        return
+
+        await asyncio.gather(*(warm(url) for url in urls if url))
+
+    async def close(self) -> None:
+        """Cancels prefetches still running."""
+        for task in list(self._prefetches):
+            task.cancel()
+        await asyncio.gather(*self._prefetches, return_exceptions=True)
+
+
+async def read_chunks(file: t.BinaryIO) -> t.AsyncIterator[bytes]:
+    """Reads `file` in chunks in the threadpool, then closes it."""
+    try:
+        while chunk := await run_in_threadpool(file.read, _CHUNK_SIZE):
+            yield chunk
+    finally:
+        await run_in_threadpool(file.close)
+
+
+image_cache = ImageCache(
+    directory=settings.IMAGE_CACHE_DIR,
+    max_bytes=settings.IMAGE_CACHE_MAX_BYTES,
+    sizes=settings.IMAGE_SIZES,
+)
+
+
+@on_heroes_changed
+def _prefetch_images(hero_ids: t.Sequence[int]) -> None:
+    if settings.IMAGE_PREFETCH and hero_ids:
+        image_cache.prefetch(hero_ids)
@@ -0,0 +1,98 @@
+import asyncio
+import typing as t
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+
+from src.config.settings import settings
+from src.db.data_base import SessionFactory, engine
+from src.app._upstream import close_upstream_client, get_upstream_client
+from src.app._cache import hero_list_cache
+from src.app._columnar import hero_index
+from src.app._images import image_cache
+from src.app._static import ui_page
+from src.utils.custom_logger import flush, get_logger
+
+logger = get_logger(__name__)
+
+# true between a completed startup() and the start of shutdown()
+_ready = False
+_version_watch: t.Optional[asyncio.Task] = None
+
+
+def is_ready() -> bool:
+    return _ready
+
+
+async def check_db() -> t.Optional[str]:
+    """Runs `SELECT 1`; returns None if the database answered, else the error."""
+    try:
+        async with engine.connect() as conn:
+            await asyncio.wait_for(
+                conn.execute(text("SELECT 1")), settings.DB_HEALTH_TIMEOUT
+            )
+    except asyncio.TimeoutError:
+        return "timed out"
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+    return None
+
+
+async def _warm_db() -> None:
+    """Opens DB_POOL_WARMUP pooled connections, so first requests skip connecting."""
+
+    async def ping():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    await asyncio.gather(*(ping() for _ in range(settings.DB_POOL_WARMUP)))
+
+
+async def _heroes_version() -> int:
+    async with engine.connect() as conn:
+        return await conn.scalar(text("SELECT last_value FROM heroes_version"))
+
+
+async def startup() -> None:
+    """
+    Warms the worker before it takes traffic.
+
+    A database that is down is logged, not fatal: the worker starts and
+    /readyz reports it until the database answers.
+    """
+    global _ready, _version_watch
+    get_upstream_client()
+    await run_in_threadpool(ui_page.render)
+    try:
+        await _warm_db()
+        if settings.HERO_READ_ENGINE == "memory":
+            async with SessionFactory() as db:
+                await hero_index.columns(db)
+    except Exception as e:
+        logger.warning("Warm-up failed: %s", e)
+    if settings.RESPONSE_CACHE_VERSION_INTERVAL > 0:
+        _version_watch = asyncio.create_task(
+            hero_list_cache.watch(
+                _heroes_version, settings.RESPONSE_CACHE_VERSION_INTERVAL
+            )
+        )
+    _ready = True
+    logger.info("Worker ready")
+
+
+async def shutdown() -> None:
+    """
+    Stops reporting ready and watching for writes, then closes the upstream
+    client and DB pool.
+    """
+    global _ready, _version_watch
+    _ready = False
+    if _version_watch is not None:
+        _version_watch.cancel()
+        await asyncio.gather(_version_watch, return_exceptions=True)
+        _version_watch = None
+    await image_cache.close()
+    await close_upstream_client()
+    await engine.dispose()
+    logger.info("Worker stopped")
+    flush()
@@ -0,0 +1,130 @@
+"""
+Head-to-head matchup scores between two sets of heroes, from their powerstats.
+
+The score of `a` against `b` is the weighted share of powerstats `a` is
+expected to win, each stat won on a logistic curve over the difference:
+
+    score(a, b) = sum(w_s * sigmoid((a_s - b_s) / scale)) / sum(w_s)
+
+so 0.5 is an even matchup, and score(b, a) = 1 - score(a, b). Scores are
+computed for a block of left heroes against the whole right set at a time,
+as one (rows, right, 4) array, so memory stays around MATCHUP_BLOCK pairs
+whatever the size of the sets.
+"""
+
+import typing as t
+
+import numpy as np
+
+from src.app._columnar import POWERSTATS
+
+# pairs scored per block: a few (rows, right) float32 arrays of about 4 MB each
+MATCHUP_BLOCK = 1_000_000
+
+# exponents are clipped to this, so float32 exp() neither overflows nor hits 0
+_MAX_EXPONENT = 80.0
+
+
+def weight_vector(weights: t.Mapping[str, float]) -> np.ndarray:
+    """Weights in POWERSTATS order, normalized to sum to 1."""
+    vector = np.array([weights[stat] for stat in POWERSTATS], dtype=np.float64)
+    return vector / vector.sum()
+
+
+def _exponentials(
+    left: np.ndarray, right: np.ndarray, scale: float
+) -> t.Tuple[np.ndarray, np.ndarray]:
+    """exp(stat / scale) for both sets, centred per stat to stay in float32 range."""
+    both = np.concatenate([left, right])
+    centre = (both.min(axis=0) + both.max(axis=0)) / 2 if len(both) else 0.0
+
+    def exp(vectors):
+        exponent = np.clip((vectors - centre) / scale, -_MAX_EXPONENT, _MAX_EXPONENT)
+        return np.exp(exponent).astype(np.float32)
+
+    return exp(left), exp(right)
+
+
+def _score_block(
+    left: np.ndarray, right: np.ndarray, weights: np.ndarray
+) -> np.ndarray:
+    # sigmoid((a - b) / scale) = exp(a / scale) / (exp(a / scale) + exp(b / scale)):
+    # one add and one divide per pair and stat, instead of an exp
+    scores = np.zeros((len(left), len(right)), np.float32)
+    share = np.empty_like(scores)
+    for stat, weight in enumerate(weights):
+        if weight:
+            mine = left[:, stat, None]
+            np.add(mine, right[None, :, stat], out=share)
+            np.divide(mine * np.float32(weight), share, out=share)
+            scores += share
+    return scores
+
+
+def score_blocks(
+    left: np.ndarray, right: np.ndarray, weights: np.ndarray, scale: float
+) -> t.Iterator[t.Tuple[int, np.ndarray]]:
+    """
+    Yields (first left row, scores) for consecutive blocks of left heroes,
+    scores being a (rows, len(right)) float32 array.
+    """
+    left, right = _exponentials(left, right, scale)
+    block = max(1, MATCHUP_BLOCK // max(1, len(right)))
+    for start in range(0, len(left), block):
+        yield start, _score_block(left[start : start + block], right, weights)
+
+
+def top_matchups(
+    left_ids: np.ndarray,
+    left: np.ndarray,
+    right_ids: np.ndarray,
+    right: np.ndarray,
+    weights: np.ndarray,
+    scale: float,
+    top: int,
+) -> t.List[t.Tuple[int, int, float]]:
+    """
+    The `top` highest-scoring (left id, right id, score) pairs, best first.
+
+    A hero is never matched against itself. Each block only partially sorts
+    the pairs that can still make the cut: those scoring at least as well as
+    the worst pair kept so far, and as the top-th best of a strided sample.
+    """
+    # (left row, right row) of heroes present in both sets
+    _, same_left, same_right = np.intersect1d(
+        left_ids, right_ids, assume_unique=True, return_indices=True
+    )
+    kept_scores = np.empty(0, np.float32)
+    kept_left = np.empty(0, np.int64)
+    kept_right = np.empty(0, np.int64)
+    for start, scores in score_blocks(left, right, weights, scale):
+        in_block = (same_left >= start) & (same_left < start + len(scores))
+        scores[same_left[in_block] - start, same_right[in_block]] = -np.inf
+
+        flat = scores.ravel()
+        floor = kept_scores.min() if len(kept_scores) == top else -np.inf
+        sample = flat[:: max(1, int(np.sqrt(len(flat) / top)))]
+        if len(sample) > top:
+            # the top-th best of a sample is a lower bound for the top-th best
+            floor = max(floor, np.partition(sample, len(sample) - top)[-top])
+        best = np.flatnonzero(flat >= floor)
+        if len(best) > top:
+            best = best[np.argpartition(flat[best], len(best) - top)[-top:]]
+        best = best[np.isfinite(flat[best])]
+
+        kept_scores = np.concatenate([kept_scores, flat[best]])
+        kept_left = np.concatenate([kept_left, start + best // len(right)])
+        kept_right = np.concatenate([kept_right, best % len(right)])
+        if len(kept_scores) > top:
+            keep = np.argpartition(kept_scores, len(kept_scores) - top)[-top:]
+            kept_scores, kept_left, kept_right = (
+                kept_scores[keep],
+                kept_left[keep],
+                kept_right[keep],
+            )
+
+    pair_left, pair_right = left_ids[kept_left], right_ids[kept_right]
+    order = np.lexsort((pair_right, pair_left, -kept_scores))
+    return [
+        (int(pair_left[i]), int(pair_right[i]), float(kept_scores[i])) for i in order
+    ]
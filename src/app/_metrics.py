@@ -0,0 +1,153 @@
+import os
+import time
+import typing as t
+from functools import lru_cache
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Histogram
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.multiprocess import MultiProcessCollector
+
+
+# superheroapi.com client, see src/app/_resilience.py
+UPSTREAM_REQUESTS = Counter(
+    "superhero_upstream_requests_total",
+    "Upstream calls by outcome: ok, error_status, transport_error, rejected",
+    ["outcome"],
+)
+UPSTREAM_RETRIES = Counter(
+    "superhero_upstream_retries_total", "Upstream calls retried after a failure"
+)
+UPSTREAM_CIRCUIT_OPENED = Counter(
+    "superhero_upstream_circuit_opened_total", "Times the upstream circuit opened"
+)
+UPSTREAM_RATE_LIMIT_WAIT = Counter(
+    "superhero_upstream_rate_limit_wait_seconds_total",
+    "Time spent waiting for the upstream rate limiter",
+)
+UPSTREAM_CACHE_LOOKUPS = Counter(
+    "superhero_upstream_cache_lookups_total",
+    "Upstream response cache lookups by result: local_hit, shared_hit, miss",
+    ["result"],
+)
+
+# request path
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REQUEST_LATENCY = Histogram(
+    "superhero_http_request_duration_seconds",
+    "HTTP request latency by route template, method and status",
+    ["route", "method", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+STAGE_LATENCY = Histogram(
+    "superhero_stage_duration_seconds",
+    "Latency of one stage of a request, e.g. create_hero.upstream",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+
+
+@lru_cache(maxsize=None)
+def _stage(name: str):
+    return STAGE_LATENCY.labels(stage=name)
+
+
+def stage_timer(name: str):
+    """Context manager recording how long one stage of a request took."""
+    return _stage(name).time()
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording REQUEST_LATENCY for every HTTP request.
+
+    Requests are labelled with the matched route template rather than the
+    raw path, so ids and query strings do not create new series.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            REQUEST_LATENCY.labels(
+                route=route.path if route is not None else "other",
+                method=scope["method"],
+                status=status,
+            ).observe(time.perf_counter() - started)
+
+
+# collectors read at scrape time from the process serving /metrics
+_live_collectors: t.List[t.Any] = []
+
+
+def register_live(collector) -> None:
+    """Registers a collector of per-process state, such as a pool or breaker."""
+    REGISTRY.register(collector)
+    _live_collectors.append(collector)
+
+
+def metrics_registry() -> CollectorRegistry:
+    """
+    The registry to expose on /metrics.
+
+    With several workers (PROMETHEUS_MULTIPROC_DIR set), counters and
+    histograms are merged from every worker's files; live collectors report
+    the worker that answers the scrape.
+    """
+    if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        return REGISTRY
+    registry = CollectorRegistry()
+    MultiProcessCollector(registry)
+    for collector in _live_collectors:
+        registry.register(collector)
+    return registry
+
+
+class PoolCollector:
+    """Reports SQLAlchemy pool usage at scrape time, at no cost per request."""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def collect(self) -> t.Iterator[GaugeMetricFamily]:
+        for name, documentation, value in (
+            ("size", "Configured pool size", self.pool.size()),
+            ("checked_out", "Connections checked out", self.pool.checkedout()),
+            ("checked_in", "Idle connections in the pool", self.pool.checkedin()),
+            ("overflow", "Connections open beyond pool size", self.pool.overflow()),
+        ):
+            yield GaugeMetricFamily(
+                f"superhero_db_pool_{name}", documentation, value=value
+            )
+
+
+class CircuitCollector:
+    """Reports a circuit breaker's state at scrape time."""
+
+    STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+    def __init__(self, breaker):
+        self.breaker = breaker
+
+    def collect(self) -> t.Iterator[GaugeMetricFamily]:
+        yield GaugeMetricFamily(
+            "superhero_upstream_circuit_state",
+            "Upstream circuit breaker state: 0 closed, 1 half-open, 2 open",
+            value=self.STATES[self.breaker.state],
+        )
@@ -0,0 +1,246 @@
+import time
+import asyncio
+import typing as t
+
+import httpx
+from tenacity import (
+    AsyncRetrying,
+    retry_if_exception_type,
+    retry_if_result,
+    stop_after_attempt,
+    stop_after_delay,
+    wait_random_exponential,
+)
+
+from src.config.settings import settings
+from src.app._upstream import get_upstream_client
+from src.app._metrics import (
+    UPSTREAM_CIRCUIT_OPENED,
+    UPSTREAM_RATE_LIMIT_WAIT,
+    UPSTREAM_REQUESTS,
+    UPSTREAM_RETRIES,
+    CircuitCollector,
+    register_live,
+)
+from src.utils.custom_logger import get_logger
+
+logger = get_logger(__name__)
+
+# upstream is overloaded or briefly broken: retry, and count towards the breaker
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class UpstreamUnavailable(httpx.HTTPError):
+    """
+    Raised without calling upstream, when the breaker or rate limiter refuses
+    or no pooled connection frees up in time.
+    """
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter: `rate` calls per second, bursts up to `burst`.
+
+    Callers take a token up front and sleep off any deficit, so concurrent
+    callers queue in arrival order. A caller that would wait longer than
+    `max_wait` is refused instead. A `rate` of 0 disables the limiter.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        max_wait: float,
+        clock: t.Callable[[], float] = time.monotonic,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.max_wait = max_wait
+        self.clock = clock
+        self.tokens = float(burst)
+        self.updated = clock()
+
+    def reserve(self) -> float:
+        """Takes a token and returns how long the caller must wait for it."""
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        wait = max(0.0, (1 - self.tokens) / self.rate)
+        if wait > self.max_wait:
+            raise UpstreamUnavailable("Upstream rate limit exceeded", retry_after=wait)
+        self.tokens -= 1
+        return wait
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        wait = self.reserve()
+        if wait:
+            UPSTREAM_RATE_LIMIT_WAIT.inc(wait)
+            await asyncio.sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    Fails fast while upstream is unhealthy.
+
+    After `failure_threshold` consecutive failures the circuit opens and calls
+    are refused for `reset_timeout` seconds. It then lets a single probe
+    through (half-open): success closes the circuit, failure re-opens it.
+    """
+
+    CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+
+    def __init__(
+        self,
+        failure_threshold: int,
+        reset_timeout: float,
+        clock: t.Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self._opened_at: t.Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        if self.clock() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def before_call(self) -> None:
+        state = self.state
+        if state == self.CLOSED:
+            return
+        if state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return
+        retry_after = max(0.0, self._opened_at + self.reset_timeout - self.clock())
+        raise UpstreamUnavailable(
+            "superheroapi.com is unavailable, circuit open",
+            retry_after=retry_after or self.reset_timeout,
+        )
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._probing or self.failures >= self.failure_threshold:
+            if self._opened_at is None:
+                UPSTREAM_CIRCUIT_OPENED.inc()
+                logger.warning(
+                    "Upstream circuit opened after %d failures", self.failures
+                )
+            self._opened_at = self.clock()
+        self._probing = False
+
+    def release(self) -> None:
+        """Gives back a half-open probe whose call ended without an outcome."""
+        self._probing = False
+
+
+class ResilientUpstream:
+    """
+    GETs on the shared upstream client with rate limiting, a circuit breaker
+    and retries with jittered exponential backoff.
+
+    Transport errors and RETRYABLE_STATUSES are retried up to `attempts`
+    times within `deadline` seconds; after that the last response is returned
+    or the last error raised. Refusals by the breaker or limiter, and waits
+    for a connection from the full local pool that time out, raise
+    UpstreamUnavailable and are not retried; none count towards the breaker.
+    """
+
+    def __init__(
+        self,
+        limiter: TokenBucket,
+        breaker: CircuitBreaker,
+        attempts: int,
+        backoff: float,
+        max_backoff: float,
+        deadline: float,
+    ):
+        self.limiter = limiter
+        self.breaker = breaker
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.deadline = deadline
+
+    async def get(self, url: str) -> httpx.Response:
+        retrying = AsyncRetrying(
+            stop=stop_after_attempt(self.attempts) | stop_after_delay(self.deadline),
+            wait=wait_random_exponential(multiplier=self.backoff, max=self.max_backoff),
+            retry=(
+                retry_if_exception_type(httpx.TransportError)
+                | retry_if_result(lambda r: r.status_code in RETRYABLE_STATUSES)
+            ),
+            before_sleep=lambda _: UPSTREAM_RETRIES.inc(),
+            retry_error_callback=lambda state: state.outcome.result(),
+        )
+        return await retrying(self._attempt, url)
+
+    async def _attempt(self, url: str) -> httpx.Response:
+        try:
+            self.breaker.before_call()
+        except UpstreamUnavailable:
+            UPSTREAM_REQUESTS.labels(outcome="rejected").inc()
+            raise
+        try:
+            await self.limiter.acquire()
+            response = await get_upstream_client().get(url)
+        except httpx.PoolTimeout as e:
+            # our own connection pool is full, which says nothing about upstream
+            self.breaker.release()
+            UPSTREAM_REQUESTS.labels(outcome="rejected").inc()
+            raise UpstreamUnavailable(
+                "Too many concurrent calls to superheroapi.com",
+                retry_after=settings.API_POOL_TIMEOUT,
+            ) from e
+        except httpx.TransportError:
+            self.breaker.record_failure()
+            UPSTREAM_REQUESTS.labels(outcome="transport_error").inc()
+            raise
+        except BaseException as e:
+            self.breaker.release()
+            if isinstance(e, UpstreamUnavailable):
+                UPSTREAM_REQUESTS.labels(outcome="rejected").inc()
+            raise
+
+        if response.status_code in RETRYABLE_STATUSES:
+            self.breaker.record_failure()
+            UPSTREAM_REQUESTS.labels(outcome="error_status").inc()
+        else:
+            self.breaker.record_success()
+            UPSTREAM_REQUESTS.labels(outcome="ok").inc()
+        return response
+
+
+upstream = ResilientUpstream(
+    limiter=TokenBucket(
+        rate=settings.API_RATE_LIMIT,
+        burst=settings.API_RATE_BURST,
+        max_wait=settings.API_RATE_MAX_WAIT,
+    ),
+    breaker=CircuitBreaker(
+        failure_threshold=settings.API_CIRCUIT_FAILURES,
+        reset_timeout=settings.API_CIRCUIT_RESET,
+    ),
+    attempts=settings.API_RETRY_ATTEMPTS,
+    backoff=settings.API_RETRY_BACKOFF,
+    max_backoff=settings.API_RETRY_MAX_BACKOFF,
+    deadline=settings.API_RETRY_DEADLINE,
+)
+
+register_live(CircuitCollector(upstream.breaker))
@@ -0,0 +1,35 @@
+from sqlalchemy import case, func, or_, select
+
+from src.db.models import Hero
+from src.app._helpers import HERO_COLUMNS
+
+
+def _prefix_pattern(q: str) -> str:
+    escaped = q.replace("/", "//").replace("%", "/%").replace("_", "/_")
+    return f"{escaped}%"
+
+
+def search_query(q: str, limit: int):
+    """
+    Builds the ranked name search behind GET /hero/search.
+
+    Candidates are heroes whose `name` or `full_name` contains a word similar
+    to `q` (pg_trgm `%>`, i.e. word_similarity above the threshold) or whose
+    name starts with `q`. All three predicates are served by the trigram GIN
+    indexes. Rows are ranked by the best word similarity of the two columns,
+    plus 1 for a name prefix match so prefixes outrank typo matches.
+    """
+    prefix = Hero.name.ilike(_prefix_pattern(q), escape="/")
+    score = (
+        func.greatest(
+            func.word_similarity(q, Hero.name),
+            func.word_similarity(q, func.coalesce(Hero.full_name, "")),
+        )
+        + case((prefix, 1.0), else_=0.0)
+    ).label("score")
+    return (
+        select(*HERO_COLUMNS, score)
+        .where(or_(Hero.name.op("%>")(q), Hero.full_name.op("%>")(q), prefix))
+        .order_by(score.desc(), Hero.id)
+        .limit(limit)
+    )
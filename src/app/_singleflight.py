@@ -0,0 +1,54 @@
+import asyncio
+import typing as t
+
+
+class _Abandoned(Exception):
+    """Set on a call whose leader was cancelled, so a follower takes over."""
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls sharing a key.
+
+    The first caller for a key runs the work; callers arriving while it is
+    in flight await the same future and receive the same result or exception.
+
+    If the caller running the work is cancelled (e.g. its client went away),
+    the others are not: the first of them runs its own `fn` instead, and the
+    rest wait for that. The work is not moved to a background task because
+    `fn` may use resources of the request that started it, like its session.
+    """
+
+    def __init__(self):
+        self._calls: t.Dict[t.Hashable, asyncio.Future] = {}
+
+    async def do(
+        self, key: t.Hashable, fn: t.Callable[[], t.Awaitable[t.Any]]
+    ) -> t.Any:
+        while key in self._calls:
+            try:
+                return await asyncio.shield(self._calls[key])
+            except _Abandoned:
+                continue
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.set_exception(_Abandoned())
+            future.exception()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # followers re-raise it; don't warn when there were none
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+    def in_flight(self) -> int:
+        return len(self._calls)
@@ -0,0 +1,218 @@
+"""
+The UI page and its static assets, served from memory with validators.
+
+Assets up to STATIC_INLINE_MAX_BYTES are read once (again when their mtime or
+size changes) and compressed ahead of time with gzip and, when installed,
+brotli; each request then picks a variant by Accept-Encoding. The ETag is
+the SHA-256 of the content, tagged with the encoding, so If-None-Match gets
+a 304. The page links assets as ``/static/style.css?v=<hash>``: a request
+with the current hash may be cached forever, a bare one must revalidate.
+
+`index.html` is rendered once, and again when it or an asset it links
+changes, instead of on every request.
+"""
+
+import os
+import stat
+import hashlib
+import mimetypes
+import typing as t
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from starlette.templating import Jinja2Templates
+from starlette.types import Scope
+
+from src.config.settings import settings
+from src.app._cache import _etag_matches
+from src.app._compression import ENCODINGS, choose_encoding, compress
+from src.helpers.static_content import FRONTEND_ROOT, PUBLIC_ASSETS, templates
+from src.utils.custom_logger import get_logger
+
+logger = get_logger(__name__)
+
+REVALIDATE = "no-cache"
+VERSION_PARAM = "v"
+
+
+class Asset:
+    """One file's content and its precompressed variants, with validators."""
+
+    def __init__(self, body: bytes, media_type: str):
+        self.media_type = media_type
+        self.digest = hashlib.sha256(body).hexdigest()
+        self.version = self.digest[:16]
+        self.variants: t.Dict[t.Optional[str], bytes] = {None: body}
+        for encoding in ENCODINGS:
+            compressed = compress(body, encoding)
+            # tiny files can come out larger
+            if len(compressed) < len(body):
+                self.variants[encoding] = compressed
+
+    def etag(self, encoding: t.Optional[str]) -> str:
+        return f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+
+    def response(
+        self, request_headers: Headers, cache_control: str = REVALIDATE
+    ) -> Response:
+        """The best variant for the client, or a 304 if it has it already."""
+        encoding = choose_encoding(
+            request_headers.get("accept-encoding"),
+            [encoding for encoding in self.variants if encoding],
+        )
+        headers = {
+            "ETag": self.etag(encoding),
+            "Cache-Control": cache_control,
+            "Vary": "Accept-Encoding",
+        }
+        if_none_match = request_headers.get("if-none-match")
+        # any variant will do: they decode to the same bytes
+        if if_none_match and any(
+            _etag_matches(if_none_match, self.etag(variant))
+            for variant in self.variants
+        ):
+            return Response(status_code=304, headers=headers)
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(
+            self.variants[encoding], media_type=self.media_type, headers=headers
+        )
+
+
+class AssetStore:
+    """Assets by path, reloaded when a file's mtime or size changes."""
+
+    def __init__(self):
+        self._assets: t.Dict[str, t.Tuple[t.Tuple[int, int], Asset]] = {}
+
+    def load(self, path: str, stat_result: os.stat_result) -> Asset:
+        """Runs in a thread: reads and compresses the file unless it is cached."""
+        signature = (stat_result.st_mtime_ns, stat_result.st_size)
+        cached = self._assets.get(path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        with open(path, "rb") as file:
+            body = file.read()
+        media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        asset = Asset(body, media_type)
+        self._assets[path] = (signature, asset)
+        logger.debug("Loaded %s (%s)", path, ", ".join(map(str, asset.variants)))
+        return asset
+
+
+static_assets = AssetStore()
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles serving small files from `static_assets`: precompressed,
+    with content-hash ETags, and cached for STATIC_MAX_AGE when the request
+    names the current version. Larger files are streamed as usual.
+    """
+
+    async def check_config(self) -> None:
+        # a missing directory just has no files to serve: 404s, not errors;
+        # `check_dir` still makes a required one fail at startup
+        if os.path.exists(self.directory):
+            await super().check_config()
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if scope["method"] in ("GET", "HEAD"):
+            full_path, stat_result = await anyio.to_thread.run_sync(
+                self.lookup_path, path
+            )
+            if (
+                stat_result is not None
+                and stat.S_ISREG(stat_result.st_mode)
+                and stat_result.st_size <= settings.STATIC_INLINE_MAX_BYTES
+            ):
+                asset = await anyio.to_thread.run_sync(
+                    static_assets.load, full_path, stat_result
+                )
+                return asset.response(
+                    Headers(scope=scope), self._cache_control(scope, asset)
+                )
+        return await super().get_response(path, scope)
+
+    @staticmethod
+    def _cache_control(scope: Scope, asset: Asset) -> str:
+        query = dict(
+            param.partition("=")[::2]
+            for param in scope.get("query_string", b"").decode().split("&")
+        )
+        if query.get(VERSION_PARAM) == asset.version:
+            return f"public, max-age={settings.STATIC_MAX_AGE}, immutable"
+        return REVALIDATE
+
+    def url(self, prefix: str, name: str) -> str:
+        """`prefix/name?v=<version>`, for pages linking this file."""
+        full_path, stat_result = self.lookup_path(name)
+        if stat_result is None:
+            raise FileNotFoundError(f"No static file {name!r} in {self.directory}")
+        asset = static_assets.load(full_path, stat_result)
+        return f"{prefix}/{name}?{VERSION_PARAM}={asset.version}"
+
+
+class PrerenderedPage:
+    """
+    A template rendered to a precompressed `Asset` once, and again when the
+    template or a static file it links through ``static_url()`` changes.
+    """
+
+    def __init__(
+        self,
+        templates: Jinja2Templates,
+        name: str,
+        static: PrecompressedStaticFiles,
+        static_prefix: str,
+    ):
+        self.templates = templates
+        self.name = name
+        self.static = static
+        self.static_prefix = static_prefix
+        self._asset: t.Optional[Asset] = None
+        self._files: t.Dict[str, t.Tuple[int, int]] = {}
+
+    def _signature(self, path: str) -> t.Tuple[int, int]:
+        try:
+            stat_result = os.stat(path)
+        except FileNotFoundError:
+            return (0, 0)
+        return (stat_result.st_mtime_ns, stat_result.st_size)
+
+    def _stale(self) -> bool:
+        return self._asset is None or any(
+            self._signature(path) != signature
+            for path, signature in self._files.items()
+        )
+
+    def render(self) -> Asset:
+        """Renders the page if anything it is made of changed; blocking."""
+        if not self._stale():
+            return self._asset
+        template = self.templates.get_template(self.name)
+        files = {template.filename: self._signature(template.filename)}
+
+        def static_url(name: str) -> str:
+            full_path, _ = self.static.lookup_path(name)
+            files[full_path] = self._signature(full_path)
+            return self.static.url(self.static_prefix, name)
+
+        html = template.render(static_url=static_url)
+        self._asset = Asset(html.encode(), "text/html")
+        self._files = files
+        logger.info("Rendered %s (version %s)", self.name, self._asset.version)
+        return self._asset
+
+    async def response(self, request_headers: Headers) -> Response:
+        if self._stale():
+            await anyio.to_thread.run_sync(self.render)
+        return self._asset.response(request_headers)
+
+
+# the public directory is optional
+frontend_static = PrecompressedStaticFiles(directory=str(FRONTEND_ROOT))
+public_static = PrecompressedStaticFiles(directory=str(PUBLIC_ASSETS), check_dir=False)
+ui_page = PrerenderedPage(templates, "index.html", frontend_static, "/static")
@@ -0,0 +1,146 @@
+import typing as t
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import array
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.models import Hero, HeroStatsSummary
+
+
+POWERSTATS = ("intelligence", "strength", "speed", "power")
+PERCENTILES = (0.5, 0.9, 0.99)
+
+
+def _publisher_averages_live():
+    publisher = func.coalesce(Hero.publisher, "").label("publisher")
+    return (
+        select(
+            publisher,
+            func.count().label("hero_count"),
+            *(func.avg(getattr(Hero, stat)).label(stat) for stat in POWERSTATS),
+        )
+        .group_by(publisher)
+        .order_by(publisher)
+    )
+
+
+def _publisher_averages_summary():
+    hero_count = func.sum(HeroStatsSummary.hero_count)
+    return (
+        select(
+            HeroStatsSummary.publisher,
+            hero_count.label("hero_count"),
+            # divided by the non-NULL values only, as avg() does on the live path
+            *(
+                (
+                    func.sum(getattr(HeroStatsSummary, f"sum_{stat}"))
+                    / func.nullif(
+                        func.sum(getattr(HeroStatsSummary, f"count_{stat}")), 0
+                    )
+                ).label(stat)
+                for stat in POWERSTATS
+            ),
+        )
+        .group_by(HeroStatsSummary.publisher)
+        .order_by(HeroStatsSummary.publisher)
+    )
+
+
+def _alignment_counts_live():
+    alignment = func.coalesce(Hero.alignment, "").label("alignment")
+    return (
+        select(alignment, func.count().label("hero_count"))
+        .group_by(alignment)
+        .order_by(alignment)
+    )
+
+
+def _alignment_counts_summary():
+    return (
+        select(
+            HeroStatsSummary.alignment,
+            func.sum(HeroStatsSummary.hero_count).label("hero_count"),
+        )
+        .group_by(HeroStatsSummary.alignment)
+        .order_by(HeroStatsSummary.alignment)
+    )
+
+
+def _publisher_percentiles():
+    publisher = func.coalesce(Hero.publisher, "").label("publisher")
+    fractions = array(PERCENTILES)
+    return (
+        select(
+            publisher,
+            *(
+                func.percentile_cont(fractions)
+                .within_group(getattr(Hero, stat))
+                .label(stat)
+                for stat in POWERSTATS
+            ),
+        )
+        .group_by(publisher)
+        .order_by(publisher)
+    )
+
+
+def _top_by_power(top: int):
+    # "power IS NOT NULL ... ORDER BY power DESC" walks ix_heroes_power backwards
+    return (
+        select(Hero.id, Hero.name, Hero.publisher, Hero.power)
+        .where(Hero.power.is_not(None))
+        .order_by(Hero.power.desc(), Hero.id)
+        .limit(top)
+    )
+
+
+async def hero_stats(
+    db: AsyncSession, top: int, percentiles: bool, use_summary: bool
+) -> t.Dict[str, t.Any]:
+    """
+    Grouped hero statistics computed in the database.
+
+    Counts and averages come from the trigger-maintained summary table when
+    ``use_summary`` is set, so their cost does not depend on the number of
+    heroes. Percentiles need the full distribution and are always computed
+    from ``heroes``, only when asked for.
+    """
+    if use_summary:
+        averages_query = _publisher_averages_summary()
+        alignments_query = _alignment_counts_summary()
+    else:
+        averages_query = _publisher_averages_live()
+        alignments_query = _alignment_counts_live()
+
+    publishers = {
+        row.publisher: {
+            "publisher": row.publisher,
+            "count": row.hero_count,
+            "avg": {stat: getattr(row, stat) for stat in POWERSTATS},
+        }
+        for row in await db.execute(averages_query)
+    }
+
+    if percentiles:
+        for row in await db.execute(_publisher_percentiles()):
+            if row.publisher not in publishers:
+                continue
+            publishers[row.publisher]["percentiles"] = {
+                f"p{int(fraction * 100)}": {
+                    stat: (getattr(row, stat) or [None] * len(PERCENTILES))[index]
+                    for stat in POWERSTATS
+                }
+                for index, fraction in enumerate(PERCENTILES)
+            }
+
+    alignments = [
+        {"alignment": row.alignment, "count": row.hero_count}
+        for row in await db.execute(alignments_query)
+    ]
+    top_power = [row._asdict() for row in await db.execute(_top_by_power(top))]
+
+    return {
+        "publishers": list(publishers.values()),
+        "alignments": alignments,
+        "top_power": top_power,
+    }
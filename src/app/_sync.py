@@ -0,0 +1,188 @@
+import asyncio
+import typing as t
+
+import httpx
+from sqlalchemy import or_, tuple_, literal_column
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.models import Hero, SyncCheckpoint
+from src.config.settings import settings
+from src.app._events import heroes_changed
+from src.utils.custom_logger import get_logger
+from src.app._helpers import _call_api_method, Endpoint, hero_values
+
+
+logger = get_logger(__name__)
+
+SYNCED_COLUMNS = (
+    "upstream_id",
+    "intelligence",
+    "strength",
+    "speed",
+    "power",
+    "full_name",
+    "publisher",
+    "alignment",
+    "image_url",
+)
+
+
+async def _fetch(hero_id: int) -> t.Tuple[int, str, t.Optional[dict]]:
+    """Fetches one upstream character; status is "found", "missing" or "error"."""
+    try:
+        response = await _call_api_method(
+            endpoint=Endpoint.ID, hero_id=hero_id, use_cache=False
+        )
+    except httpx.HTTPError as e:
+        logger.warning("Sync: error fetching upstream id %s: %s", hero_id, e)
+        return hero_id, "error", None
+
+    if response.status_code != 200:
+        logger.warning(
+            "Sync: upstream id %s returned %s", hero_id, response.status_code
+        )
+        return hero_id, "error", None
+
+    data = response.json()
+    if data.get("response") == "error":
+        return hero_id, "missing", None
+
+    try:
+        values = hero_values(data)
+    except Exception as e:
+        logger.warning("Sync: skipping malformed upstream id %s: %s", hero_id, e)
+        return hero_id, "missing", None
+    return hero_id, "found", values if values["name"] else None
+
+
+async def _upsert(db: AsyncSession, rows: t.List[dict]) -> t.Tuple[int, int]:
+    """
+    Upserts a chunk keyed on name, rewriting only rows whose payload changed.
+
+    A name already owned by another upstream id (the API has repeats such as
+    several "Batman" characters) keeps its first owner instead of flapping.
+    Returns (inserted, updated).
+    """
+    stmt = insert(Hero).values(rows)
+    excluded = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Hero.name],
+        set_={column: excluded[column] for column in SYNCED_COLUMNS},
+        where=or_(Hero.upstream_id.is_(None), Hero.upstream_id == excluded.upstream_id)
+        & tuple_(*(Hero.__table__.c[c] for c in SYNCED_COLUMNS)).is_distinct_from(
+            tuple_(*(excluded[c] for c in SYNCED_COLUMNS))
+        ),
+    ).returning(Hero.id, literal_column("xmax = 0").label("inserted"))
+
+    written = (await db.execute(stmt)).all()
+    inserted = sum(1 for row in written if row.inserted)
+    return inserted, len(written) - inserted
+
+
+async def sync_catalog(
+    db: AsyncSession,
+    job: str = "catalog",
+    restart: bool = False,
+    concurrency: t.Optional[int] = None,
+    chunk_size: t.Optional[int] = None,
+    max_id: t.Optional[int] = None,
+) -> t.Dict[str, t.Any]:
+    """
+    Mirrors the superheroapi.com catalog into ``heroes`` by walking upstream ids.
+
+    Ids are fetched in chunks with bounded parallelism; each chunk is upserted
+    and the checkpoint advanced in the same transaction, so an interrupted run
+    resumes after the last committed chunk. The walk ends at ``max_id`` or after
+    SYNC_STOP_AFTER_MISSES consecutive unknown ids, and the checkpoint is then
+    reset for the next full pass. Upstream errors stop the run early with the
+    checkpoint left before the first failed id.
+    """
+    chunk_size = chunk_size or settings.SYNC_CHUNK_SIZE
+    semaphore = asyncio.Semaphore(concurrency or settings.SYNC_CONCURRENCY)
+
+    checkpoint = await db.get(SyncCheckpoint, job)
+    if checkpoint is None:
+        checkpoint = SyncCheckpoint(job=job, last_id=0)
+        db.add(checkpoint)
+    if restart:
+        checkpoint.last_id = 0
+
+    stats = {
+        "start_id": checkpoint.last_id + 1,
+        "fetched": 0,
+        "inserted": 0,
+        "updated": 0,
+        "unchanged": 0,
+        "missing": 0,
+        "errors": 0,
+        "completed": False,
+    }
+    logger.info("Sync '%s' starting at upstream id %s", job, stats["start_id"])
+
+    async def fetch(hero_id: int):
+        async with semaphore:
+            return await _fetch(hero_id)
+
+    consecutive_misses = 0
+    next_id = checkpoint.last_id + 1
+    while True:
+        last_id = next_id + chunk_size - 1
+        if max_id is not None:
+            last_id = min(last_id, max_id)
+        if last_id < next_id:
+            stats["completed"] = True
+            break
+
+        results = await asyncio.gather(
+            *(fetch(hero_id) for hero_id in range(next_id, last_id + 1))
+        )
+
+        rows, names, failed_id = [], set(), None
+        for hero_id, status, values in results:
+            if status == "error":
+                stats["errors"] += 1
+                failed_id = failed_id or hero_id
+                continue
+            if status == "missing" or values is None:
+                stats["missing"] += 1
+                consecutive_misses += 1
+                continue
+            consecutive_misses = 0
+            stats["fetched"] += 1
+            if values["name"] not in names:
+                names.add(values["name"])
+                rows.append(values)
+
+        try:
+            inserted = updated = 0
+            if rows:
+                inserted, updated = await _upsert(db, rows)
+                stats["inserted"] += inserted
+                stats["updated"] += updated
+                stats["unchanged"] += len(rows) - inserted - updated
+            checkpoint.last_id = failed_id - 1 if failed_id else last_id
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            logger.error("Sync '%s' failed writing ids %s-%s", job, next_id, last_id)
+            raise
+        if inserted or updated:
+            heroes_changed()
+
+        if failed_id:
+            logger.warning(
+                "Sync '%s' stopped at upstream id %s; will resume there", job, failed_id
+            )
+            break
+        if consecutive_misses >= settings.SYNC_STOP_AFTER_MISSES:
+            stats["completed"] = True
+            break
+        next_id = last_id + 1
+
+    if stats["completed"]:
+        checkpoint.last_id = 0
+        await db.commit()
+
+    logger.info("Sync '%s' finished: %s", job, stats)
+    return stats
@@ -0,0 +1,40 @@
+import typing as t
+
+import httpx
+
+from src.config.settings import settings
+
+
+_client: t.Optional[httpx.AsyncClient] = None
+
+
+def get_upstream_client() -> httpx.AsyncClient:
+    """
+    Shared async client for superheroapi.com.
+
+    Created lazily so every request on the worker reuses one bounded
+    keep-alive pool instead of opening a new TCP/TLS connection per call.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(
+                settings.API_READ_TIMEOUT,
+                connect=settings.API_CONNECT_TIMEOUT,
+                pool=settings.API_POOL_TIMEOUT,
+            ),
+            limits=httpx.Limits(
+                max_connections=settings.API_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.API_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.API_KEEPALIVE_EXPIRY,
+            ),
+        )
+    return _client
+
+
+async def close_upstream_client() -> None:
+    """Close the shared client and release pooled connections."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
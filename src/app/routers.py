@@ -1,125 +1,270 @@
 import json
+import math
+import httpx
+import orjson
 import typing as t
+import numpy as np
 from fastapi import Request
-from sqlalchemy import func
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
 
-from sqlalchemy.orm import Session
-from fastapi import APIRouter, Query, HTTPException, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Query, Header, HTTPException, Depends
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 
 
 from src.db.models import Hero
-from src.db.data_base import get_db
-from src.helpers.models import HeroCreate
-from src.helpers.static_content import templates
+from src.config.settings import settings
+from src.db.data_base import get_db, SessionFactory
+from src.helpers.models import (
+    HeroBulkCreate,
+    HeroCreate,
+    HeroCreated,
+    HeroDetails,
+    HeroMatchup,
+    HeroMatchups,
+    HeroNeighbour,
+    HeroOut,
+    HeroSearchResult,
+    HeroSet,
+    HeroSimilar,
+    HeroSimilarBatch,
+)
+from src.app._singleflight import SingleFlight
+from src.app._bulk import import_heroes
+from src.app._export import ndjson_lines, csv_lines
+from src.app._stats import hero_stats
+from src.app._search import search_query
+from src.app._resilience import UpstreamUnavailable
+from src.app._metrics import stage_timer
+from src.app._events import heroes_changed
+from src.app._cache import _etag_matches, hero_list_cache
+from src.app._columnar import HeroColumns, hero_index
+from src.app._details import hero_with_details, parse_expand
+from src.app._images import ORIGINAL, ImageError, image_cache, read_chunks
+from src.app._static import ui_page
+from src.app._matchups import score_blocks, top_matchups, weight_vector
+from src.app._lifecycle import check_db, is_ready
+from src.app._filters import (
+    FilterError,
+    Node,
+    canonical_json,
+    canonicalize,
+    compile_filter,
+    condition,
+    parse_filters,
+)
 from src.utils.custom_logger import get_logger
-from src.app._helpers import apply_json_filters, _call_api_method, Endpoint
+from src.app._helpers import (
+    _call_api_method,
+    Endpoint,
+    HERO_COLUMNS,
+    find_character,
+    hero_values,
+    parse_fields,
+)
 
 logger = get_logger(__name__)
-logger.propagate = False
 
 router = APIRouter(tags=["Super hero"])
 
+# concurrent POSTs for the same (case-insensitive) name share one creation
+hero_creation = SingleFlight()
+
 
 @router.get("/", include_in_schema=False)
 async def serve_ui(request: Request):
-    logger.info("Serving UI template")
-    return templates.TemplateResponse("index.html", {"request": request})
-
+    """The UI, rendered once and served precompressed; see `_static`."""
+    return await ui_page.response(request.headers)
 
-@router.post("/hero")
-async def create_hero(hero_data: HeroCreate, db: Session = Depends(get_db)):
-    logger.info(f"Creating new hero with name: {hero_data.name}")
-    name = hero_data.name
 
-    existing_hero = (
-        db.query(Hero).filter(func.lower(Hero.name) == func.lower(name)).first()
+@router.post("/hero", response_model=HeroCreated)
+async def create_hero(hero_data: HeroCreate, db: AsyncSession = Depends(get_db)):
+    logger.info("Creating new hero with name: %s", hero_data.name)
+    return await hero_creation.do(
+        hero_data.name.lower(), lambda: _create_hero(hero_data.name, db)
     )
+
+
+async def _create_hero(name: str, db: AsyncSession):
+    with stage_timer("create_hero.db_lookup"):
+        existing_hero = await db.scalar(
+            select(Hero).where(func.lower(Hero.name) == func.lower(name)).limit(1)
+        )
     if existing_hero:
         error_msg = f"Hero with name '{name}' already exists in database"
         logger.warning(error_msg)
         raise HTTPException(status_code=400, detail=error_msg)
 
-    logger.debug(f"Searching for hero '{name}' in external API")
-    response = _call_api_method(endpoint=Endpoint.SEARCH, search_name=name)
-
-    if response.status_code != 200 or response.json().get("response") == "error":
+    logger.debug("Searching for hero '%s' in external API", name)
+    try:
+        with stage_timer("create_hero.upstream"):
+            response = await _call_api_method(
+                endpoint=Endpoint.SEARCH, search_name=name
+            )
+    except UpstreamUnavailable as e:
+        error_msg = f"superheroapi.com unavailable: {str(e)}"
+        logger.warning(error_msg)
+        raise HTTPException(
+            status_code=503,
+            detail=error_msg,
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        )
+    except httpx.TimeoutException:
+        error_msg = f"Timed out searching for hero '{name}' in superheroapi.com"
+        logger.warning(error_msg)
+        raise HTTPException(status_code=504, detail=error_msg)
+    except httpx.HTTPError as e:
+        error_msg = f"Error calling superheroapi.com: {str(e)}"
+        logger.error(error_msg)
+        raise HTTPException(status_code=502, detail=error_msg)
+
+    if response.status_code not in (200, 404):
+        error_msg = f"superheroapi.com returned {response.status_code}"
+        logger.error(error_msg)
+        raise HTTPException(status_code=502, detail=error_msg)
+
+    if response.status_code == 404 or response.json().get("response") == "error":
         error_msg = f"Hero '{name}' not found in superheroapi.com"
         logger.warning(error_msg)
         raise HTTPException(status_code=404, detail=error_msg)
 
     data = response.json()
-    logger.debug(f"API response data: {data}")
+    logger.debug("API response data: %s", data)
 
     if not data.get("results"):
         error_msg = f"No results found for hero '{name}'"
         logger.warning(error_msg)
         raise HTTPException(status_code=404, detail=error_msg)
 
-    character = None
-    for result in data["results"]:
-        if result["name"].lower() == name.lower():
-            character = result
-            break
+    character = find_character(data["results"], name)
 
     if not character:
         error_msg = f"No exact match found for hero '{name}' in API results"
         logger.warning(error_msg)
         raise HTTPException(status_code=404, detail=error_msg)
 
-    logger.debug(f"Found matching character: {character['name']}")
-
-    def safe_float(value, default=0.0):
-        """Safely convert value to float, handling 'null' string and None cases."""
-        if value is None or str(value).lower() == "null":
-            return default
-        try:
-            return float(value)
-        except (ValueError, TypeError):
-            return default
+    logger.debug("Found matching character: %s", character["name"])
 
     try:
-        powerstats = character.get("powerstats", {})
-        biography = character.get("biography", {})
-        image = character.get("image", {})
-
-        new_hero = Hero(
-            name=character.get("name", "").strip(),
-            intelligence=safe_float(powerstats.get("intelligence")),
-            strength=safe_float(powerstats.get("strength")),
-            speed=safe_float(powerstats.get("speed")),
-            power=safe_float(powerstats.get("power")),
-            full_name=biography.get("full-name", "").strip(),
-            publisher=biography.get("publisher", "").strip(),
-            alignment=biography.get("alignment", "").strip(),
-            image_url=image.get("url", "").strip(),
-        )
+        new_hero = Hero(**hero_values(character))
 
-        db.add(new_hero)
-        db.commit()
-        db.refresh(new_hero)
-        logger.info(f"Successfully created new hero with ID: {new_hero.id}")
+        with stage_timer("create_hero.insert"):
+            db.add(new_hero)
+            await db.commit()
+            await db.refresh(new_hero)
+        heroes_changed([new_hero.id])
+        logger.info("Successfully created new hero with ID: %s", new_hero.id)
 
         return {"message": "Hero successfully added", "hero": new_hero}
 
+    except IntegrityError:
+        await db.rollback()
+        error_msg = f"Hero with name '{name}' already exists in database"
+        logger.warning(error_msg)
+        raise HTTPException(status_code=400, detail=error_msg)
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         error_msg = f"Error creating hero: {str(e)}"
         logger.error(error_msg, exc_info=True)
         raise HTTPException(status_code=500, detail=error_msg)
 
 
-@router.get("/hero/")
+@router.post("/hero/bulk")
+async def create_heroes_bulk(payload: HeroBulkCreate):
+    """
+    Import many heroes in one request.
+
+    Names already in the database are skipped, the rest are searched in
+    superheroapi.com with bounded concurrency and inserted in batches.
+    Results are streamed back as NDJSON, one line per name as it completes:
+    `{"name": ..., "status": "created" | "exists" | "not_found" | "error"}`.
+    """
+    logger.info("Bulk import of %d heroes", len(payload.names))
+
+    async def stream():
+        # the request-scoped session is closed before a streamed body is sent
+        async with SessionFactory() as db:
+            async for result in import_heroes(
+                payload.names, db, batch_size=payload.batch_size
+            ):
+                yield json.dumps(result) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", ndjson_lines),
+    "csv": ("text/csv", csv_lines),
+}
+
+
+def _parse_hero_filters(
+    intelligence_eq: t.Optional[float] = None,
+    intelligence_gte: t.Optional[float] = None,
+    intelligence_lte: t.Optional[float] = None,
+    filters: t.Optional[str] = None,
+) -> t.Optional[Node]:
+    """Merges the `intelligence_*` parameters and `filters` into one filter tree."""
+    try:
+        conditions = [
+            condition("intelligence", op, value)
+            for op, value in (
+                ("eq", intelligence_eq),
+                ("gte", intelligence_gte),
+                ("lte", intelligence_lte),
+            )
+            if value is not None
+        ]
+        if filters:
+            tree = parse_filters(filters)
+            return canonicalize({}, *conditions, *([tree] if tree else []))
+        return canonicalize({}, *conditions)
+    except FilterError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _filter_heroes(query, name: t.Optional[str], tree: t.Optional[Node]):
+    """Applies a name lookup and a parsed filter tree to a query."""
+    if name:
+        query = query.filter(func.lower(Hero.name) == func.lower(name))
+    if tree is not None:
+        query = query.filter(compile_filter(tree))
+    return query
+
+
+@router.get("/hero/", response_model=t.List[HeroOut])
 async def get_heroes(
     name: t.Optional[str] = None,
     intelligence_eq: t.Optional[float] = None,
     intelligence_gte: t.Optional[float] = None,
     intelligence_lte: t.Optional[float] = None,
-    filters: t.Optional[str] = Query(
-        None,
-        description="Advanced filters in JSON format. Example: "
-        '{"power": {"gte": 90}, "speed": {"lte": 50}}',
-    ),
-    db: Session = Depends(get_db),
+    filters: t.Annotated[
+        t.Optional[str],
+        Query(
+            description="Advanced filters in JSON format. Example: "
+            '{"power": {"gte": 90}, "speed": {"lte": 50}}',
+        ),
+    ] = None,
+    cursor: t.Annotated[
+        t.Optional[int],
+        Query(ge=0, description="Return heroes with id greater than this cursor"),
+    ] = None,
+    limit: t.Annotated[
+        t.Optional[int],
+        Query(
+            ge=1,
+            le=settings.MAX_PAGE_SIZE,
+            description=f"Page size, {settings.PAGE_SIZE} by default",
+        ),
+    ] = None,
+    fields: t.Annotated[
+        t.Optional[str],
+        Query(description="Comma-separated columns to return, e.g. `name,power`"),
+    ] = None,
+    if_none_match: t.Annotated[t.Optional[str], Header(include_in_schema=False)] = None,
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Retrieve heroes with optional filtering capabilities.
@@ -130,40 +275,526 @@ async def get_heroes(
     - **intelligence_gte**: Intelligence greater than or equal
     - **intelligence_lte**: Intelligence less than or equal
     - **filters**: Advanced JSON filters for complex conditions
+    - **cursor**: Keyset cursor; pass the `X-Next-Cursor` of the previous page
+    - **limit**: Page size (capped at the configured maximum)
+    - **fields**: Only return these columns (`id` is always included)
 
     Examples:
     - Basic: `/hero/?intelligence_gte=90&speed_lte=50`
     - Advanced: `/hero/?filters={"power": {"gte": 90}, "speed": {"lte": 50}}`
+    - Paging: `/hero/?limit=50` then `/hero/?limit=50&cursor=<X-Next-Cursor>`
 
     Returns:
-    - List of Hero objects matching the criteria
+    - List of Hero objects matching the criteria, ordered by id; when more
+      results exist the `X-Next-Cursor` header holds the next cursor
+    - 304 when `If-None-Match` carries the current `ETag`
     - 404 if no heroes found
-    - 400 for invalid JSON filters
+    - 400 for invalid JSON filters or unknown fields
     """
-    query = db.query(Hero)
-
-    if name:
-        query = query.filter(func.lower(Hero.name) == func.lower(name))
-
-    if intelligence_eq is not None:
-        query = query.filter(Hero.intelligence == intelligence_eq)
-    if intelligence_gte is not None:
-        query = query.filter(Hero.intelligence >= intelligence_gte)
-    if intelligence_lte is not None:
-        query = query.filter(Hero.intelligence <= intelligence_lte)
-
-    if filters:
-        try:
-            filters_data = json.loads(filters)
-            query = apply_json_filters(query, filters_data)
-        except json.JSONDecodeError as e:
-            raise HTTPException(
-                status_code=400, detail=f"Invalid JSON filters format: {str(e)}"
-            )
+    limit = limit or settings.PAGE_SIZE
+    tree = _parse_hero_filters(
+        intelligence_eq, intelligence_gte, intelligence_lte, filters
+    )
+    key = hero_list_cache.key(
+        name=name.lower() if name else None,
+        where=canonical_json(tree),
+        cursor=cursor,
+        limit=limit,
+        fields=",".join(f.strip() for f in fields.split(",")) if fields else None,
+    )
+    cached = hero_list_cache.get(key)
+    if cached is not None:
+        return cached.render(if_none_match)
+
+    with stage_timer("get_heroes.query"):
+        heroes, next_cursor = await _query_heroes(db, name, tree, cursor, limit, fields)
+    with stage_timer("get_heroes.serialize"):
+        body = orjson.dumps(heroes)
+    headers = {"X-Next-Cursor": str(next_cursor)} if next_cursor else {}
+    return hero_list_cache.set(key, body, headers).render(if_none_match)
+
+
+async def _query_heroes(
+    db: AsyncSession,
+    name: t.Optional[str],
+    tree: t.Optional[Node],
+    cursor: t.Optional[int],
+    limit: int,
+    fields: t.Optional[str],
+) -> t.Tuple[t.List[t.Any], t.Optional[int]]:
+    """Runs one GET /hero/ page query; returns the heroes and the next cursor."""
+    try:
+        columns = parse_fields(fields) if fields else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if settings.HERO_READ_ENGINE == "memory":
+        index = await hero_index.columns(db)
+        heroes, next_cursor = index.select(
+            name, tree, cursor, limit, [c.key for c in columns] if columns else None
+        )
+    else:
+        heroes, next_cursor = await _select_heroes(
+            db, name, tree, cursor, limit, columns
+        )
 
-    heroes = query.all()
     if not heroes:
         raise HTTPException(
             status_code=404, detail="No heroes found matching the specified criteria"
         )
-    return heroes
+    return heroes, next_cursor
+
+
+async def _select_heroes(
+    db: AsyncSession,
+    name: t.Optional[str],
+    tree: t.Optional[Node],
+    cursor: t.Optional[int],
+    limit: int,
+    columns: t.Optional[t.List[t.Any]],
+) -> t.Tuple[t.List[t.Dict[str, t.Any]], t.Optional[int]]:
+    # plain rows, not ORM instances: no identity map or attribute instrumentation
+    columns = columns or HERO_COLUMNS
+    query = _filter_heroes(select(*columns), name, tree)
+
+    if cursor is not None:
+        query = query.filter(Hero.id > cursor)
+
+    result = await db.execute(query.order_by(Hero.id).limit(limit + 1))
+    rows = result.all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1][0]  # id always comes first
+
+    keys = [column.key for column in columns]
+    return [dict(zip(keys, row)) for row in rows], next_cursor
+
+
+@router.get("/hero/export")
+async def export_heroes(
+    name: t.Optional[str] = None,
+    intelligence_eq: t.Optional[float] = None,
+    intelligence_gte: t.Optional[float] = None,
+    intelligence_lte: t.Optional[float] = None,
+    filters: t.Annotated[
+        t.Optional[str],
+        Query(description="Advanced filters in JSON format, as for `/hero/`"),
+    ] = None,
+    fields: t.Annotated[
+        t.Optional[str],
+        Query(description="Comma-separated columns to export (`id` is included)"),
+    ] = None,
+    export_format: t.Annotated[
+        t.Literal["ndjson", "csv"], Query(alias="format")
+    ] = "ndjson",
+):
+    """
+    Stream every hero matching the `/hero/` filters as NDJSON or CSV.
+
+    Rows are read from the database in chunks and written out as they
+    arrive, so the whole result set is never held in memory.
+    """
+    try:
+        columns = parse_fields(fields) if fields else HERO_COLUMNS
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    tree = _parse_hero_filters(
+        intelligence_eq, intelligence_gte, intelligence_lte, filters
+    )
+    query = _filter_heroes(select(*columns), name, tree).order_by(Hero.id)
+
+    media_type, render = EXPORT_FORMATS[export_format]
+    logger.info("Exporting heroes as %s", export_format)
+
+    async def stream():
+        # the request-scoped session is closed before a streamed body is sent
+        async with SessionFactory() as db:
+            async for chunk in render(
+                db,
+                query,
+                [column.key for column in columns],
+                settings.EXPORT_CHUNK_SIZE,
+            ):
+                yield chunk
+
+    return StreamingResponse(
+        stream(),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="heroes.{export_format}"'
+        },
+    )
+
+
+@router.get("/hero/stats")
+async def get_hero_stats(
+    top: t.Annotated[
+        int, Query(ge=1, le=100, description="How many heroes to rank by power")
+    ] = 10,
+    percentiles: t.Annotated[
+        bool,
+        Query(description="Also compute p50/p90/p99 powerstats per publisher"),
+    ] = False,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Aggregate hero statistics, computed in the database.
+
+    Returns:
+    - **publishers**: hero count and average powerstats per publisher, plus
+      percentiles when `percentiles=true`
+    - **alignments**: hero count per alignment
+    - **top_power**: the `top` heroes with the highest power
+    """
+    return await hero_stats(
+        db, top=top, percentiles=percentiles, use_summary=settings.STATS_USE_SUMMARY
+    )
+
+
+@router.get("/hero/search", response_model=t.List[HeroSearchResult])
+async def search_heroes(
+    q: t.Annotated[
+        str,
+        Query(min_length=1, max_length=100, description="Name or part of a name"),
+    ],
+    limit: t.Annotated[
+        t.Optional[int],
+        Query(
+            ge=1,
+            le=settings.SEARCH_MAX_LIMIT,
+            description=f"Number of results, {settings.SEARCH_LIMIT} by default",
+        ),
+    ] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Search heroes by name or full name, tolerating typos and partial input.
+
+    Matches name prefixes and names/full names containing a word similar to
+    `q`, ranked best first. Each result carries its `score`: similarity in
+    [0, 1], plus 1 when the name starts with `q`.
+    """
+    q = q.strip()
+    if not q:
+        raise HTTPException(status_code=400, detail="Search query is empty")
+
+    result = await db.execute(search_query(q, limit or settings.SEARCH_LIMIT))
+    return [{**row._asdict(), "score": round(row.score, 3)} for row in result.all()]
+
+
+def _similar_prefilter(
+    publisher: t.Optional[str], alignment: t.Optional[str]
+) -> t.Optional[Node]:
+    return canonicalize(
+        {},
+        *(
+            condition(field, "eq", value)
+            for field, value in (("publisher", publisher), ("alignment", alignment))
+            if value is not None
+        ),
+    )
+
+
+@router.get("/hero/{hero_id}", response_model=HeroDetails)
+async def get_hero(
+    hero_id: int,
+    expand: t.Annotated[
+        t.Optional[str],
+        Query(
+            description="Comma-separated superheroapi.com sections to include: "
+            "powerstats, biography, appearance, work, connections, image",
+        ),
+    ] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Get one hero by id, optionally with more of its superheroapi.com data.
+
+    The first request for a section fetches it from superheroapi.com, all
+    missing sections at once within HERO_DETAILS_DEADLINE seconds, and stores
+    it; later requests read it from the database. Sections that could not be
+    fetched are listed in `missing` and tried again on the next request;
+    `missing_reason` says why when the hero could not be found upstream.
+
+    Returns:
+    - The hero, with the `expand`ed sections in `details`
+    - 404 if the hero does not exist
+    - 400 for an unknown section
+    """
+    try:
+        sections = parse_expand(expand) if expand else []
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    hero = await hero_with_details(db, hero_id, sections)
+    if hero is None:
+        raise HTTPException(status_code=404, detail=f"Hero {hero_id} not found")
+    return hero
+
+
+@router.get(
+    "/hero/{hero_id}/image",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"image/*": {}}}, 304: {}},
+)
+async def hero_image(
+    hero_id: int,
+    size: t.Annotated[
+        str,
+        Query(
+            description=f"{ORIGINAL}, or a thumbnail size: "
+            f"{', '.join(settings.IMAGE_SIZES)}"
+        ),
+    ] = ORIGINAL,
+    if_none_match: t.Annotated[t.Optional[str], Header()] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    A hero's image, or a thumbnail of it, served from the local image cache.
+
+    Each image is fetched from upstream once; thumbnails are made from the
+    cached original. The ETag is the SHA-256 of the image, so a matching
+    If-None-Match gets a 304.
+
+    Returns:
+    - The image
+    - 404 if the hero does not exist or has no image
+    - 400 for an unknown size
+    - 502/504 if upstream fails or times out
+    """
+    if size != ORIGINAL and size not in settings.IMAGE_SIZES:
+        raise HTTPException(status_code=400, detail=f"Unknown image size: {size}")
+    row = (await db.execute(select(Hero.image_url).where(Hero.id == hero_id))).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail=f"Hero {hero_id} not found")
+    if not row.image_url:
+        raise HTTPException(status_code=404, detail=f"Hero {hero_id} has no image")
+
+    try:
+        image, file = await image_cache.open(row.image_url, size)
+    except httpx.TimeoutException:
+        error_msg = f"Timed out fetching the image of hero {hero_id}"
+        logger.warning(error_msg)
+        raise HTTPException(status_code=504, detail=error_msg)
+    except (httpx.HTTPError, ImageError) as e:
+        error_msg = f"Error fetching the image of hero {hero_id}: {str(e)}"
+        logger.warning(error_msg)
+        raise HTTPException(status_code=502, detail=error_msg)
+
+    etag = f'"{image.digest}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={settings.IMAGE_MAX_AGE}",
+    }
+    if if_none_match and _etag_matches(if_none_match, etag):
+        file.close()
+        return Response(status_code=304, headers=headers)
+    # streamed from disk in chunks, from the file opened before it could be evicted
+    return StreamingResponse(
+        read_chunks(file),
+        media_type=image.media_type,
+        headers={**headers, "Content-Length": str(image.size)},
+    )
+
+
+def _powerstat_positions(index: HeroColumns, hero_ids: t.List[int]) -> t.List[int]:
+    """Index positions of heroes that must exist and have all four powerstats."""
+    positions = [index.position(hero_id) for hero_id in hero_ids]
+    missing = [str(i) for i, p in zip(hero_ids, positions) if p is None]
+    if missing:
+        raise HTTPException(
+            status_code=404, detail=f"Heroes not found: {', '.join(missing)}"
+        )
+    incomplete = [str(i) for i, p in zip(hero_ids, positions) if not index.complete[p]]
+    if incomplete:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Heroes without all four powerstats: {', '.join(incomplete)}",
+        )
+    return positions
+
+
+async def _similar(
+    db: AsyncSession,
+    hero_ids: t.List[int],
+    k: t.Optional[int],
+    publisher: t.Optional[str],
+    alignment: t.Optional[str],
+) -> t.List[t.List[t.Dict[str, t.Any]]]:
+    """Nearest heroes in powerstat space for each id, from the in-memory index."""
+    index = await hero_index.columns(db)
+    positions = _powerstat_positions(index, hero_ids)
+    with stage_timer("similar.knn"):
+        neighbours = index.nearest(
+            positions,
+            k or settings.SIMILAR_K,
+            _similar_prefilter(publisher, alignment),
+        )
+    return [
+        [{**index.rows[p], "distance": round(d, 3)} for p, d in found]
+        for found in neighbours
+    ]
+
+
+@router.get("/hero/{hero_id}/similar", response_model=t.List[HeroNeighbour])
+async def similar_heroes(
+    hero_id: int,
+    k: t.Annotated[
+        t.Optional[int],
+        Query(
+            ge=1,
+            le=settings.SIMILAR_MAX_K,
+            description=f"Number of heroes, {settings.SIMILAR_K} by default",
+        ),
+    ] = None,
+    publisher: t.Annotated[
+        t.Optional[str], Query(description="Only heroes from this publisher")
+    ] = None,
+    alignment: t.Annotated[
+        t.Optional[str], Query(description="Only heroes with this alignment")
+    ] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    The `k` heroes closest to a hero by powerstats, nearest first.
+
+    Distance is Euclidean over intelligence, strength, speed and power.
+    Heroes missing any of the four are never returned.
+
+    Returns:
+    - Heroes with their `distance`, nearest first
+    - 404 if the hero does not exist
+    - 400 if the hero is missing a powerstat
+    """
+    (found,) = await _similar(db, [hero_id], k, publisher, alignment)
+    return found
+
+
+@router.post("/hero/similar", response_model=t.List[HeroSimilar])
+async def similar_heroes_batch(
+    payload: HeroSimilarBatch, db: AsyncSession = Depends(get_db)
+):
+    """
+    `/hero/{id}/similar` for many heroes at once, in the order of `ids`.
+    """
+    found = await _similar(
+        db, payload.ids, payload.k, payload.publisher, payload.alignment
+    )
+    return [
+        {"id": hero_id, "similar": similar}
+        for hero_id, similar in zip(payload.ids, found)
+    ]
+
+
+def _matchup_set(index: HeroColumns, hero_set: HeroSet) -> np.ndarray:
+    """Index positions of a matchup set; `filters` skip heroes missing a powerstat."""
+    if hero_set.ids is not None:
+        return np.array(
+            _powerstat_positions(index, list(dict.fromkeys(hero_set.ids))), np.int64
+        )
+    try:
+        tree = canonicalize(hero_set.filters)
+    except FilterError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if tree is None:
+        return np.flatnonzero(index.complete)
+    return np.flatnonzero(index.complete & index.mask(tree)[0])
+
+
+def _matchup_matrix(
+    left_ids: np.ndarray,
+    left: np.ndarray,
+    right_ids: np.ndarray,
+    right: np.ndarray,
+    weights: np.ndarray,
+) -> t.Iterator[bytes]:
+    option = orjson.OPT_SERIALIZE_NUMPY
+    yield orjson.dumps({"right": right_ids}, option=option) + b"\n"
+    for start, scores in score_blocks(left, right, weights, settings.MATCHUP_SCALE):
+        scores = np.round(scores, 4)
+        yield b"".join(
+            orjson.dumps({"left": int(hero_id), "scores": row}, option=option) + b"\n"
+            for hero_id, row in zip(left_ids[start : start + len(scores)], scores)
+        )
+
+
+@router.post("/hero/matchups", response_model=t.List[HeroMatchup])
+async def hero_matchups(payload: HeroMatchups, db: AsyncSession = Depends(get_db)):
+    """
+    Score every hero of one set against every hero of another, by powerstats.
+
+    Each set is given by `ids`, or by `filters` in the `/hero/` format, which
+    leave out heroes missing a powerstat. A pair's `score` is the weighted
+    share of the four powerstats the left hero is expected to win, each on a
+    logistic curve over the difference: 0.5 is an even matchup, and the right
+    hero's score is 1 - `score`.
+
+    Returns:
+    - with `output=top`, the `top` best pairs, best first (a hero is never
+      paired with itself)
+    - with `output=matrix`, NDJSON streamed as it is computed: a
+      `{"right": [ids]}` line, then one `{"left": id, "scores": [...]}` line
+      per left hero, scores in the order of `right`
+    - 404 for unknown ids, 400 for ids missing a powerstat, invalid filters
+      or more than MATCHUP_MAX_PAIRS pairs
+    """
+    index = await hero_index.columns(db)
+    left = _matchup_set(index, payload.left)
+    right = _matchup_set(index, payload.right)
+    if len(left) * len(right) > settings.MATCHUP_MAX_PAIRS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{len(left)} x {len(right)} heroes is too many pairs, "
+            f"at most {settings.MATCHUP_MAX_PAIRS}",
+        )
+    logger.info("Scoring %d x %d matchups", len(left), len(right))
+
+    weights = weight_vector(payload.weights.model_dump())
+    sets = (
+        index.ids[left],
+        index.vectors[left],
+        index.ids[right],
+        index.vectors[right],
+    )
+    if payload.output == "matrix":
+        return StreamingResponse(
+            _matchup_matrix(*sets, weights), media_type="application/x-ndjson"
+        )
+
+    with stage_timer("matchups.top"):
+        # NumPy releases the GIL, so scoring in a thread keeps the loop serving
+        found = await run_in_threadpool(
+            top_matchups,
+            *sets,
+            weights,
+            settings.MATCHUP_SCALE,
+            payload.top or settings.MATCHUP_TOP,
+        )
+    return [
+        {"left": left_id, "right": right_id, "score": round(score, 4)}
+        for left_id, right_id, score in found
+    ]
+
+
+@router.get("/healthz", include_in_schema=False)
+async def healthz():
+    """
+    Liveness: 200 while the process can answer, whatever the database state.
+
+    `db` reports whether the database answered, for dashboards; restarting
+    the worker would not fix a database outage, so it does not fail the probe.
+    """
+    error = await check_db()
+    return {"status": "ok", "db": "ok" if error is None else error}
+
+
+@router.get("/readyz", include_in_schema=False)
+async def readyz():
+    """Readiness: 200 once warmed up and while the database answers, else 503."""
+    if not is_ready():
+        return JSONResponse({"status": "not ready"}, status_code=503)
+    error = await check_db()
+    if error is not None:
+        return JSONResponse({"status": "not ready", "db": error}, status_code=503)
+    return {"status": "ready", "db": "ok"}
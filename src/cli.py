@@ -0,0 +1,115 @@
+import sys
+import json
+import time
+import asyncio
+import typing as t
+from pathlib import Path
+
+import typer
+import schedule
+
+from src.db.data_base import SessionFactory, engine
+from src.config.settings import settings
+from src.app._bulk import import_heroes
+from src.app._sync import sync_catalog
+from src.app._upstream import close_upstream_client
+
+
+app = typer.Typer(help="Super hero maintenance commands.")
+
+
+@app.callback()
+def main():
+    """Super hero maintenance commands."""
+
+
+async def _run_import(
+    names: t.List[str], batch_size: int, concurrency: int
+) -> t.Dict[str, int]:
+    totals: t.Dict[str, int] = {}
+    try:
+        async with SessionFactory() as db:
+            async for result in import_heroes(
+                names, db, batch_size=batch_size, concurrency=concurrency
+            ):
+                totals[result["status"]] = totals.get(result["status"], 0) + 1
+                typer.echo(json.dumps(result))
+    finally:
+        await close_upstream_client()
+        await engine.dispose()
+    return totals
+
+
+@app.command("import-heroes")
+def import_heroes_command(
+    source: Path = typer.Argument(
+        ..., help="File with one hero name per line, or '-' for stdin"
+    ),
+    batch_size: int = typer.Option(
+        settings.BULK_BATCH_SIZE, help="Rows per INSERT statement"
+    ),
+    concurrency: int = typer.Option(
+        settings.BULK_FETCH_CONCURRENCY, help="Parallel superheroapi.com lookups"
+    ),
+):
+    """Import heroes by name, printing one NDJSON result per name."""
+    lines = sys.stdin if str(source) == "-" else source.read_text().splitlines()
+    names = [line.strip() for line in lines if line.strip()]
+
+    totals = asyncio.run(_run_import(names, batch_size, concurrency))
+    typer.echo(
+        ", ".join(f"{status}: {count}" for status, count in sorted(totals.items())),
+        err=True,
+    )
+
+
+async def _run_sync(**options) -> t.Dict[str, t.Any]:
+    try:
+        async with SessionFactory() as db:
+            return await sync_catalog(db, **options)
+    finally:
+        await close_upstream_client()
+        await engine.dispose()
+
+
+@app.command("sync-catalog")
+def sync_catalog_command(
+    job: str = typer.Option("catalog", help="Checkpoint name for this sync"),
+    restart: bool = typer.Option(False, help="Ignore the checkpoint and start over"),
+    concurrency: int = typer.Option(
+        settings.SYNC_CONCURRENCY, help="Parallel superheroapi.com lookups"
+    ),
+    chunk_size: int = typer.Option(
+        settings.SYNC_CHUNK_SIZE, help="Upstream ids per upsert/checkpoint"
+    ),
+    max_id: t.Optional[int] = typer.Option(None, help="Highest upstream id to sync"),
+    every: t.Optional[float] = typer.Option(
+        None, help="Repeat every N hours instead of running once"
+    ),
+):
+    """Mirror the superheroapi.com catalog into the heroes table."""
+
+    def run():
+        stats = asyncio.run(
+            _run_sync(
+                job=job,
+                restart=restart,
+                concurrency=concurrency,
+                chunk_size=chunk_size,
+                max_id=max_id,
+            )
+        )
+        typer.echo(json.dumps(stats))
+
+    run()
+    if every is None:
+        return
+
+    schedule.every(every).hours.do(run)
+    while True:
+        schedule.run_pending()
+        time.sleep(max(min(schedule.idle_seconds() or 60, 60), 1))
+
+
+if __name__ == "__main__":
+    app()
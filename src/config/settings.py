@@ -1,3 +1,4 @@
+import typing as t
 from urllib.parse import quote_plus
 
 from pydantic_settings import BaseSettings
@@ -10,6 +11,125 @@ class Settings(BaseSettings):
     API_HERO: str
     TOKEN: str
 
+    # upstream client
+    API_CONNECT_TIMEOUT: float = 3.0
+    API_READ_TIMEOUT: float = 10.0
+    API_MAX_CONNECTIONS: int = 20
+    API_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    API_KEEPALIVE_EXPIRY: float = 30.0
+    API_POOL_TIMEOUT: float = 2.0
+
+    # upstream resilience: retries, rate limit (requests/second, 0 disables), breaker
+    API_RETRY_ATTEMPTS: int = 3
+    API_RETRY_BACKOFF: float = 0.2
+    API_RETRY_MAX_BACKOFF: float = 2.0
+    API_RETRY_DEADLINE: float = 15.0
+    API_RATE_LIMIT: float = 10.0
+    API_RATE_BURST: int = 20
+    API_RATE_MAX_WAIT: float = 2.0
+    API_CIRCUIT_FAILURES: int = 5
+    API_CIRCUIT_RESET: float = 30.0
+
+    # upstream cache
+    API_CACHE_MAXSIZE: int = 1024
+    API_CACHE_HIT_TTL: float = 3600.0
+    API_CACHE_MISS_TTL: float = 300.0
+    # e.g. redis://localhost:6379/0, shared by all workers; needs the `cache`
+    # extra (poetry install --extras cache)
+    API_CACHE_URL: t.Optional[str] = None
+
+    # GET /hero/ response cache
+    RESPONSE_CACHE_MAXSIZE: int = 2048
+    RESPONSE_CACHE_MAXBYTES: int = 64 * 1024 * 1024
+    RESPONSE_CACHE_TTL: float = 30.0
+    # how often each worker checks for writes by other processes; 0 disables
+    RESPONSE_CACHE_VERSION_INTERVAL: float = 1.0
+
+    # GET /hero/ pagination
+    PAGE_SIZE: int = 100
+    MAX_PAGE_SIZE: int = 1000
+
+    # GET /hero/ filters: limits on the `filters` expression, compiled plan cache
+    FILTER_MAX_LENGTH: int = 4096
+    FILTER_MAX_DEPTH: int = 4
+    FILTER_MAX_CONDITIONS: int = 32
+    FILTER_MAX_IN_VALUES: int = 100
+    FILTER_PLAN_CACHE_SIZE: int = 512
+
+    # GET /hero/ read engine: "sql", or "memory" for the in-process columnar index
+    HERO_READ_ENGINE: t.Literal["sql", "memory"] = "sql"
+    HERO_INDEX_POLL_INTERVAL: float = 5.0
+    HERO_INDEX_RELOAD_INTERVAL: float = 300.0
+
+    # GET /hero/search
+    SEARCH_LIMIT: int = 20
+    SEARCH_MAX_LIMIT: int = 100
+
+    # GET /hero/{id}/similar and POST /hero/similar
+    SIMILAR_K: int = 10
+    SIMILAR_MAX_K: int = 100
+    SIMILAR_MAX_BATCH: int = 100
+
+    # POST /hero/matchups
+    MATCHUP_TOP: int = 100
+    MATCHUP_MAX_TOP: int = 1000
+    MATCHUP_MAX_IDS: int = 10000
+    MATCHUP_MAX_PAIRS: int = 25_000_000
+    MATCHUP_SCALE: float = 10.0
+
+    # GET /hero/{id}?expand=: budget for fetching missing sections from upstream
+    HERO_DETAILS_DEADLINE: float = 5.0
+
+    # GET /hero/{id}/image: disk cache of upstream images and their thumbnails
+    IMAGE_CACHE_DIR: str = "/tmp/super-hero/images"
+    IMAGE_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    IMAGE_MAX_BYTES: int = 10 * 1024 * 1024
+    # longest side in pixels of each thumbnail size; "original" is always served
+    IMAGE_SIZES: t.Dict[str, int] = {"thumb": 96, "small": 240, "medium": 480}
+    IMAGE_MAX_AGE: int = 7 * 24 * 3600
+    # warm the cache in the background for heroes as they are created
+    IMAGE_PREFETCH: bool = True
+    IMAGE_PREFETCH_SIZES: t.List[str] = ["original", "small", "medium"]
+    IMAGE_PREFETCH_CONCURRENCY: int = 4
+
+    # gzip/brotli for API responses; static assets are compressed ahead of time
+    COMPRESS_MIN_SIZE: int = 1024
+    COMPRESS_GZIP_LEVEL: int = 6
+    COMPRESS_BROTLI_QUALITY: int = 4
+    # static files up to this size are served precompressed from memory
+    STATIC_INLINE_MAX_BYTES: int = 1024 * 1024
+    # for `?v=<hash>` asset URLs, which change with the content
+    STATIC_MAX_AGE: int = 365 * 24 * 3600
+
+    # GET /hero/export
+    EXPORT_CHUNK_SIZE: int = 1000
+
+    # GET /hero/stats: counts/averages from hero_stats_summary instead of heroes
+    STATS_USE_SUMMARY: bool = True
+
+    # bulk import
+    BULK_FETCH_CONCURRENCY: int = 10
+    BULK_BATCH_SIZE: int = 200
+    BULK_MAX_NAMES: int = 5000
+
+    # catalog sync
+    SYNC_CONCURRENCY: int = 8
+    SYNC_CHUNK_SIZE: int = 50
+    SYNC_STOP_AFTER_MISSES: int = 25
+
+    # logging: level, JSON or console lines, queue to the writer thread, and
+    # the fraction of requests whose debug/info events are kept, by route template
+    LOG_LEVEL: str = "INFO"
+    LOG_JSON: bool = True
+    LOG_QUEUE_SIZE: int = 10000
+    LOG_SAMPLE_RATES: t.Dict[str, float] = {"/hero/": 0.1, "/hero/search": 0.1}
+
+    # production server (gunicorn.conf.py): workers, 0 = one per available CPU
+    WEB_WORKERS: int = 0
+    WEB_TIMEOUT: int = 60
+    WEB_GRACEFUL_TIMEOUT: int = 30
+    WEB_KEEPALIVE: int = 5
+
     # db
     DB_HOST: str | int
     DB_PORT: str | int
@@ -17,11 +137,26 @@ class Settings(BaseSettings):
     DB_USER: str
     DB_PASSWORD: str
 
+    # db pool
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # connections opened per worker at startup, and the /readyz check timeout
+    DB_POOL_WARMUP: int = 2
+    DB_HEALTH_TIMEOUT: float = 2.0
+
     @property
     def DB_URL(self) -> str:
         password = quote_plus(self.DB_PASSWORD)
         return f"postgresql://{self.DB_USER}:{password}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
 
+    @property
+    def ASYNC_DB_URL(self) -> str:
+        password = quote_plus(self.DB_PASSWORD)
+        return f"postgresql+asyncpg://{self.DB_USER}:{password}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
+
     class Config:
         env_file = [".env", "../.env", "../../.env"]
         env_file_encoding = "utf-8"
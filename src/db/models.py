@@ -1,4 +1,16 @@
-from sqlalchemy import Column, Integer, String, Float
+from sqlalchemy import (
+    JSON,
+    Column,
+    Integer,
+    BigInteger,
+    String,
+    Float,
+    DateTime,
+    ForeignKey,
+    Index,
+    func,
+)
+from sqlalchemy.dialects.postgresql import JSONB
 
 from src.db.data_base import Base
 
@@ -8,12 +20,87 @@ class Hero(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True, nullable=False)
-    intelligence = Column(Float)
-    strength = Column(Float)
-    speed = Column(Float)
-    power = Column(Float)
+    intelligence = Column(Float, index=True)
+    strength = Column(Float, index=True)
+    speed = Column(Float, index=True)
+    power = Column(Float, index=True)
 
     full_name = Column(String)
     publisher = Column(String)
     alignment = Column(String)
     image_url = Column(String)
+
+    # id of the character in superheroapi.com; not unique, the API has repeats
+    upstream_id = Column(Integer, index=True)
+
+    __table_args__ = (
+        # name lookups are case-insensitive: func.lower(Hero.name) == ...
+        Index("ix_heroes_lower_name", func.lower(name)),
+        # GET /hero/search: pg_trgm similarity and ILIKE prefix matches
+        Index(
+            "ix_heroes_name_trgm",
+            name,
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_heroes_full_name_trgm",
+            full_name,
+            postgresql_using="gin",
+            postgresql_ops={"full_name": "gin_trgm_ops"},
+        ),
+    )
+
+
+class SyncCheckpoint(Base):
+    __tablename__ = "sync_checkpoints"
+
+    job = Column(String, primary_key=True)
+    last_id = Column(Integer, nullable=False, server_default="0")
+    updated_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
+
+
+class HeroSections(Base):
+    """
+    superheroapi.com sections (appearance, work, ...) of a hero, fetched on
+    demand by GET /hero/{id}?expand=, see src/app/_details.py.
+
+    Kept out of ``heroes`` so that storing them is not a write to it.
+    """
+
+    __tablename__ = "hero_sections"
+
+    hero_id = Column(
+        Integer, ForeignKey("heroes.id", ondelete="CASCADE"), primary_key=True
+    )
+    sections = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=False)
+
+
+class HeroStatsSummary(Base):
+    """
+    Per (publisher, alignment) counts, and per powerstat the sum and number
+    of non-NULL values.
+
+    Maintained by statement-level triggers on ``heroes`` (see revisions
+    ea9eeaab030b and b6e1f09a7c32), so every write path keeps it current.
+    NULL publisher or alignment is stored as ''.
+    """
+
+    __tablename__ = "hero_stats_summary"
+
+    publisher = Column(String, primary_key=True)
+    alignment = Column(String, primary_key=True)
+    hero_count = Column(BigInteger, nullable=False)
+    sum_intelligence = Column(Float, nullable=False)
+    sum_strength = Column(Float, nullable=False)
+    sum_speed = Column(Float, nullable=False)
+    sum_power = Column(Float, nullable=False)
+    count_intelligence = Column(BigInteger, nullable=False, server_default="0")
+    count_strength = Column(BigInteger, nullable=False, server_default="0")
+    count_speed = Column(BigInteger, nullable=False, server_default="0")
+    count_power = Column(BigInteger, nullable=False, server_default="0")
@@ -1,5 +1,108 @@
-from pydantic import BaseModel
+import typing as t
+
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+
+from src.config.settings import settings
 
 
 class HeroCreate(BaseModel):
     name: str
+
+
+class HeroBulkCreate(BaseModel):
+    names: t.List[str] = Field(..., min_length=1, max_length=settings.BULK_MAX_NAMES)
+    batch_size: t.Optional[int] = Field(None, ge=1, le=1000)
+
+
+class HeroOut(BaseModel):
+    """A hero row. With `fields=`, GET /hero/ returns only some of these keys."""
+
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    name: t.Optional[str] = None
+    intelligence: t.Optional[float] = None
+    strength: t.Optional[float] = None
+    speed: t.Optional[float] = None
+    power: t.Optional[float] = None
+    full_name: t.Optional[str] = None
+    publisher: t.Optional[str] = None
+    alignment: t.Optional[str] = None
+    image_url: t.Optional[str] = None
+    upstream_id: t.Optional[int] = None
+
+
+class HeroDetails(HeroOut):
+    """A hero with the `expand`ed superheroapi.com sections, as upstream has them."""
+
+    details: t.Dict[str, t.Dict[str, t.Any]] = {}
+    missing: t.List[str] = []
+    # why nothing could be fetched, when the hero is not known upstream
+    missing_reason: t.Optional[str] = None
+
+
+class HeroCreated(BaseModel):
+    message: str
+    hero: HeroOut
+
+
+class HeroSearchResult(HeroOut):
+    score: float
+
+
+class HeroNeighbour(HeroOut):
+    distance: float
+
+
+class HeroSimilarBatch(BaseModel):
+    ids: t.List[int] = Field(..., min_length=1, max_length=settings.SIMILAR_MAX_BATCH)
+    k: t.Optional[int] = Field(None, ge=1, le=settings.SIMILAR_MAX_K)
+    publisher: t.Optional[str] = None
+    alignment: t.Optional[str] = None
+
+
+class HeroSimilar(BaseModel):
+    id: int
+    similar: t.List[HeroNeighbour]
+
+
+class HeroSet(BaseModel):
+    """Heroes by `ids`, or every hero matching `filters` (the `/hero/` format)."""
+
+    ids: t.Optional[t.List[int]] = Field(
+        None, min_length=1, max_length=settings.MATCHUP_MAX_IDS
+    )
+    filters: t.Optional[t.Dict[str, t.Any]] = None
+
+    @model_validator(mode="after")
+    def _ids_or_filters(self) -> "HeroSet":
+        if (self.ids is None) == (self.filters is None):
+            raise ValueError("Give either `ids` or `filters`")
+        return self
+
+
+class MatchupWeights(BaseModel):
+    intelligence: float = Field(1.0, ge=0)
+    strength: float = Field(1.0, ge=0)
+    speed: float = Field(1.0, ge=0)
+    power: float = Field(1.0, ge=0)
+
+    @model_validator(mode="after")
+    def _not_all_zero(self) -> "MatchupWeights":
+        if not any(self.model_dump().values()):
+            raise ValueError("At least one weight must be positive")
+        return self
+
+
+class HeroMatchups(BaseModel):
+    left: HeroSet
+    right: HeroSet
+    weights: MatchupWeights = MatchupWeights()
+    output: t.Literal["top", "matrix"] = "top"
+    top: t.Optional[int] = Field(None, ge=1, le=settings.MATCHUP_MAX_TOP)
+
+
+class HeroMatchup(BaseModel):
+    left: int
+    right: int
+    score: float
@@ -1,21 +1,201 @@
+"""
+Structured logging for the app.
+
+Loggers from `get_logger` are structlog loggers on top of stdlib logging.
+The calling thread only filters the event, merges the request context and
+puts the record on a queue; a background QueueListener renders it (JSON by
+default) and writes it to stderr. Pass values as arguments rather than
+formatting them yourself, so filtered-out events cost nothing:
+
+    logger.debug("API response data: %s", data)
+    logger.info("Hero created", hero_id=hero.id)
+
+Arguments are rendered later on the listener thread, so do not mutate them
+after logging.
+
+Inside a request, `RequestContextMiddleware` binds a `request_id` to every
+event and samples debug/info events on the routes in LOG_SAMPLE_RATES.
+"""
+
+import os
+import sys
+import uuid
+import queue
+import atexit
+import random
 import logging
-from typing import Optional
+import typing as t
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+import structlog
+
+from src.config.settings import settings
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+# events at these levels may be sampled away, warnings and errors never are
+_SAMPLED_METHODS = {"debug", "info"}
+
+# (ASGI scope, random draw) of the current request, for sampling
+_request: ContextVar[t.Optional[t.Tuple[dict, float]]] = ContextVar(
+    "log_request", default=None
+)
+
+
+def _sample(logger, method_name: str, event_dict: dict) -> dict:
+    """Drops debug/info events of a sampled-out request on a sampled route."""
+    current = _request.get()
+    if current is None or method_name not in _SAMPLED_METHODS:
+        return event_dict
+    scope, draw = current
+    route = scope.get("route")
+    rate = settings.LOG_SAMPLE_RATES.get(route.path if route else "", 1.0)
+    if draw >= rate:
+        raise structlog.DropEvent
+    return event_dict
+
+
+def _capture_exc_info(logger, method_name: str, event_dict: dict) -> dict:
+    """Resolves exc_info=True while the exception is still being handled."""
+    if event_dict.get("exc_info") is True:
+        event_dict["exc_info"] = sys.exc_info()
+    return event_dict
+
+
+def _add_timestamp(logger, method_name: str, event_dict: dict) -> dict:
+    """Stamps the event with the time it was logged, not the time it was written."""
+    created = event_dict["_record"].created
+    event_dict["timestamp"] = datetime.fromtimestamp(created, timezone.utc).isoformat()
+    return event_dict
+
+
+class _QueueHandler(QueueHandler):
+    """Enqueues records as-is, never blocks and drops records when full."""
+
+    dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # formatting happens on the listener thread, see _formatter
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _QueueHandler.dropped += 1
+
 
+_formatter = structlog.stdlib.ProcessorFormatter(
+    processors=[
+        _add_timestamp,
+        structlog.stdlib.add_log_level,
+        structlog.stdlib.add_logger_name,
+        structlog.stdlib.PositionalArgumentsFormatter(),
+        structlog.processors.format_exc_info,
+        structlog.stdlib.ProcessorFormatter.remove_processors_meta,
+        (
+            structlog.processors.JSONRenderer()
+            if settings.LOG_JSON
+            else structlog.dev.ConsoleRenderer(colors=False)
+        ),
+    ],
+)
 
-def get_logger(name: Optional[str] = None) -> logging.Logger:
+_stream = logging.StreamHandler()
+_stream.setFormatter(_formatter)
+_handler = _QueueHandler(queue.Queue())
+
+
+def _start_listener() -> None:
+    """Starts the writer thread, on a fresh queue."""
+    global _queue, _listener
+    _queue = queue.Queue(settings.LOG_QUEUE_SIZE)
+    _handler.queue = _queue
+    _listener = QueueListener(_queue, _stream)
+    _listener.start()
+
+
+_start_listener()
+# threads do not survive fork(): workers of a preloaded app need their own
+os.register_at_fork(after_in_child=_start_listener)
+atexit.register(lambda: _listener.stop())
+
+structlog.configure(
+    processors=[
+        structlog.stdlib.filter_by_level,
+        _sample,
+        structlog.contextvars.merge_contextvars,
+        _capture_exc_info,
+        structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
+    ],
+    logger_factory=structlog.stdlib.LoggerFactory(),
+    wrapper_class=structlog.stdlib.BoundLogger,
+    cache_logger_on_first_use=True,
+)
+
+
+def get_logger(name: t.Optional[str] = None) -> structlog.stdlib.BoundLogger:
     """
     Get a logger with the given name, or root logger if no name is given.
     """
     logger = logging.getLogger(name)
-    logger.setLevel(logging.INFO)
+    logger.setLevel(settings.LOG_LEVEL)
     logger.propagate = False
 
-    if not logger.handlers:
-        handler = logging.StreamHandler()
-        formatter = logging.Formatter(
-            fmt="%(asctime)s - %(levelname)s - %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
-        )
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
+    if _handler not in logger.handlers:
+        logger.addHandler(_handler)
+
+    return structlog.stdlib.get_logger(name)
+
+
+def flush() -> None:
+    """Blocks until every queued record has been written."""
+    _queue.join()
+
+
+class RequestContextMiddleware:
+    """
+    ASGI middleware giving each HTTP request an id for its log events.
+
+    The id is taken from the X-Request-ID header, or generated, and sent back
+    in the response. The sampling draw for the request is made here, so a
+    sampled request keeps all of its events.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        request_id = _incoming_request_id(scope) or uuid.uuid4().hex
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append(
+                    (REQUEST_ID_HEADER.lower().encode(), request_id.encode())
+                )
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = _request.set((scope, random.random()))
+        try:
+            with structlog.contextvars.bound_contextvars(request_id=request_id):
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            _request.reset(token)
+
 
-    return logger
\ No newline at end of file
+def _incoming_request_id(scope) -> t.Optional[str]:
+    header = REQUEST_ID_HEADER.lower().encode()
+    for key, value in scope.get("headers", []):
+        if key == header:
+            value = value.decode("latin-1").strip()
+            # ids from clients end up in logs: keep them short and printable
+            if 0 < len(value) <= 128 and value.isprintable():
+                return value
+    return None
\ No newline at end of file
@@ -0,0 +1,151 @@
+"""
+Local stand-in for superheroapi.com, served by aiohttp on a free port.
+
+Serves `/{token}/{id}`, `/{token}/{id}/{section}` and `/{token}/search/{name}`
+in the upstream format, and the bytes in `images` at `/images/{name}`. Tests
+can queue failure statuses, add latency (also per section) or a random error
+rate, and read how many requests arrived:
+
+    async with FakeUpstream() as fake:
+        fake.fail_with(503, 503)
+        monkeypatch.setattr(settings, "API_HERO", fake.url)
+"""
+
+import random
+import asyncio
+import typing as t
+
+from aiohttp import web
+
+
+def character(hero_id: int, name: str, power: int = 50, **biography) -> dict:
+    """A character payload shaped like superheroapi.com's."""
+    return {
+        "response": "success",
+        "id": str(hero_id),
+        "name": name,
+        "powerstats": {
+            "intelligence": str(power),
+            "strength": str(power),
+            "speed": str(power),
+            "power": str(power),
+        },
+        "biography": {
+            "full-name": biography.get("full_name", f"{name} Full Name"),
+            "publisher": biography.get("publisher", "Marvel Comics"),
+            "alignment": biography.get("alignment", "good"),
+        },
+        "appearance": {"gender": "Male", "race": "Human", "height": ["6'2", "188 cm"]},
+        "work": {"occupation": "-", "base": "-"},
+        "connections": {"group-affiliation": "-", "relatives": "-"},
+        "image": {"url": f"https://example.com/{hero_id}.jpg"},
+    }
+
+
+DEFAULT_CATALOG = [
+    character(69, "Batman", 47, publisher="DC Comics", full_name="Terry McGinnis"),
+    character(70, "Batman", 100, publisher="DC Comics", full_name="Bruce Wayne"),
+    character(620, "Spider-Man", 74, full_name="Peter Parker"),
+    character(644, "Superman", 100, publisher="DC Comics", full_name="Clark Kent"),
+]
+
+
+class FakeUpstream:
+    def __init__(
+        self,
+        catalog: t.Optional[t.List[dict]] = None,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        port: int = 0,
+        section_latency: t.Optional[t.Dict[str, float]] = None,
+    ):
+        self.catalog = {int(c["id"]): c for c in catalog or DEFAULT_CATALOG}
+        self.latency = latency
+        self.error_rate = error_rate
+        self.section_latency = section_latency or {}
+        # name -> (body, content type)
+        self.images: t.Dict[str, t.Tuple[bytes, str]] = {}
+        self.port = port
+        self.requests = 0
+        self._failures: t.List[int] = []
+        self._runner: t.Optional[web.AppRunner] = None
+        self.url = ""
+
+    def fail_with(self, *statuses: int) -> None:
+        """Answers the next requests with these statuses, in order."""
+        self._failures.extend(statuses)
+
+    async def _respond(self, payload: dict) -> web.Response:
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self._failures:
+            return web.json_response({"error": "fake"}, status=self._failures.pop(0))
+        if self.error_rate and random.random() < self.error_rate:
+            return web.json_response({"error": "fake"}, status=503)
+        return web.json_response(payload)
+
+    async def _by_id(self, request: web.Request) -> web.Response:
+        hero = self.catalog.get(int(request.match_info["hero_id"]))
+        return await self._respond(hero or {"response": "error", "error": "invalid id"})
+
+    async def _section(self, request: web.Request) -> web.Response:
+        hero = self.catalog.get(int(request.match_info["hero_id"]))
+        section = request.match_info["section"]
+        if hero is None or section not in hero:
+            return await self._respond({"response": "error", "error": "invalid id"})
+        await asyncio.sleep(self.section_latency.get(section, 0.0))
+        return await self._respond(
+            {"response": "success", "id": hero["id"], "name": hero["name"]}
+            | hero[section]
+        )
+
+    async def _image(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self._failures:
+            return web.Response(status=self._failures.pop(0))
+        image = self.images.get(request.match_info["name"])
+        if image is None:
+            return web.Response(status=404)
+        body, content_type = image
+        return web.Response(body=body, headers={"Content-Type": content_type})
+
+    async def _search(self, request: web.Request) -> web.Response:
+        name = request.match_info["name"].lower()
+        results = [c for c in self.catalog.values() if name in c["name"].lower()]
+        if not results:
+            payload = {
+                "response": "error",
+                "error": "character with given name not found",
+            }
+        else:
+            payload = {"response": "success", "results-for": name, "results": results}
+        return await self._respond(payload)
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_get("/images/{name}", self._image)
+        app.router.add_get("/{token}/search/{name}", self._search)
+        app.router.add_get(r"/{token}/{hero_id:\d+}", self._by_id)
+        app.router.add_get(r"/{token}/{hero_id:\d+}/{section}", self._section)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", self.port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+        return self.url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> "FakeUpstream":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
@@ -1,8 +1,17 @@
+import pytest
+
 from src.app.routers import _call_api_method, Endpoint
+from src.app._upstream import close_upstream_client
+
+
+@pytest.fixture(autouse=True)
+async def upstream_client():
+    yield
+    await close_upstream_client()
 
 
-def test_call_api_method_returns_valid_response():
-    response = _call_api_method("id", hero_id=1)
+async def test_call_api_method_returns_valid_response():
+    response = await _call_api_method("id", hero_id=1)
 
     assert response is not None
     assert response.status_code == 200
@@ -15,8 +24,10 @@ def test_call_api_method_returns_valid_response():
         assert "powerstats" in data or "biography" in data
 
 
-def test_call_api_method_returns_valid_search_results():
-    response = _call_api_method(endpoint=Endpoint.SEARCH, search_name="Abe Sapien")
+async def test_call_api_method_returns_valid_search_results():
+    response = await _call_api_method(
+        endpoint=Endpoint.SEARCH, search_name="Abe Sapien"
+    )
 
     assert response.status_code == 200
     data = response.json()
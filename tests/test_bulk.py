@@ -0,0 +1,95 @@
+import httpx
+import pytest
+
+from unittest.mock import MagicMock, patch
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.app._bulk import import_heroes
+
+
+def search_response(name):
+    if name == "Nobody":
+        return httpx.Response(200, json={"response": "error", "error": "not found"})
+    return httpx.Response(
+        200,
+        json={
+            "response": "success",
+            "results": [{"name": name, "powerstats": {"power": "50"}}],
+        },
+    )
+
+
+@pytest.mark.asyncio
+async def test_import_heroes_batches_inserts_and_skips_existing():
+    db = MagicMock(spec=AsyncSession)
+    db.scalars.return_value = ["batman"]
+    inserted_names = []
+
+    def execute(stmt):
+        compiled = stmt.compile(dialect=postgresql.dialect())
+        assert "ON CONFLICT (name) DO NOTHING" in str(compiled)
+        batch = [v for k, v in compiled.params.items() if k.startswith("name_m")]
+        rows = [
+            (len(inserted_names) + i, name) for i, name in enumerate(batch, start=1)
+        ]
+        inserted_names.extend(name for _, name in rows)
+        return rows
+
+    db.execute.side_effect = execute
+
+    async def fake_search(endpoint, search_name):
+        return search_response(search_name)
+
+    names = ["Batman", "Superman", "Hulk", "Thor", "Nobody", "superman", " "]
+    with patch("src.app._bulk._call_api_method", side_effect=fake_search) as api:
+        results = [r async for r in import_heroes(names, db, batch_size=2)]
+
+    by_name = {r["name"]: r["status"] for r in results}
+    assert by_name == {
+        "Batman": "exists",
+        "Superman": "created",
+        "Hulk": "created",
+        "Thor": "created",
+        "Nobody": "not_found",
+    }
+    assert api.await_count == 4
+    assert db.scalars.await_count == 1
+    assert db.execute.await_count == 2
+    assert sorted(inserted_names) == ["Hulk", "Superman", "Thor"]
+
+
+@pytest.mark.asyncio
+async def test_import_heroes_reports_conflicts_as_existing():
+    db = MagicMock(spec=AsyncSession)
+    db.scalars.return_value = []
+    db.execute.return_value = []
+
+    async def fake_search(endpoint, search_name):
+        return search_response(search_name)
+
+    with patch("src.app._bulk._call_api_method", side_effect=fake_search):
+        results = [r async for r in import_heroes(["Thor"], db)]
+
+    assert results == [{"name": "Thor", "status": "exists"}]
+    db.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_import_heroes_reports_a_non_json_body_as_an_error():
+    db = MagicMock(spec=AsyncSession)
+    db.scalars.return_value = []
+    db.execute.return_value = [(1, "Thor")]
+
+    async def fake_search(endpoint, search_name):
+        if search_name == "Loki":
+            return httpx.Response(200, text="<html>Service Unavailable</html>")
+        return search_response(search_name)
+
+    with patch("src.app._bulk._call_api_method", side_effect=fake_search):
+        results = [r async for r in import_heroes(["Loki", "Thor"], db)]
+
+    by_name = {r["name"]: r for r in results}
+    assert by_name["Thor"]["status"] == "created"
+    assert by_name["Loki"]["status"] == "error"
+    assert "invalid JSON" in by_name["Loki"]["detail"]
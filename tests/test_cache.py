@@ -0,0 +1,204 @@
+import httpx
+import pytest
+import asyncio
+
+from unittest.mock import AsyncMock
+from prometheus_client import REGISTRY
+
+from src.app._cache import InMemoryBackend, LRUCache, ResponseCache, UpstreamCache
+
+
+def make_response(status_code=200, payload=None):
+    return httpx.Response(status_code, json=payload or {"response": "success"})
+
+
+@pytest.fixture
+def cache():
+    return UpstreamCache(maxsize=8, hit_ttl=60, miss_ttl=5)
+
+
+@pytest.mark.asyncio
+async def test_cache_serves_repeated_lookup_without_upstream(cache):
+    fetch = AsyncMock(return_value=make_response(payload={"results": [{"id": "1"}]}))
+
+    first = await cache.get_or_fetch("search:batman", fetch)
+    second = await cache.get_or_fetch("search:batman", fetch)
+
+    fetch.assert_awaited_once()
+    assert second.status_code == 200
+    assert second.json() == first.json()
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_uses_miss_ttl_for_not_found(cache):
+    not_found = make_response(payload={"response": "error", "error": "not found"})
+
+    assert cache._ttl_for(not_found) == cache.miss_ttl
+    assert cache._ttl_for(make_response()) == cache.hit_ttl
+    assert cache._ttl_for(make_response(status_code=503)) == 0
+
+
+@pytest.mark.asyncio
+async def test_cache_does_not_store_server_errors(cache):
+    fetch = AsyncMock(return_value=make_response(status_code=503))
+
+    await cache.get_or_fetch("search:batman", fetch)
+    await cache.get_or_fetch("search:batman", fetch)
+
+    assert fetch.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_cache_shares_entries_through_backend():
+    backend = InMemoryBackend()
+    worker_a = UpstreamCache(maxsize=8, hit_ttl=60, miss_ttl=5, backend=backend)
+    worker_b = UpstreamCache(maxsize=8, hit_ttl=60, miss_ttl=5, backend=backend)
+    fetch = AsyncMock(return_value=make_response())
+
+    await worker_a.get_or_fetch("id:70", fetch)
+    response = await worker_b.get_or_fetch("id:70", fetch)
+
+    fetch.assert_awaited_once()
+    assert response.json() == {"response": "success"}
+    assert worker_b.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_exports_lookups_by_result():
+    def lookups(result):
+        return (
+            REGISTRY.get_sample_value(
+                "superhero_upstream_cache_lookups_total", {"result": result}
+            )
+            or 0
+        )
+
+    before = {result: lookups(result) for result in ("local_hit", "shared_hit", "miss")}
+    backend = InMemoryBackend()
+    worker_a = UpstreamCache(maxsize=8, hit_ttl=60, miss_ttl=5, backend=backend)
+    worker_b = UpstreamCache(maxsize=8, hit_ttl=60, miss_ttl=5, backend=backend)
+    fetch = AsyncMock(return_value=make_response())
+
+    await worker_a.get_or_fetch("id:70", fetch)
+    await worker_b.get_or_fetch("id:70", fetch)
+    await worker_b.get_or_fetch("id:70", fetch)
+
+    assert {result: lookups(result) - before[result] for result in before} == {
+        "local_hit": 1,
+        "shared_hit": 1,
+        "miss": 1,
+    }
+
+
+@pytest.mark.asyncio
+async def test_cache_backend_hit_expires_locally_with_the_shared_entry():
+    backend = InMemoryBackend()
+    worker_a = UpstreamCache(maxsize=8, hit_ttl=0.05, miss_ttl=5, backend=backend)
+    worker_b = UpstreamCache(maxsize=8, hit_ttl=60, miss_ttl=5, backend=backend)
+    fetch = AsyncMock(return_value=make_response())
+
+    await worker_a.get_or_fetch("id:70", fetch)
+    await worker_b.get_or_fetch("id:70", fetch)
+    await asyncio.sleep(0.1)
+    await worker_b.get_or_fetch("id:70", fetch)
+
+    assert fetch.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_cache_falls_back_to_upstream_when_the_backend_fails():
+    backend = AsyncMock(spec=InMemoryBackend)
+    backend.get.side_effect = ConnectionError("redis is down")
+    backend.set.side_effect = ConnectionError("redis is down")
+    cache = UpstreamCache(maxsize=8, hit_ttl=60, miss_ttl=5, backend=backend)
+    fetch = AsyncMock(return_value=make_response())
+
+    first = await cache.get_or_fetch("id:70", fetch)
+    second = await cache.get_or_fetch("id:70", fetch)
+
+    fetch.assert_awaited_once()
+    backend.set.assert_awaited_once()
+    assert first.json() == second.json() == {"response": "success"}
+    assert cache.stats()["hits"] == 1
+
+
+def test_lru_cache_evicts_least_recently_used():
+    lru = LRUCache(maxsize=2)
+    lru.set("a", 1, ttl=60)
+    lru.set("b", 2, ttl=60)
+    lru.get("a")
+    lru.set("c", 3, ttl=60)
+
+    assert lru.get("a") == 1
+    assert lru.get("b") is None
+    assert lru.get("c") == 3
+
+
+def test_response_cache_key_ignores_param_order_and_unset_params():
+    cache = ResponseCache(maxsize=8, maxbytes=1024, ttl=30)
+
+    assert cache.key(limit=10, cursor=None, name="a") == cache.key(name="a", limit=10)
+
+
+def test_response_cache_evicts_by_bytes():
+    cache = ResponseCache(maxsize=8, maxbytes=10, ttl=30)
+    cache.set(cache.key(page=1), b"123456")
+    cache.set(cache.key(page=2), b"123456")
+
+    assert cache.get(cache.key(page=1)) is None
+    assert cache.get(cache.key(page=2)).body == b"123456"
+    assert cache.stats()["bytes"] == 6
+
+
+def test_response_cache_drops_results_computed_before_a_write():
+    cache = ResponseCache(maxsize=8, maxbytes=1024, ttl=30)
+    stale_key = cache.key(page=1)
+
+    cache.bump()
+    cached = cache.set(stale_key, b"[]")
+
+    assert cached.etag
+    assert cache.get(stale_key) is None
+    assert cache.get(cache.key(page=1)) is None
+
+
+def test_response_cache_drops_results_after_another_process_wrote():
+    cache = ResponseCache(maxsize=8, maxbytes=1024, ttl=30)
+    cache.observe(3)
+    cache.observe(3)
+    cache.set(cache.key(page=1), b"[]")
+
+    cache.observe(3)
+    assert cache.get(cache.key(page=1)) is not None
+
+    cache.observe(4)
+    assert cache.get(cache.key(page=1)) is None
+
+    # may have been computed before the writer committed
+    cache.set(cache.key(page=1), b"[1]")
+    cache.observe(4)
+    assert cache.get(cache.key(page=1)) is None
+
+    cache.set(cache.key(page=1), b"[1, 2]")
+    cache.observe(4)
+    assert cache.get(cache.key(page=1)).body == b"[1, 2]"
+
+
+@pytest.mark.asyncio
+async def test_response_cache_watches_the_shared_version():
+    cache = ResponseCache(maxsize=8, maxbytes=1024, ttl=30)
+    versions = iter([ConnectionError("database is down"), 7])
+
+    async def read_version():
+        version = next(versions, 7)
+        if isinstance(version, Exception):
+            raise version
+        return version
+
+    watch = asyncio.create_task(cache.watch(read_version, 0.01))
+    await asyncio.sleep(0.05)
+    watch.cancel()
+
+    assert cache.shared_version == 7
@@ -0,0 +1,339 @@
+import json
+import random
+import asyncio
+import pytest
+import numpy as np
+
+from unittest.mock import MagicMock
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.models import Hero
+from src.app._columnar import HeroColumns, HeroIndex
+from src.app._filters import FilterError, compile_filter, parse_filters
+from tests.test_filters import random_filter
+
+
+PUBLISHERS = ["Marvel Comics", "DC Comics", "Dark Horse Comics", None]
+
+
+def make_rows(count, seed=1):
+    rng = random.Random(seed)
+
+    def stat():
+        return None if rng.random() < 0.1 else float(rng.randint(0, 100))
+
+    return [
+        {
+            "id": hero_id,
+            "name": f"{rng.choice(['Bat', 'Spider', 'Iron', 'Super'])}man {hero_id}",
+            "intelligence": stat(),
+            "strength": stat(),
+            "speed": stat(),
+            "power": stat(),
+            "full_name": rng.choice(["Bruce Wayne", "Peter Parker", None]),
+            "publisher": rng.choice(PUBLISHERS),
+            "alignment": rng.choice(["good", "bad", "neutral", None]),
+            "image_url": None,
+            "upstream_id": rng.choice([hero_id, None]),
+        }
+        for hero_id in range(1, count + 1)
+    ]
+
+
+@pytest.fixture(scope="module")
+def rows():
+    return make_rows(300)
+
+
+@pytest.fixture(scope="module")
+def sqlite(rows):
+    engine = create_engine("sqlite://")
+    Hero.__table__.create(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Hero.__table__), rows)
+    return engine
+
+
+def sql_ids(engine, tree):
+    with engine.connect() as conn:
+        query = select(Hero.id).filter(compile_filter(tree)).order_by(Hero.id)
+        return list(conn.execute(query).scalars())
+
+
+def memory_ids(columns, tree):
+    heroes, _ = columns.select(None, tree, None, len(columns.rows))
+    return [hero["id"] for hero in heroes]
+
+
+@pytest.mark.parametrize(
+    "filters",
+    [
+        {"power": {"gte": 90}},
+        {"power": {"between": [20, 30]}, "speed": {"lt": 50}},
+        {"intelligence": {"eq": 50}},
+        {"not": {"strength": {"gt": 50}}},
+        {"or": [{"publisher": {"eq": None}}, {"alignment": {"in": ["bad"]}}]},
+        {"name": {"prefix": "spider"}},
+        {"full_name": {"ilike": "%WAYNE"}},
+        {"upstream_id": {"ne": 7}},
+    ],
+)
+def test_memory_engine_matches_sql(rows, sqlite, filters):
+    tree = parse_filters(json.dumps(filters))
+
+    assert memory_ids(HeroColumns(rows), tree) == sql_ids(sqlite, tree)
+
+
+def test_fuzzed_filters_match_sql(rows, sqlite):
+    columns = HeroColumns(rows)
+    rng = random.Random(1234)
+    checked = 0
+    for _ in range(1500):
+        try:
+            tree = parse_filters(json.dumps(random_filter(rng)))
+        except FilterError:
+            continue
+        assert memory_ids(columns, tree) == sql_ids(sqlite, tree), tree
+        checked += 1
+
+    assert checked > 100
+
+
+STATS = ("intelligence", "strength", "speed", "power")
+
+
+def brute_force_nearest(rows, hero, k, keep=lambda row: True):
+    """Distances of the k nearest heroes, by a plain loop over every row."""
+    distances = sorted(
+        sum((row[stat] - hero[stat]) ** 2 for stat in STATS) ** 0.5
+        for row in rows
+        if row is not hero
+        and keep(row)
+        and all(row[stat] is not None for stat in STATS)
+    )
+    return distances[:k]
+
+
+def test_nearest_matches_brute_force(rows):
+    columns = HeroColumns(rows)
+    positions = [p for p in range(len(rows)) if columns.complete[p]][:40]
+
+    for position, found in zip(positions, columns.nearest(positions, 7)):
+        hero = rows[position]
+        assert [d for _, d in found] == pytest.approx(
+            brute_force_nearest(rows, hero, 7)
+        )
+        assert position not in [p for p, _ in found]
+        assert all(columns.complete[p] for p, _ in found)
+
+
+def test_nearest_applies_prefilter(rows):
+    columns = HeroColumns(rows)
+    tree = parse_filters(
+        '{"publisher": {"eq": "DC Comics"}, "alignment": {"eq": "good"}}'
+    )
+    position = next(p for p in range(len(rows)) if columns.complete[p])
+
+    (found,) = columns.nearest([position], 5, tree)
+
+    assert {rows[p]["publisher"] for p, _ in found} == {"DC Comics"}
+    assert {rows[p]["alignment"] for p, _ in found} == {"good"}
+    assert [d for _, d in found] == pytest.approx(
+        brute_force_nearest(
+            rows,
+            rows[position],
+            5,
+            lambda row: row["publisher"] == "DC Comics" and row["alignment"] == "good",
+        )
+    )
+
+
+def test_nearest_returns_fewer_when_candidates_run_out():
+    rows = make_rows(3, seed=5)
+    for row in rows:
+        row.update(intelligence=1.0, strength=2.0, speed=3.0, power=4.0)
+    columns = HeroColumns(rows)
+
+    assert columns.nearest([0, 2], 10) == [[(1, 0.0), (2, 0.0)], [(0, 0.0), (1, 0.0)]]
+    assert columns.position(3) == 2
+    assert columns.position(4) is None
+
+
+def test_memory_engine_pages_by_cursor_and_projects_fields(rows):
+    columns = HeroColumns(rows)
+    tree = parse_filters('{"power": {"gte": 50}}')
+    expected = [row["id"] for row in rows if (row["power"] or 0) >= 50]
+
+    first, cursor = columns.select(None, tree, None, 5, ["id", "power"])
+    second, _ = columns.select(None, tree, cursor, 5, ["id", "power"])
+
+    assert [hero["id"] for hero in first + second] == expected[:10]
+    assert cursor == expected[4]
+    assert set(first[0]) == {"id", "power"}
+
+
+def test_memory_engine_name_lookup_is_case_insensitive(rows):
+    name = rows[41]["name"]
+
+    heroes, cursor = HeroColumns(rows).select(name.upper(), None, None, 10)
+
+    assert [hero["name"] for hero in heroes] == [name]
+    assert cursor is None
+
+
+@pytest.mark.parametrize("max_loose", [2048, 10])
+def test_applied_changes_match_a_rebuild(rows, sqlite, monkeypatch, max_loose):
+    monkeypatch.setattr("src.app._columnar.MAX_LOOSE_ROWS", max_loose)
+    columns = HeroColumns(rows)
+    rng = random.Random(7)
+    others = make_rows(330, seed=2)
+    updated = [others[i] for i in sorted(rng.sample(range(300), 30))]
+    updated[0] = {**updated[0], "full_name": "Bruce Thomas Wayne, the Dark Knight"}
+    updated[1] = {**updated[1], "power": None, "name": rows[0]["name"]}
+    added = others[300:]
+
+    applied = columns.apply(updated + added)
+
+    merged = list(rows)
+    for row in updated:
+        merged[row["id"] - 1] = row
+    rebuilt = HeroColumns(merged + added)
+    checked = 0
+    for _ in range(1500):
+        try:
+            tree = parse_filters(json.dumps(random_filter(rng)))
+        except FilterError:
+            continue
+        assert memory_ids(applied, tree) == memory_ids(rebuilt, tree), tree
+        checked += 1
+    assert checked > 100
+    for row in rows + added:
+        assert applied.select(row["name"], None, None, 10)[0] == (
+            rebuilt.select(row["name"], None, None, 10)[0]
+        )
+    np.testing.assert_array_equal(applied.vectors, rebuilt.vectors)
+    # a value longer than any before is not truncated
+    tree = parse_filters('{"full_name": {"prefix": "bruce thomas wayne, the dark"}}')
+    assert memory_ids(applied, tree) == [updated[0]["id"]]
+
+    # readers of the old snapshot see it unchanged
+    tree = parse_filters('{"power": {"gte": 50}}')
+    assert memory_ids(columns, tree) == sql_ids(sqlite, tree)
+
+
+def test_apply_appends_in_place_without_touching_the_old_snapshot(rows):
+    columns = HeroColumns(rows)
+    added = make_rows(310, seed=3)[300:]
+
+    first = columns.apply(added[:5])
+    second = first.apply(added[5:])
+    # a sibling of `second` cannot write over what it appended
+    sibling = first.apply([{**added[5], "name": "Other"}])
+
+    assert first._storage is second._storage is columns._storage
+    assert sibling._storage is not columns._storage
+    assert (columns.size, first.size, second.size) == (300, 305, 310)
+    assert list(second.ids[-10:]) == [row["id"] for row in added]
+    assert second.select("Other", None, None, 10)[0] == []
+    assert sibling.select("Other", None, None, 10)[0][0]["id"] == 306
+
+
+def test_apply_leaves_ids_below_the_high_water_mark_to_a_rebuild():
+    rows = make_rows(5)
+    columns = HeroColumns([row for row in rows if row["id"] != 3])
+
+    assert columns.apply([rows[2]]) is None
+    assert columns.apply([]) is columns
+
+
+def fake_db(*results):
+    db = MagicMock(spec=AsyncSession)
+    db.execute.side_effect = [
+        MagicMock(mappings=MagicMock(return_value=result)) for result in results
+    ]
+    return db
+
+
+@pytest.mark.asyncio
+async def test_hero_index_applies_deltas_after_writes():
+    rows = make_rows(3)
+    index = HeroIndex(poll_interval=3600, reload_interval=3600)
+    updated = {**rows[1], "power": 100.0}
+    added = {**rows[2], "id": 4, "name": "Newman"}
+    db = fake_db(rows, [updated, added])
+
+    first = await index.columns(db)
+    assert await index.columns(db) is first
+
+    index.mark_changed([2, 4])
+    columns = await index.columns(db)
+
+    assert db.execute.call_count == 2
+    assert list(columns.ids) == [1, 2, 3, 4]
+    assert columns.rows[1]["power"] == 100.0
+    assert "heroes.id > " in str(db.execute.call_args[0][0])
+
+
+@pytest.mark.asyncio
+async def test_hero_index_reloads_when_changes_are_unknown():
+    rows = make_rows(3)
+    index = HeroIndex(poll_interval=3600, reload_interval=3600)
+    db = fake_db(rows, rows[:2])
+
+    await index.columns(db)
+    index.mark_changed([])
+    columns = await index.columns(db)
+
+    assert list(columns.ids) == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_hero_index_serves_the_old_snapshot_during_a_timed_reload():
+    rows = make_rows(3)
+    index = HeroIndex(poll_interval=3600, reload_interval=3600)
+    release = asyncio.Event()
+
+    async def execute(query):
+        if db.execute.call_count > 1:
+            await release.wait()
+        return MagicMock(mappings=MagicMock(return_value=rows))
+
+    db = MagicMock(spec=AsyncSession)
+    db.execute.side_effect = execute
+    first = await index.columns(db)
+
+    index.reload_interval = 0
+    reload = asyncio.create_task(index.columns(db))
+    await asyncio.sleep(0.01)
+    assert await index.columns(db) is first
+
+    # a write by this process is worth waiting for
+    index.mark_changed([3])
+    waiting = asyncio.create_task(index.columns(db))
+    await asyncio.sleep(0.01)
+    assert not waiting.done()
+
+    release.set()
+    assert await reload is not first
+    assert await waiting is not first
+
+
+@pytest.mark.asyncio
+async def test_hero_index_keeps_changes_when_a_refresh_fails():
+    rows = make_rows(3)
+    index = HeroIndex(poll_interval=3600, reload_interval=3600)
+    db = fake_db(rows)
+    await index.columns(db)
+
+    index.mark_changed([2])
+    db.execute.side_effect = [
+        ConnectionError("database is down"),
+        MagicMock(mappings=MagicMock(return_value=[{**rows[1], "power": 1.0}])),
+    ]
+    with pytest.raises(ConnectionError):
+        await index.columns(db)
+    columns = await index.columns(db)
+
+    assert columns.rows[1]["power"] == 1.0
+    assert " IN " in str(db.execute.call_args[0][0])
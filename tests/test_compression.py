@@ -0,0 +1,175 @@
+import gzip
+import asyncio
+import zlib
+
+import httpx
+import pytest
+
+from fastapi import FastAPI, Request
+from fastapi.responses import (
+    JSONResponse,
+    PlainTextResponse,
+    Response,
+    StreamingResponse,
+)
+
+from src.config.settings import settings
+from src.app._compression import CompressionMiddleware, choose_encoding, compress
+
+BODY = {"heroes": [{"id": i, "name": f"Hero {i}"} for i in range(200)]}
+
+
+@pytest.fixture
+def app():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware)
+
+    @app.get("/heroes")
+    async def heroes():
+        return BODY
+
+    @app.get("/small")
+    async def small():
+        return {"id": 1}
+
+    @app.get("/image")
+    async def image():
+        return Response(b"\x89PNG" * 1000, media_type="image/png")
+
+    @app.get("/encoded")
+    async def encoded():
+        return PlainTextResponse(
+            compress(b"x" * 2000, "gzip"), headers={"Content-Encoding": "gzip"}
+        )
+
+    @app.get("/tagged")
+    async def tagged(request: Request):
+        headers = {"ETag": '"v1"'}
+        if request.headers.get("if-none-match") == '"v1"':
+            return Response(status_code=304, headers=headers)
+        return JSONResponse(BODY, headers=headers)
+
+    @app.get("/stream")
+    async def stream():
+        async def lines():
+            for i in range(3):
+                yield f'{{"id": {i}}}\n'.encode()
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    return app
+
+
+@pytest.fixture
+def client(app):
+    transport = httpx.ASGITransport(app=app)
+    return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+
+def test_choose_encoding():
+    available = ["br", "gzip"]
+    assert choose_encoding(None, available) is None
+    assert choose_encoding("identity", available) is None
+    assert choose_encoding("gzip, deflate, br", available) == "br"
+    assert choose_encoding("br;q=0.5, gzip", available) == "gzip"
+    assert choose_encoding("br;q=0, *", available) == "gzip"
+    assert choose_encoding("*;q=0", available) is None
+    assert choose_encoding("GZIP;q=0.8", ["gzip"]) == "gzip"
+
+
+async def test_large_json_is_gzipped(client):
+    async with client:
+        response = await client.get("/heroes", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(str(BODY)) / 3
+    assert response.json() == BODY
+
+
+async def test_leaves_alone_what_is_not_worth_compressing(client):
+    headers = {"Accept-Encoding": "gzip"}
+    async with client:
+        small = await client.get("/small", headers=headers)
+        image = await client.get("/image", headers=headers)
+        encoded = await client.get("/encoded", headers=headers)
+        identity = await client.get("/heroes", headers={"Accept-Encoding": "identity"})
+
+    for response in (small, image, identity):
+        assert "content-encoding" not in response.headers
+    assert encoded.text == "x" * 2000
+    assert identity.json() == BODY
+
+
+async def test_varies_on_accept_encoding_whether_compressed_or_not(client):
+    async with client:
+        small = await client.get("/small", headers={"Accept-Encoding": "gzip"})
+        identity = await client.get("/heroes", headers={"Accept-Encoding": "identity"})
+        image = await client.get("/image", headers={"Accept-Encoding": "gzip"})
+
+    assert small.headers["vary"] == identity.headers["vary"] == "Accept-Encoding"
+    assert "vary" not in image.headers
+
+
+async def test_compressed_responses_get_their_own_etag(client):
+    gzip_only = {"Accept-Encoding": "gzip"}
+    identity_only = {"Accept-Encoding": "identity"}
+    async with client:
+        compressed = await client.get("/tagged", headers=gzip_only)
+        identity = await client.get("/tagged", headers=identity_only)
+        revalidated = await client.get(
+            "/tagged", headers={**gzip_only, "If-None-Match": '"v1-gzip"'}
+        )
+        identity_revalidated = await client.get(
+            "/tagged", headers={**identity_only, "If-None-Match": '"v1"'}
+        )
+
+    assert compressed.headers["etag"] == '"v1-gzip"'
+    assert identity.headers["etag"] == '"v1"'
+    assert revalidated.status_code == identity_revalidated.status_code == 304
+    assert revalidated.headers["etag"] == '"v1-gzip"'
+    assert revalidated.headers["vary"] == "Accept-Encoding"
+    assert identity_revalidated.headers["etag"] == '"v1"'
+
+
+async def test_streams_are_flushed_chunk_by_chunk(app, monkeypatch):
+    monkeypatch.setattr(settings, "COMPRESS_MIN_SIZE", 10_000)
+    messages = []
+    disconnected = asyncio.Event()
+
+    async def receive():
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/stream",
+        "raw_path": b"/stream",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"accept-encoding", b"gzip")],
+        "http_version": "1.1",
+        "scheme": "http",
+        "server": ("test", 80),
+        "client": ("test", 1234),
+    }
+    await app(scope, receive, send)
+    disconnected.set()
+
+    start, *bodies = messages
+    assert (b"content-encoding", b"gzip") in start["headers"]
+    decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    # each line can be decoded as soon as it arrives
+    lines = [decoder.decompress(message["body"]) for message in bodies]
+    assert lines[:3] == [b'{"id": 0}\n', b'{"id": 1}\n', b'{"id": 2}\n']
+    assert gzip.decompress(b"".join(m["body"] for m in bodies)).count(b"\n") == 3
+
+
+def test_brotli_when_installed():
+    brotli = pytest.importorskip("brotli")
+    assert brotli.decompress(compress(b"hero" * 100, "br")) == b"hero" * 100
+    assert choose_encoding("gzip, br") == "br"
@@ -0,0 +1,167 @@
+import time
+import pytest
+
+from types import SimpleNamespace
+from fastapi import HTTPException
+from sqlalchemy.dialects import postgresql
+
+from src.config.settings import settings
+from src.app._cache import upstream_cache
+from src.app._upstream import close_upstream_client
+from src.app._resilience import CircuitBreaker, ResilientUpstream, TokenBucket
+from src.app._details import fetch_sections, parse_expand
+from src.app.routers import get_hero
+from tests.fake_upstream import FakeUpstream
+
+
+@pytest.fixture
+async def fake(monkeypatch):
+    upstream_cache.clear()
+    async with FakeUpstream() as fake:
+        monkeypatch.setattr(settings, "API_HERO", fake.url)
+        # not the shared client, whose breaker earlier tests may have opened
+        upstream = ResilientUpstream(
+            limiter=TokenBucket(rate=0, burst=1, max_wait=0),
+            breaker=CircuitBreaker(failure_threshold=100, reset_timeout=30),
+            attempts=1,
+            backoff=0,
+            max_backoff=0,
+            deadline=5,
+        )
+        monkeypatch.setattr("src.app._helpers.upstream", upstream)
+        yield fake
+    await close_upstream_client()
+    upstream_cache.clear()
+
+
+def hero_row(sections=None, upstream_id=70, name="Batman"):
+    values = {
+        "id": 1,
+        "name": name,
+        "intelligence": 100.0,
+        "strength": 26.0,
+        "speed": 27.0,
+        "power": 47.0,
+        "full_name": "Bruce Wayne",
+        "publisher": "DC Comics",
+        "alignment": "good",
+        "image_url": None,
+        "upstream_id": upstream_id,
+        "sections": sections,
+    }
+    return SimpleNamespace(_asdict=lambda: dict(values))
+
+
+def test_parse_expand():
+    assert parse_expand("work, Appearance,work") == ["appearance", "work"]
+
+    with pytest.raises(ValueError, match="Unknown sections: powers"):
+        parse_expand("work,powers")
+
+
+async def test_fetch_sections_concurrently_and_strips_the_envelope(fake):
+    fake.section_latency = {"appearance": 0.2, "work": 0.2, "connections": 0.2}
+
+    started = time.monotonic()
+    found, missing = await fetch_sections(70, ["appearance", "work", "connections"])
+
+    assert time.monotonic() - started < 0.5
+    assert missing == []
+    assert found["work"] == {"occupation": "-", "base": "-"}
+    assert set(found["appearance"]) == {"gender", "race", "height"}
+    assert fake.requests == 3
+
+
+async def test_fetch_sections_returns_partial_results_at_the_deadline(
+    fake, monkeypatch
+):
+    monkeypatch.setattr(settings, "HERO_DETAILS_DEADLINE", 0.2)
+    fake.section_latency = {"connections": 1.0}
+
+    found, missing = await fetch_sections(70, ["work", "connections", "image"])
+
+    assert list(found) == ["work", "image"]
+    assert found["image"] == {"url": "https://example.com/70.jpg"}
+    assert missing == ["connections"]
+
+
+async def test_get_hero_fetches_and_stores_missing_sections(fake, db):
+    db.execute.return_value.first.return_value = hero_row({"work": {"base": "x"}})
+
+    hero = await get_hero(hero_id=1, expand="work,appearance", db=db)
+
+    assert hero["name"] == "Batman"
+    assert hero["details"]["work"] == {"base": "x"}
+    assert hero["details"]["appearance"]["race"] == "Human"
+    assert hero["missing"] == []
+    assert fake.requests == 1
+
+    update = db.execute.call_args_list[1].args[0]
+    sql = str(update.compile(dialect=postgresql.dialect()))
+    assert "INSERT INTO hero_sections" in sql
+    assert "SET sections = (hero_sections.sections || excluded.sections)" in sql
+    assert "UPDATE heroes" not in sql
+    db.commit.assert_awaited_once()
+
+
+async def test_get_hero_serves_stored_sections_without_upstream(fake, db):
+    details = {"work": {"base": "x"}, "image": {"url": "y"}}
+    db.execute.return_value.first.return_value = hero_row(details)
+
+    hero = await get_hero(hero_id=1, expand="work", db=db)
+
+    assert hero["details"] == {"work": {"base": "x"}}
+    assert fake.requests == 0
+    assert db.execute.call_count == 1
+
+
+async def test_get_hero_reports_sections_it_could_not_fetch(fake, db):
+    db.execute.return_value.first.return_value = hero_row()
+    fake.fail_with(503)
+
+    hero = await get_hero(hero_id=1, expand="work", db=db)
+
+    assert hero["details"] == {}
+    assert hero["missing"] == ["work"]
+    assert hero["missing_reason"] is None
+    db.commit.assert_not_called()
+
+
+async def test_get_hero_resolves_a_missing_upstream_id_by_name(fake, db):
+    db.execute.return_value.first.return_value = hero_row(upstream_id=None)
+
+    hero = await get_hero(hero_id=1, expand="work", db=db)
+
+    # two Batmen upstream; the full name picks Bruce Wayne's
+    assert hero["upstream_id"] == 70
+    assert hero["details"]["work"] == {"occupation": "-", "base": "-"}
+    assert hero["missing"] == []
+    stored = db.execute.call_args_list[1].args[0]
+    sql = str(stored.compile(dialect=postgresql.dialect()))
+    assert sql.startswith("UPDATE heroes SET upstream_id=")
+
+
+async def test_get_hero_says_why_a_hero_unknown_upstream_has_no_details(fake, db):
+    db.execute.return_value.first.return_value = hero_row(
+        upstream_id=None, name="Nobody"
+    )
+
+    hero = await get_hero(hero_id=1, expand="work,image", db=db)
+
+    assert hero["details"] == {}
+    assert hero["missing"] == ["work", "image"]
+    assert hero["missing_reason"] == "No superheroapi.com character is named 'Nobody'"
+    assert fake.requests == 1
+    db.commit.assert_not_called()
+
+
+async def test_get_hero_errors(db):
+    db.execute.return_value.first.return_value = None
+
+    with pytest.raises(HTTPException) as exc_info:
+        await get_hero(hero_id=1, db=db)
+    assert exc_info.value.status_code == 404
+
+    with pytest.raises(HTTPException) as exc_info:
+        await get_hero(hero_id=1, expand="secrets", db=db)
+    assert exc_info.value.status_code == 400
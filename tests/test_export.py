@@ -0,0 +1,80 @@
+import json
+import pytest
+
+from sqlalchemy import select
+
+from src.db.models import Hero
+from src.app._export import ndjson_lines, csv_lines
+
+
+class FakeStreamResult:
+    def __init__(self, rows, chunk_size):
+        self.rows = rows
+        self.chunk_size = chunk_size
+        self.closed = False
+
+    async def partitions(self):
+        for start in range(0, len(self.rows), self.chunk_size):
+            yield self.rows[start : start + self.chunk_size]
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeStreamSession:
+    """Stands in for AsyncSession.stream() over a server-side cursor."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.result = None
+
+    async def stream(self, statement):
+        chunk_size = statement.get_execution_options()["yield_per"]
+        self.result = FakeStreamResult(self.rows, chunk_size)
+        return self.result
+
+
+@pytest.fixture
+def rows():
+    return [(i, f"Hero {i}", float(i * 10)) for i in range(1, 6)]
+
+
+async def collect(chunks):
+    return [chunk async for chunk in chunks]
+
+
+@pytest.mark.asyncio
+async def test_ndjson_export_streams_in_chunks(rows):
+    db = FakeStreamSession(rows)
+    query = select(Hero.id, Hero.name, Hero.power)
+
+    chunks = await collect(
+        ndjson_lines(db, query, ["id", "name", "power"], chunk_size=2)
+    )
+
+    assert len(chunks) == 3
+    lines = [json.loads(line) for chunk in chunks for line in chunk.splitlines()]
+    assert [line["name"] for line in lines] == [f"Hero {i}" for i in range(1, 6)]
+    assert lines[0] == {"id": 1, "name": "Hero 1", "power": 10.0}
+    assert db.result.closed
+
+
+@pytest.mark.asyncio
+async def test_csv_export_writes_header_once(rows):
+    db = FakeStreamSession(rows)
+    query = select(Hero.id, Hero.name, Hero.power)
+
+    body = "".join(await collect(csv_lines(db, query, ["id", "name", "power"], 2)))
+
+    lines = body.splitlines()
+    assert lines[0] == "id,name,power"
+    assert lines[1:] == [f"{i},Hero {i},{i * 10}.0" for i in range(1, 6)]
+
+
+@pytest.mark.asyncio
+async def test_csv_export_of_empty_result_is_header_only():
+    db = FakeStreamSession([])
+
+    chunks = await collect(csv_lines(db, select(Hero.name), ["name"], 2))
+
+    assert "".join(chunks) == "name\r\n"
@@ -0,0 +1,176 @@
+import json
+import random
+import pytest
+
+from sqlalchemy.dialects import postgresql
+
+from src.app._filters import (
+    FILTERABLE_COLUMNS,
+    FilterError,
+    canonical_json,
+    compile_filter,
+    parse_filters,
+)
+
+
+def sql(filters):
+    expression = compile_filter(parse_filters(json.dumps(filters)))
+    return str(
+        expression.compile(
+            dialect=postgresql.dialect(paramstyle="named"),
+            compile_kwargs={"literal_binds": True},
+        )
+    )
+
+
+def test_filters_compile_to_one_expression():
+    assert sql(
+        {
+            "power": {"gte": 90, "lt": 100},
+            "or": [
+                {"publisher": {"in": ["Marvel Comics", "DC Comics"]}},
+                {"name": {"prefix": "Bat_"}},
+            ],
+            "not": {"alignment": {"eq": "bad"}},
+        }
+    ) == (
+        "heroes.power >= 90.0 AND heroes.power < 100.0 "
+        "AND heroes.alignment != 'bad' AND "
+        "((heroes.name ILIKE 'Bat/_' || '%' ESCAPE '/') "
+        "OR heroes.publisher IN ('DC Comics', 'Marvel Comics'))"
+    )
+
+
+@pytest.mark.parametrize(
+    "filters, expected",
+    [
+        ({"speed": {"ne": 50}}, "heroes.speed != 50.0"),
+        ({"speed": {"gt": 50}}, "heroes.speed > 50.0"),
+        ({"speed": {"lte": 50}}, "heroes.speed <= 50.0"),
+        ({"id": {"between": [10, 20]}}, "heroes.id BETWEEN 10 AND 20"),
+        ({"full_name": {"ilike": "%wayne%"}}, "heroes.full_name ILIKE '%wayne%'"),
+        ({"publisher": {"eq": None}}, "heroes.publisher IS NULL"),
+        ({"not": {"not": {"power": {"eq": 1}}}}, "heroes.power = 1.0"),
+    ],
+)
+def test_filter_operators(filters, expected):
+    assert sql(filters) == expected
+
+
+def test_equivalent_filters_share_canonical_form():
+    first = parse_filters(
+        '{"power": {"gte": 90}, "and": [{"speed": {"lte": 50}}, {"power": {"gte": 90}}]}'
+    )
+    second = parse_filters('{"speed": {"lte": 50.0}, "power": {"gte": 90.0}}')
+
+    assert first == second
+    assert canonical_json(first) == canonical_json(second)
+
+
+def test_compiled_plans_are_cached():
+    tree = parse_filters('{"strength": {"between": [1, 99]}}')
+    compile_filter(tree)
+    hits = compile_filter.cache_info().hits
+
+    assert compile_filter(tree) is compile_filter(tree)
+    assert compile_filter.cache_info().hits == hits + 2
+
+
+@pytest.mark.parametrize(
+    "filters, message",
+    [
+        ("{", "Invalid JSON"),
+        ('["power"]', "non-empty JSON object"),
+        ('{"secret_identity": {"eq": "Bruce"}}', "Unknown filter field"),
+        ('{"power": {"like": 1}}', "Unknown operator"),
+        ('{"power": 90}', "object of operators"),
+        ('{"power": {"gte": "90"}}', "numeric values"),
+        ('{"power": {"gte": true}}', "numeric values"),
+        ('{"power": {"gte": NaN}}', "finite numbers"),
+        ('{"id": {"eq": 1.5}}', "integer values"),
+        ('{"name": {"eq": 1}}', "string values"),
+        ('{"power": {"prefix": "9"}}', "only applies to text fields"),
+        ('{"power": {"between": [1]}}', "[low, high] pair"),
+        ('{"power": {"in": []}}', "non-empty list"),
+        ('{"or": []}', "non-empty list of objects"),
+    ],
+)
+def test_invalid_filters_are_rejected(filters, message):
+    with pytest.raises(FilterError) as exc_info:
+        parse_filters(filters)
+
+    assert message in str(exc_info.value)
+
+
+def test_filter_complexity_limits(monkeypatch):
+    monkeypatch.setattr("src.app._filters.settings.FILTER_MAX_DEPTH", 2)
+    monkeypatch.setattr("src.app._filters.settings.FILTER_MAX_CONDITIONS", 3)
+    monkeypatch.setattr("src.app._filters.settings.FILTER_MAX_IN_VALUES", 2)
+    monkeypatch.setattr("src.app._filters.settings.FILTER_MAX_LENGTH", 100)
+
+    with pytest.raises(FilterError, match="nested too deeply"):
+        parse_filters('{"not": {"not": {"power": {"eq": 1}}}}')
+    with pytest.raises(FilterError, match="Too many conditions"):
+        parse_filters(json.dumps({"or": [{"id": {"eq": i}} for i in range(4)]}))
+    with pytest.raises(FilterError, match="at most 2 values"):
+        parse_filters('{"id": {"in": [1, 2, 3]}}')
+    with pytest.raises(FilterError, match="too long"):
+        parse_filters(" " * 101)
+
+
+def random_filter(rng, depth=0):
+    if depth < 4 and rng.random() < 0.3:
+        kind = rng.choice(["and", "or", "not"])
+        if kind == "not":
+            return {"not": random_filter(rng, depth + 1)}
+        return {kind: [random_filter(rng, depth + 1) for _ in range(rng.randint(0, 3))]}
+
+    field = rng.choice([*FILTERABLE_COLUMNS, "secret_identity"])
+    op = rng.choice(
+        ["eq", "ne", "lt", "lte", "gt", "gte", "in", "between", "prefix", "ilike", "x"]
+    )
+    value = rng.choice(
+        [
+            rng.randint(-5, 105),
+            rng.uniform(0, 100),
+            rng.choice(["Batman", "%man%", "", "Bat_%/"]),
+            None,
+            True,
+            [rng.randint(0, 100) for _ in range(rng.randint(0, 3))],
+            ["Marvel Comics", "DC Comics"],
+            {},
+        ]
+    )
+    return {field: {op: value}}
+
+
+def test_fuzzed_filters_compile_or_fail_cleanly():
+    rng = random.Random(20240601)
+    compiled = 0
+    for _ in range(3000):
+        filters = random_filter(rng)
+        raw = json.dumps(filters)
+        try:
+            tree = parse_filters(raw)
+        except FilterError:
+            continue
+        str(compile_filter(tree).compile(dialect=postgresql.dialect()))
+        # canonical trees are stable under re-parsing
+        assert parse_filters(raw) == tree
+        compiled += 1
+
+    assert compiled > 100
+
+
+def test_fuzzed_key_order_does_not_change_canonical_form():
+    rng = random.Random(7)
+    for _ in range(200):
+        conditions = {
+            field: {"gte": rng.randint(0, 100)}
+            for field in rng.sample(["intelligence", "strength", "speed", "power"], 3)
+        }
+        shuffled = dict(rng.sample(list(conditions.items()), len(conditions)))
+
+        assert parse_filters(json.dumps(conditions)) == parse_filters(
+            json.dumps(shuffled)
+        )
@@ -0,0 +1,290 @@
+import io
+import os
+import asyncio
+import hashlib
+import tempfile
+import threading
+
+import pytest
+
+from types import SimpleNamespace
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+from src.config.settings import settings
+from src.app._images import ImageCache, ImageError
+from src.app._upstream import close_upstream_client
+from src.app.routers import hero_image
+from tests.fake_upstream import FakeUpstream
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"pixels" * 100
+
+
+@pytest.fixture
+async def fake():
+    async with FakeUpstream() as fake:
+        fake.images["batman.png"] = (PNG, "image/png")
+        yield fake
+    await close_upstream_client()
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = ImageCache(str(tmp_path), max_bytes=10_000, sizes={"thumb": 16})
+    monkeypatch.setattr("src.app.routers.image_cache", cache)
+    return cache
+
+
+def files(cache, kind):
+    return [
+        os.path.join(root, name)
+        for root, _, names in os.walk(os.path.join(cache.directory, kind))
+        for name in names
+    ]
+
+
+async def test_downloads_once_into_a_content_addressed_blob(fake, cache):
+    url = f"{fake.url}/images/batman.png"
+
+    first, second = await asyncio.gather(cache.get(url), cache.get(url))
+    third = await cache.get(url)
+
+    digest = hashlib.sha256(PNG).hexdigest()
+    assert first == second == third
+    assert first.digest == digest
+    assert first.path.endswith(f"{digest[:2]}/{digest}.png")
+    assert first.media_type == "image/png"
+    with open(first.path, "rb") as blob:
+        assert blob.read() == PNG
+    assert fake.requests == 1
+    assert files(cache, "tmp") == []
+
+
+async def test_identical_images_share_a_blob(fake, cache):
+    fake.images["copy.png"] = (PNG, "image/png")
+
+    first = await cache.get(f"{fake.url}/images/batman.png")
+    second = await cache.get(f"{fake.url}/images/copy.png")
+
+    assert first.path == second.path
+    assert len(files(cache, "blobs")) == 1
+    assert len(files(cache, "refs")) == 2
+
+
+async def test_evicts_least_recently_used_blobs(fake, cache):
+    for name in ("a", "b", "c"):
+        fake.images[f"{name}.png"] = (name.encode() * 4000, "image/png")
+    a = await cache.get(f"{fake.url}/images/a.png")
+    b = await cache.get(f"{fake.url}/images/b.png")
+    await cache.get(f"{fake.url}/images/a.png")  # now b is the oldest
+
+    c = await cache.get(f"{fake.url}/images/c.png")
+
+    assert sorted(files(cache, "blobs")) == sorted([a.path, c.path])
+    assert not os.path.exists(b.path)
+    # b's ref went with it
+    assert len(files(cache, "refs")) == 2
+
+    await cache.get(f"{fake.url}/images/b.png")
+    assert fake.requests == 4
+
+
+async def test_removes_refs_to_blobs_gone_since_an_earlier_run(fake, cache):
+    kept = await cache.get(f"{fake.url}/images/batman.png")
+    fake.images["gone.png"] = (b"gone" * 10, "image/png")
+    gone = await cache.get(f"{fake.url}/images/gone.png")
+    # e.g. evicted by another worker
+    os.remove(gone.path)
+
+    again = ImageCache(cache.directory, max_bytes=10_000, sizes={})
+
+    assert await again.get(f"{fake.url}/images/batman.png") == kept
+    assert len(files(cache, "refs")) == 1
+    assert again._refs == {kept.path: set(cache._refs[kept.path])}
+
+
+async def test_open_survives_the_blob_being_evicted(fake, cache, monkeypatch):
+    url = f"{fake.url}/images/batman.png"
+    image, file = await cache.open(url)
+    os.remove(image.path)
+    with file:
+        assert file.read() == PNG
+
+    get = cache.get
+
+    async def evicted_right_after(*args):
+        image = await get(*args)
+        monkeypatch.setattr(cache, "get", get)
+        os.remove(image.path)
+        return image
+
+    monkeypatch.setattr(cache, "get", evicted_right_after)
+    image, file = await cache.open(url)
+    with file:
+        assert file.read() == PNG
+    assert image.size == len(PNG)
+    # downloaded again by the first get, and once more after it was evicted
+    assert fake.requests == 3
+
+
+async def test_picks_up_blobs_from_an_earlier_run(fake, cache):
+    url = f"{fake.url}/images/batman.png"
+    image = await cache.get(url)
+
+    again = ImageCache(cache.directory, max_bytes=10_000, sizes={})
+
+    assert await again.get(url) == image
+    assert again._bytes == len(PNG)
+    assert fake.requests == 1
+
+
+async def test_disk_io_runs_off_the_event_loop(fake, cache, monkeypatch):
+    loop_thread = threading.current_thread()
+
+    def off_the_loop(fn):
+        def call(*args, **kwargs):
+            assert threading.current_thread() is not loop_thread, fn.__name__
+            return fn(*args, **kwargs)
+
+        return call
+
+    calls = ("stat", "replace", "remove", "makedirs", "walk")
+    monkeypatch.setattr(
+        "src.app._images.os",
+        SimpleNamespace(
+            path=os.path,
+            getpid=os.getpid,
+            **{name: off_the_loop(getattr(os, name)) for name in calls},
+        ),
+    )
+    monkeypatch.setattr("src.app._images.open", off_the_loop(open), raising=False)
+    monkeypatch.setattr(
+        "src.app._images.tempfile",
+        SimpleNamespace(NamedTemporaryFile=off_the_loop(tempfile.NamedTemporaryFile)),
+    )
+    for name in ("a", "b", "c"):
+        fake.images[f"{name}.png"] = (name.encode() * 4000, "image/png")
+
+    for name in ("a", "b", "c", "a"):
+        await cache.get(f"{fake.url}/images/{name}.png")
+    again = ImageCache(cache.directory, max_bytes=10_000, sizes={})
+    await again.get(f"{fake.url}/images/c.png")
+
+    assert fake.requests == 4
+    assert again._bytes == 8000
+
+
+async def test_rejects_what_is_not_a_usable_image(fake, cache, monkeypatch):
+    fake.images["page.html"] = (b"<html></html>", "text/html")
+    with pytest.raises(ImageError, match="Not an image: text/html"):
+        await cache.get(f"{fake.url}/images/page.html")
+
+    monkeypatch.setattr(settings, "IMAGE_MAX_BYTES", 100)
+    with pytest.raises(ImageError, match="larger than 100 bytes"):
+        await cache.get(f"{fake.url}/images/batman.png")
+
+    assert files(cache, "blobs") == files(cache, "tmp") == []
+
+
+async def test_thumbnails_are_made_from_the_cached_original(fake, cache):
+    Image = pytest.importorskip("PIL.Image")
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 32), "red").save(buffer, format="JPEG")
+    fake.images["big.jpg"] = (buffer.getvalue(), "image/jpeg")
+    url = f"{fake.url}/images/big.jpg"
+
+    thumb = await cache.get(url, "thumb")
+
+    with Image.open(thumb.path) as image:
+        assert image.size == (16, 8)
+        assert image.format == "JPEG"
+    assert thumb.media_type == "image/jpeg"
+    assert (await cache.get(url, "thumb")) == thumb
+    assert fake.requests == 1
+
+
+async def test_an_original_that_cannot_be_decoded_is_an_image_error(fake, cache, db):
+    pytest.importorskip("PIL.Image")
+    url = f"{fake.url}/images/batman.png"
+
+    with pytest.raises(ImageError, match="Cannot resize image"):
+        await cache.get(url, "thumb")
+
+    db.execute.return_value.first.return_value = SimpleNamespace(image_url=url)
+    with pytest.raises(HTTPException) as exc_info:
+        await hero_image(hero_id=1, size="thumb", db=db)
+    assert exc_info.value.status_code == 502
+    assert files(cache, "tmp") == []
+
+
+async def test_prefetch_warms_the_cache_for_new_heroes(fake, cache, monkeypatch):
+    url = f"{fake.url}/images/batman.png"
+    db = SimpleNamespace()
+
+    async def scalars(statement):
+        return SimpleNamespace(all=lambda: [url, None])
+
+    db.scalars = scalars
+
+    class Session:
+        async def __aenter__(self):
+            return db
+
+        async def __aexit__(self, *exc_info):
+            pass
+
+    monkeypatch.setattr("src.app._images.SessionFactory", Session)
+    monkeypatch.setattr(settings, "IMAGE_PREFETCH_SIZES", ["original"])
+
+    cache.prefetch([1])
+    await asyncio.gather(*cache._prefetches)
+
+    assert fake.requests == 1
+    await cache.get(url)
+    assert fake.requests == 1
+
+
+async def test_hero_image_serves_with_etag_and_revalidates(fake, cache, db):
+    db.execute.return_value.first.return_value = SimpleNamespace(
+        image_url=f"{fake.url}/images/batman.png"
+    )
+
+    response = await hero_image(hero_id=1, db=db)
+
+    etag = f'"{hashlib.sha256(PNG).hexdigest()}"'
+    assert isinstance(response, StreamingResponse)
+    assert response.media_type == "image/png"
+    assert response.headers["content-length"] == str(len(PNG))
+    assert b"".join([chunk async for chunk in response.body_iterator]) == PNG
+    assert response.headers["etag"] == etag
+    assert response.headers["cache-control"] == (
+        f"public, max-age={settings.IMAGE_MAX_AGE}"
+    )
+
+    response = await hero_image(hero_id=1, if_none_match=f'W/"x", {etag}', db=db)
+
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+
+
+async def test_hero_image_errors(fake, cache, db):
+    with pytest.raises(HTTPException) as exc_info:
+        await hero_image(hero_id=1, size="huge", db=db)
+    assert exc_info.value.status_code == 400
+
+    db.execute.return_value.first.return_value = None
+    with pytest.raises(HTTPException) as exc_info:
+        await hero_image(hero_id=1, db=db)
+    assert exc_info.value.status_code == 404
+
+    db.execute.return_value.first.return_value = SimpleNamespace(image_url="")
+    with pytest.raises(HTTPException) as exc_info:
+        await hero_image(hero_id=1, db=db)
+    assert exc_info.value.status_code == 404
+
+    db.execute.return_value.first.return_value = SimpleNamespace(
+        image_url=f"{fake.url}/images/missing.png"
+    )
+    with pytest.raises(HTTPException) as exc_info:
+        await hero_image(hero_id=1, db=db)
+    assert exc_info.value.status_code == 502
@@ -0,0 +1,116 @@
+import json
+import asyncio
+
+import pytest
+
+from src.config.settings import settings
+from src.app import _lifecycle
+from src.app._cache import hero_list_cache
+from src.app.routers import healthz, readyz
+
+
+class FakeConnection:
+    def __init__(self, engine):
+        self.engine = engine
+
+    async def __aenter__(self):
+        if self.engine.error is not None:
+            raise self.engine.error
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    async def execute(self, statement):
+        await asyncio.sleep(self.engine.delay)
+
+    async def scalar(self, statement):
+        return self.engine.version
+
+
+class FakeEngine:
+    def __init__(self, error=None, delay=0.0):
+        self.error = error
+        self.delay = delay
+        self.connects = 0
+        self.disposed = False
+        self.version = 1
+
+    def connect(self):
+        self.connects += 1
+        return FakeConnection(self)
+
+    async def dispose(self):
+        self.disposed = True
+
+
+@pytest.fixture
+async def engine(monkeypatch):
+    engine = FakeEngine()
+    monkeypatch.setattr(_lifecycle, "engine", engine)
+    monkeypatch.setattr(_lifecycle, "_ready", False)
+    monkeypatch.setattr(_lifecycle, "_version_watch", None)
+    yield engine
+    if _lifecycle._version_watch is not None:
+        _lifecycle._version_watch.cancel()
+
+
+async def test_not_ready_until_started(engine):
+    before = await readyz()
+    await _lifecycle.startup()
+    after = await readyz()
+
+    assert before.status_code == 503
+    assert after == {"status": "ready", "db": "ok"}
+    # warm-up connections, then the readiness check
+    assert engine.connects == settings.DB_POOL_WARMUP + 1
+
+
+async def test_database_outage_fails_readiness_not_liveness(engine):
+    await _lifecycle.startup()
+    engine.error = ConnectionRefusedError("db down")
+
+    ready = await readyz()
+    health = await healthz()
+
+    assert ready.status_code == 503
+    assert json.loads(ready.body)["db"] == "ConnectionRefusedError: db down"
+    assert health == {"status": "ok", "db": "ConnectionRefusedError: db down"}
+
+
+async def test_startup_survives_database_outage(engine):
+    engine.error = ConnectionRefusedError("db down")
+
+    await _lifecycle.startup()
+
+    assert _lifecycle.is_ready()
+    assert (await readyz()).status_code == 503
+
+
+async def test_slow_database_times_out(engine, monkeypatch):
+    monkeypatch.setattr(settings, "DB_HEALTH_TIMEOUT", 0.01)
+    engine.delay = 1
+
+    assert await _lifecycle.check_db() == "timed out"
+
+
+async def test_shutdown_stops_readiness_and_disposes_pool(engine):
+    await _lifecycle.startup()
+
+    await _lifecycle.shutdown()
+
+    assert not _lifecycle.is_ready()
+    assert engine.disposed
+    assert (await readyz()).status_code == 503
+
+
+async def test_watches_for_writes_by_other_processes(engine, monkeypatch):
+    monkeypatch.setattr(settings, "RESPONSE_CACHE_VERSION_INTERVAL", 0.01)
+    await _lifecycle.startup()
+
+    engine.version = 5
+    await asyncio.sleep(0.05)
+    assert hero_list_cache.shared_version == 5
+
+    await _lifecycle.shutdown()
+    assert _lifecycle._version_watch is None
@@ -0,0 +1,109 @@
+import json
+import logging
+
+import httpx
+import pytest
+
+from fastapi import FastAPI
+
+from src.config.settings import settings
+from src.utils import custom_logger
+from src.utils.custom_logger import RequestContextMiddleware, flush, get_logger
+
+
+logger = get_logger("tests.logging")
+
+
+class Collect(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.setFormatter(custom_logger._formatter)
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(json.loads(self.format(record)))
+
+
+@pytest.fixture
+def lines(monkeypatch):
+    handler = Collect()
+    monkeypatch.setattr(custom_logger._listener, "handlers", (handler,))
+    yield handler.lines
+
+
+class Exploding:
+    def __str__(self):
+        raise AssertionError("formatted an event below the log level")
+
+
+def test_events_are_rendered_as_json_on_the_listener(lines):
+    logger.info("Hero %s created", "Batman", hero_id=70)
+    flush()
+
+    assert len(lines) == 1
+    assert lines[0]["event"] == "Hero Batman created"
+    assert lines[0]["hero_id"] == 70
+    assert lines[0]["level"] == "info"
+    assert lines[0]["logger"] == "tests.logging"
+    assert "timestamp" in lines[0]
+
+
+def test_filtered_events_are_never_formatted(lines):
+    logger.debug("API response data: %s", Exploding())
+    flush()
+
+    assert lines == []
+
+
+def test_exceptions_are_captured_in_the_calling_thread(lines):
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.error("Failed", exc_info=True)
+    flush()
+
+    assert "ValueError: boom" in lines[0]["exception"]
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(RequestContextMiddleware)
+
+    @app.get("/sampled")
+    async def sampled():
+        logger.info("sampled info")
+        logger.warning("sampled warning")
+        return {}
+
+    @app.get("/hero/{hero_id}")
+    async def read(hero_id: int):
+        logger.info("reading hero")
+        return {}
+
+    transport = httpx.ASGITransport(app=app)
+    return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+
+async def test_request_id_is_bound_and_returned(client, lines):
+    async with client:
+        generated = await client.get("/hero/1")
+        given = await client.get("/hero/2", headers={"X-Request-ID": "abc-123"})
+    flush()
+
+    assert given.headers["X-Request-ID"] == "abc-123"
+    assert [line["request_id"] for line in lines] == [
+        generated.headers["X-Request-ID"],
+        "abc-123",
+    ]
+
+
+async def test_sampled_routes_drop_info_but_keep_warnings(client, lines, monkeypatch):
+    monkeypatch.setattr(settings, "LOG_SAMPLE_RATES", {"/sampled": 0.0})
+
+    async with client:
+        await client.get("/sampled")
+        await client.get("/hero/1")
+    flush()
+
+    assert [line["event"] for line in lines] == ["sampled warning", "reading hero"]
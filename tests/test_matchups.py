@@ -0,0 +1,161 @@
+import json
+import math
+
+import numpy as np
+import pytest
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+from conftest import hero
+
+from src.app import _matchups
+from src.app._matchups import score_blocks, top_matchups, weight_vector
+from src.app.routers import hero_matchups
+from src.config.settings import settings
+from src.helpers.models import HeroMatchups
+
+EVEN_WEIGHTS = dict(intelligence=1, strength=1, speed=1, power=1)
+EVEN = weight_vector(EVEN_WEIGHTS)
+
+
+def brute_force_score(a, b, weights, scale):
+    total = sum(weights.values())
+    return sum(
+        weights[stat] / total / (1 + math.exp(-(a[i] - b[i]) / scale))
+        for i, stat in enumerate(("intelligence", "strength", "speed", "power"))
+    )
+
+
+ROWS = [
+    hero(1, (50, 50, 50, 50)),
+    hero(2, (60, 50, 50, 50)),
+    hero(3, (80, 80, 80, 80), publisher="DC Comics"),
+    hero(4, (10, 10, 10, 10), publisher="DC Comics"),
+    hero(5, (50, None, 50, 50), publisher="DC Comics"),
+]
+
+pytestmark = pytest.mark.usefixtures("columns")
+
+
+def test_score_blocks_match_the_formula(monkeypatch):
+    monkeypatch.setattr(_matchups, "MATCHUP_BLOCK", 50)
+    rng = np.random.default_rng(3)
+    left, right = rng.uniform(0, 100, (23, 4)), rng.uniform(0, 100, (7, 4))
+    weights = dict(intelligence=1, strength=3, speed=0, power=2)
+
+    blocks = list(score_blocks(left, right, weight_vector(weights), 10.0))
+
+    assert [start for start, _ in blocks] == [0, 7, 14, 21]
+    scores = np.concatenate([block for _, block in blocks])
+    expected = [[brute_force_score(a, b, weights, 10.0) for b in right] for a in left]
+    np.testing.assert_allclose(scores, expected, atol=1e-6)
+
+
+def test_top_matchups_matches_a_full_sort(monkeypatch):
+    monkeypatch.setattr(_matchups, "MATCHUP_BLOCK", 500)
+    rng = np.random.default_rng(5)
+    left = rng.integers(0, 100, (120, 4)).astype(float)
+    right = rng.integers(0, 100, (90, 4)).astype(float)
+    left_ids, right_ids = np.arange(120), np.arange(60, 150)
+
+    found = top_matchups(left_ids, left, right_ids, right, EVEN, 10.0, 25)
+
+    scores = np.concatenate([b for _, b in score_blocks(left, right, EVEN, 10.0)])
+    pairs = sorted(
+        (-scores[i, j], left_ids[i], right_ids[j])
+        for i in range(120)
+        for j in range(90)
+        if left_ids[i] != right_ids[j]
+    )[:25]
+    assert [(l, r) for l, r, _ in found] == [(l, r) for _, l, r in pairs]
+    assert [s for _, _, s in found] == pytest.approx([-s for s, _, _ in pairs])
+
+
+async def test_hero_matchups_top_pairs(db):
+    payload = HeroMatchups(left={"ids": [3, 1]}, right={"ids": [1, 4]}, top=3)
+
+    result = await hero_matchups(payload, db=db)
+
+    assert [(m["left"], m["right"]) for m in result] == [(3, 4), (1, 4), (3, 1)]
+    assert result[0]["score"] > result[1]["score"] > result[2]["score"] > 0.5
+    db.execute.assert_not_called()
+
+
+async def test_hero_matchups_weights(db):
+    payload = HeroMatchups(
+        left={"ids": [2]},
+        right={"ids": [1]},
+        weights={"intelligence": 0, "strength": 1, "speed": 1, "power": 1},
+    )
+
+    (result,) = await hero_matchups(payload, db=db)
+
+    assert result["score"] == 0.5
+
+
+async def test_hero_matchups_filters_skip_incomplete_heroes(db):
+    payload = HeroMatchups(
+        left={"filters": {"publisher": {"eq": "DC Comics"}}},
+        right={"filters": {"publisher": {"eq": "DC Comics"}}},
+    )
+
+    result = await hero_matchups(payload, db=db)
+
+    assert [(m["left"], m["right"]) for m in result] == [(3, 4), (4, 3)]
+    assert result[0]["score"] + result[1]["score"] == pytest.approx(1)
+
+
+async def test_hero_matchups_streams_the_matrix(db):
+    payload = HeroMatchups(left={"ids": [1, 2]}, right={"filters": {}}, output="matrix")
+
+    response = await hero_matchups(payload, db=db)
+    body = b"".join([chunk async for chunk in response.body_iterator])
+
+    lines = [json.loads(line) for line in body.decode().splitlines()]
+    assert response.media_type == "application/x-ndjson"
+    assert lines[0] == {"right": [1, 2, 3, 4]}
+    assert [line["left"] for line in lines[1:]] == [1, 2]
+    assert lines[1]["scores"][0] == 0.5
+    expected = brute_force_score((60, 50, 50, 50), (50, 50, 50, 50), EVEN_WEIGHTS, 10)
+    assert lines[2]["scores"][0] == round(expected, 4)
+
+
+async def test_hero_matchups_errors(db, monkeypatch):
+    with pytest.raises(HTTPException) as exc_info:
+        await hero_matchups(
+            HeroMatchups(left={"ids": [1, 99]}, right={"ids": [2]}), db=db
+        )
+    assert exc_info.value.status_code == 404
+
+    with pytest.raises(HTTPException) as exc_info:
+        await hero_matchups(HeroMatchups(left={"ids": [5]}, right={"ids": [2]}), db=db)
+    assert exc_info.value.status_code == 400
+
+    with pytest.raises(HTTPException) as exc_info:
+        payload = HeroMatchups(left={"filters": {"nope": 1}}, right={"ids": [2]})
+        await hero_matchups(payload, db=db)
+    assert exc_info.value.status_code == 400
+
+    monkeypatch.setattr(settings, "MATCHUP_MAX_PAIRS", 3)
+    with pytest.raises(HTTPException) as exc_info:
+        payload = HeroMatchups(left={"ids": [1, 2]}, right={"ids": [3, 4]})
+        await hero_matchups(payload, db=db)
+    assert exc_info.value.status_code == 400
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        {"left": {"ids": [1], "filters": {}}, "right": {"ids": [2]}},
+        {"left": {}, "right": {"ids": [2]}},
+        {
+            "left": {"ids": [1]},
+            "right": {"ids": [2]},
+            "weights": {"intelligence": 0, "strength": 0, "speed": 0, "power": 0},
+        },
+    ],
+)
+def test_hero_matchups_payload_validation(payload):
+    with pytest.raises(ValidationError):
+        HeroMatchups(**payload)
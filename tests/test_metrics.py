@@ -0,0 +1,101 @@
+import httpx
+import pytest
+
+from fastapi import FastAPI
+from unittest.mock import MagicMock
+from prometheus_client import CollectorRegistry, REGISTRY
+
+from src.app._metrics import (
+    CircuitCollector,
+    MetricsMiddleware,
+    PoolCollector,
+    metrics_registry,
+    stage_timer,
+)
+from src.app._resilience import upstream
+
+
+def latency_count(**labels):
+    return (
+        REGISTRY.get_sample_value(
+            "superhero_http_request_duration_seconds_count", labels
+        )
+        or 0
+    )
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/hero/{hero_id}")
+    async def read(hero_id: int):
+        return {"id": hero_id}
+
+    transport = httpx.ASGITransport(app=app)
+    return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+
+async def test_requests_are_labelled_with_route_template(client):
+    labels = dict(route="/hero/{hero_id}", method="GET", status="200")
+    before = latency_count(**labels)
+
+    async with client:
+        await client.get("/hero/1")
+        await client.get("/hero/2")
+
+    assert latency_count(**labels) == before + 2
+
+
+async def test_unmatched_requests_share_one_series(client):
+    labels = dict(route="other", method="GET", status="404")
+    before = latency_count(**labels)
+
+    async with client:
+        await client.get("/nope/1")
+        await client.get("/nope/2")
+
+    assert latency_count(**labels) == before + 2
+
+
+def test_stage_timer_records_duration():
+    labels = {"stage": "test.stage"}
+    before = (
+        REGISTRY.get_sample_value("superhero_stage_duration_seconds_count", labels) or 0
+    )
+
+    with stage_timer("test.stage"):
+        pass
+
+    count = REGISTRY.get_sample_value("superhero_stage_duration_seconds_count", labels)
+    assert count == before + 1
+
+
+def test_pool_collector_reads_pool_at_scrape_time():
+    pool = MagicMock()
+    pool.size.return_value = 10
+    pool.checkedout.return_value = 3
+    pool.checkedin.return_value = 7
+    pool.overflow.return_value = -7
+    registry = CollectorRegistry()
+    registry.register(PoolCollector(pool))
+
+    assert registry.get_sample_value("superhero_db_pool_size") == 10
+    assert registry.get_sample_value("superhero_db_pool_checked_out") == 3
+
+    pool.checkedout.return_value = 5
+    assert registry.get_sample_value("superhero_db_pool_checked_out") == 5
+
+
+def test_metrics_registry_merges_workers_in_multiprocess_mode(tmp_path, monkeypatch):
+    assert metrics_registry() is REGISTRY
+
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    registry = metrics_registry()
+
+    assert registry is not REGISTRY
+    # live collectors still report this process
+    assert registry.get_sample_value("superhero_upstream_circuit_state") == (
+        CircuitCollector.STATES[upstream.breaker.state]
+    )
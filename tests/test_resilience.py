@@ -0,0 +1,208 @@
+import httpx
+import pytest
+
+from fastapi import HTTPException
+from unittest.mock import MagicMock
+from prometheus_client import REGISTRY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config.settings import settings
+from src.app._helpers import _call_api_method, Endpoint
+from src.app._upstream import close_upstream_client
+from src.app._resilience import (
+    CircuitBreaker,
+    ResilientUpstream,
+    TokenBucket,
+    UpstreamUnavailable,
+)
+from src.app.routers import create_hero
+from src.helpers.models import HeroCreate
+from tests.fake_upstream import FakeUpstream
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_upstream(**overrides):
+    options = dict(
+        limiter=TokenBucket(rate=0, burst=1, max_wait=0),
+        breaker=CircuitBreaker(failure_threshold=100, reset_timeout=30),
+        attempts=3,
+        backoff=0.001,
+        max_backoff=0.001,
+        deadline=5,
+    )
+    options.update(overrides)
+    return ResilientUpstream(**options)
+
+
+@pytest.fixture
+async def fake(monkeypatch):
+    async with FakeUpstream() as fake:
+        monkeypatch.setattr(settings, "API_HERO", fake.url)
+        yield fake
+    await close_upstream_client()
+
+
+def use(monkeypatch, upstream):
+    monkeypatch.setattr("src.app._helpers.upstream", upstream)
+    return upstream
+
+
+def test_token_bucket_spreads_calls_over_time():
+    clock = Clock()
+    bucket = TokenBucket(rate=10, burst=2, max_wait=0.5, clock=clock)
+
+    assert [bucket.reserve() for _ in range(2)] == [0, 0]
+    assert bucket.reserve() == pytest.approx(0.1)
+    assert bucket.reserve() == pytest.approx(0.2)
+
+    clock.now += 0.3
+    assert bucket.reserve() == pytest.approx(0.0)
+
+
+def test_token_bucket_refuses_waits_over_the_limit():
+    bucket = TokenBucket(rate=1, burst=1, max_wait=0.5, clock=Clock())
+    bucket.reserve()
+
+    with pytest.raises(UpstreamUnavailable) as exc_info:
+        bucket.reserve()
+
+    assert exc_info.value.retry_after == pytest.approx(1.0)
+
+
+def test_circuit_breaker_opens_probes_and_closes():
+    clock = Clock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(UpstreamUnavailable) as exc_info:
+        breaker.before_call()
+    assert exc_info.value.retry_after == 10
+
+    clock.now += 10
+    assert breaker.state == "half_open"
+    breaker.before_call()
+    with pytest.raises(UpstreamUnavailable):
+        breaker.before_call()  # only one probe at a time
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    clock.now += 10
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+async def test_retries_transient_errors_until_success(fake, monkeypatch):
+    use(monkeypatch, make_upstream())
+    fake.fail_with(503, 502)
+    retries = REGISTRY.get_sample_value("superhero_upstream_retries_total")
+
+    response = await _call_api_method(Endpoint.ID, hero_id=70, use_cache=False)
+
+    assert response.status_code == 200
+    assert response.json()["name"] == "Batman"
+    assert fake.requests == 3
+    assert REGISTRY.get_sample_value("superhero_upstream_retries_total") == retries + 2
+
+
+async def test_returns_last_response_when_retries_run_out(fake, monkeypatch):
+    use(monkeypatch, make_upstream(attempts=2))
+    fake.fail_with(503, 503, 503)
+
+    response = await _call_api_method(Endpoint.ID, hero_id=70, use_cache=False)
+
+    assert response.status_code == 503
+    assert fake.requests == 2
+
+
+async def test_does_not_retry_client_errors(fake, monkeypatch):
+    use(monkeypatch, make_upstream())
+    fake.fail_with(404)
+
+    response = await _call_api_method(Endpoint.ID, hero_id=70, use_cache=False)
+
+    assert response.status_code == 404
+    assert fake.requests == 1
+
+
+async def test_retries_read_timeouts(fake, monkeypatch):
+    monkeypatch.setattr(settings, "API_READ_TIMEOUT", 0.05)
+    await close_upstream_client()
+    use(monkeypatch, make_upstream(attempts=2))
+    fake.latency = 0.2
+
+    with pytest.raises(httpx.ReadTimeout):
+        await _call_api_method(Endpoint.ID, hero_id=70, use_cache=False)
+
+    assert fake.requests == 2
+
+
+async def test_open_circuit_fails_fast_without_calling_upstream(fake, monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    use(monkeypatch, make_upstream(breaker=breaker, attempts=5))
+    fake.fail_with(500, 500, 500)
+
+    with pytest.raises(UpstreamUnavailable):
+        await _call_api_method(Endpoint.ID, hero_id=70, use_cache=False)
+    assert fake.requests == 2
+
+    with pytest.raises(UpstreamUnavailable):
+        await _call_api_method(Endpoint.ID, hero_id=70, use_cache=False)
+    assert fake.requests == 2
+
+
+async def test_full_connection_pool_is_backpressure_not_an_upstream_failure(
+    fake, monkeypatch
+):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    use(monkeypatch, make_upstream(breaker=breaker))
+    client = MagicMock(spec=httpx.AsyncClient)
+    client.get.side_effect = httpx.PoolTimeout("no free connection")
+    monkeypatch.setattr("src.app._resilience.get_upstream_client", lambda: client)
+
+    with pytest.raises(UpstreamUnavailable) as exc_info:
+        await _call_api_method(Endpoint.ID, hero_id=70, use_cache=False)
+
+    assert exc_info.value.retry_after == settings.API_POOL_TIMEOUT
+    assert isinstance(exc_info.value.__cause__, httpx.PoolTimeout)
+    assert client.get.call_count == 1
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failures == 0
+
+
+async def test_create_hero_maps_open_circuit_to_503(fake, monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    use(monkeypatch, make_upstream(breaker=breaker))
+    db = MagicMock(spec=AsyncSession)
+    db.scalar.return_value = None
+
+    with pytest.raises(HTTPException) as exc_info:
+        await create_hero(HeroCreate(name="Superman"), db=db)
+
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.headers["Retry-After"] == "30"
+    assert fake.requests == 0
+
+
+async def test_create_hero_maps_upstream_5xx_to_502(fake, monkeypatch):
+    use(monkeypatch, make_upstream(attempts=1))
+    fake.fail_with(500)
+    db = MagicMock(spec=AsyncSession)
+    db.scalar.return_value = None
+
+    with pytest.raises(HTTPException) as exc_info:
+        await create_hero(HeroCreate(name="Flash"), db=db)
+
+    assert exc_info.value.status_code == 502
@@ -0,0 +1,57 @@
+import pytest
+
+from collections import namedtuple
+from fastapi import HTTPException
+from sqlalchemy.dialects import postgresql
+
+from src.app._search import search_query
+from src.app.routers import search_heroes
+
+
+Row = namedtuple("Row", ["id", "name", "full_name", "score"])
+
+
+def sql(statement):
+    return str(
+        statement.compile(
+            dialect=postgresql.dialect(paramstyle="named"),
+            compile_kwargs={"literal_binds": True},
+        )
+    )
+
+
+def test_search_query_uses_trigram_operators_and_prefix():
+    query = sql(search_query("Bat_man%", 5))
+
+    assert (
+        "WHERE (heroes.name %> 'Bat_man%') OR (heroes.full_name %> 'Bat_man%') "
+        "OR heroes.name ILIKE 'Bat/_man/%%' ESCAPE '/' "
+        "ORDER BY score DESC, heroes.id"
+    ) in query
+    assert "word_similarity('Bat_man%', heroes.name)" in query
+    assert query.endswith("LIMIT 5")
+
+
+@pytest.mark.asyncio
+async def test_search_heroes_returns_ranked_rows(db):
+    db.execute.return_value.all.return_value = [
+        Row(1, "Batman", "Bruce Wayne", 1.8333333),
+        Row(2, "Batgirl", "Barbara Gordon", 1.5),
+    ]
+
+    result = await search_heroes(q="  batm ", limit=2, db=db)
+
+    assert result == [
+        {"id": 1, "name": "Batman", "full_name": "Bruce Wayne", "score": 1.833},
+        {"id": 2, "name": "Batgirl", "full_name": "Barbara Gordon", "score": 1.5},
+    ]
+    assert "heroes.name ILIKE 'batm%'" in sql(db.execute.call_args[0][0])
+
+
+@pytest.mark.asyncio
+async def test_search_heroes_rejects_blank_query(db):
+    with pytest.raises(HTTPException) as exc_info:
+        await search_heroes(q="   ", db=db)
+
+    assert exc_info.value.status_code == 400
+    db.execute.assert_not_called()
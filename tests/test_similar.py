@@ -0,0 +1,70 @@
+import pytest
+
+from fastapi import HTTPException
+
+from conftest import hero
+
+from src.app.routers import similar_heroes, similar_heroes_batch
+from src.helpers.models import HeroSimilarBatch
+
+
+ROWS = [
+    hero(1, (50, 50, 50, 50)),
+    hero(2, (51, 50, 50, 50)),
+    hero(3, (50, 53, 54, 50), publisher="DC Comics"),
+    hero(4, (90, 90, 90, 90), alignment="bad"),
+    hero(5, (50, None, 50, 50)),
+]
+
+pytestmark = pytest.mark.usefixtures("columns")
+
+
+async def test_similar_heroes_nearest_first(db):
+    result = await similar_heroes(hero_id=1, k=3, db=db)
+
+    assert [(h["id"], h["distance"]) for h in result] == [(2, 1.0), (3, 5.0), (4, 80.0)]
+    assert result[0]["name"] == "Hero 2"
+    db.execute.assert_not_called()
+
+
+async def test_similar_heroes_prefilters(db):
+    result = await similar_heroes(hero_id=1, publisher="DC Comics", db=db)
+
+    assert [h["id"] for h in result] == [3]
+
+    result = await similar_heroes(hero_id=1, alignment="bad", db=db)
+
+    assert [h["id"] for h in result] == [4]
+
+
+async def test_similar_heroes_unknown_hero(db):
+    with pytest.raises(HTTPException) as exc_info:
+        await similar_heroes(hero_id=99, db=db)
+
+    assert exc_info.value.status_code == 404
+
+
+async def test_similar_heroes_needs_all_powerstats(db):
+    with pytest.raises(HTTPException) as exc_info:
+        await similar_heroes(hero_id=5, db=db)
+
+    assert exc_info.value.status_code == 400
+
+
+async def test_similar_heroes_batch_keeps_request_order(db):
+    payload = HeroSimilarBatch(ids=[4, 1], k=1)
+
+    result = await similar_heroes_batch(payload, db=db)
+
+    assert [(r["id"], [h["id"] for h in r["similar"]]) for r in result] == [
+        (4, [3]),
+        (1, [2]),
+    ]
+
+
+async def test_similar_heroes_batch_reports_missing_ids(db):
+    with pytest.raises(HTTPException) as exc_info:
+        await similar_heroes_batch(HeroSimilarBatch(ids=[1, 98, 99]), db=db)
+
+    assert exc_info.value.status_code == 404
+    assert exc_info.value.detail == "Heroes not found: 98, 99"
@@ -0,0 +1,144 @@
+import os
+import gzip
+import hashlib
+
+import httpx
+import pytest
+
+from fastapi import FastAPI
+from starlette.datastructures import Headers
+from starlette.templating import Jinja2Templates
+
+from src.config.settings import settings
+from src.app._static import Asset, PrecompressedStaticFiles, PrerenderedPage
+
+CSS = b"body { color: red; }\n" * 50
+
+
+@pytest.fixture
+def directory(tmp_path):
+    (tmp_path / "style.css").write_bytes(CSS)
+    (tmp_path / "big.txt").write_bytes(b"x" * 2000)
+    (tmp_path / "index.html").write_text(
+        "<link href=\"{{ static_url('style.css') }}\">" + "<p>hero</p>" * 100
+    )
+    return tmp_path
+
+
+@pytest.fixture
+def static(directory):
+    return PrecompressedStaticFiles(directory=str(directory))
+
+
+@pytest.fixture
+def client(static):
+    app = FastAPI()
+    app.mount("/static", static)
+    transport = httpx.ASGITransport(app=app)
+    return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+
+@pytest.fixture
+def page(directory, static):
+    templates = Jinja2Templates(directory=str(directory))
+    return PrerenderedPage(templates, "index.html", static, "/static")
+
+
+def touch(path, content):
+    # a different size, so the change shows even within the mtime resolution
+    path.write_bytes(content)
+    os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 10**9))
+
+
+def test_asset_precompresses_and_tags_each_variant():
+    asset = Asset(CSS, "text/css")
+
+    assert gzip.decompress(asset.variants["gzip"]) == CSS
+    assert asset.etag(None) == f'"{hashlib.sha256(CSS).hexdigest()}"'
+    assert asset.etag("gzip") == f'"{hashlib.sha256(CSS).hexdigest()}-gzip"'
+    assert list(Asset(b"x", "text/plain").variants) == [None]
+
+
+def test_asset_response_negotiates_and_revalidates():
+    asset = Asset(CSS, "text/css")
+
+    response = asset.response(Headers({"accept-encoding": "gzip, deflate"}))
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == asset.etag("gzip")
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.body == asset.variants["gzip"]
+
+    response = asset.response(Headers({}))
+    assert "content-encoding" not in response.headers
+    assert response.body == CSS
+
+    # a tag for another encoding still means the client has the content
+    response = asset.response(
+        Headers({"accept-encoding": "gzip", "if-none-match": asset.etag(None)})
+    )
+    assert response.status_code == 304
+    assert response.headers["etag"] == asset.etag("gzip")
+
+
+async def test_static_files_are_cached_forever_only_when_versioned(client, static):
+    url = static.url("/static", "style.css")
+    version = url.rpartition("=")[2]
+    assert url == f"/static/style.css?v={version}"
+
+    async with client:
+        versioned = await client.get(url, headers={"Accept-Encoding": "gzip"})
+        stale = await client.get("/static/style.css?v=old")
+        bare = await client.get("/static/style.css")
+        again = await client.get(
+            "/static/style.css", headers={"If-None-Match": bare.headers["etag"]}
+        )
+
+    assert versioned.headers["content-encoding"] == "gzip"
+    assert versioned.headers["content-type"] == "text/css; charset=utf-8"
+    assert versioned.content == CSS
+    assert versioned.headers["cache-control"] == (
+        f"public, max-age={settings.STATIC_MAX_AGE}, immutable"
+    )
+    assert stale.headers["cache-control"] == bare.headers["cache-control"]
+    assert bare.headers["cache-control"] == "no-cache"
+    assert again.status_code == 304
+
+
+async def test_large_static_files_are_streamed_as_before(client, monkeypatch):
+    monkeypatch.setattr(settings, "STATIC_INLINE_MAX_BYTES", 1000)
+
+    async with client:
+        response = await client.get("/static/big.txt")
+        missing = await client.get("/static/nope.css")
+
+    assert response.content == b"x" * 2000
+    assert "vary" not in response.headers
+    assert missing.status_code == 404
+
+
+async def test_page_is_rendered_once_with_versioned_links(page, directory):
+    response = await page.response(Headers({"accept-encoding": "gzip"}))
+    html = gzip.decompress(response.body).decode()
+    assert f'href="{page.static.url("/static", "style.css")}"' in html
+    assert response.headers["cache-control"] == "no-cache"
+
+    rendered = page._asset
+    await page.response(Headers({}))
+    assert page._asset is rendered
+
+    # a new stylesheet changes the link, so browsers fetch it
+    touch(directory / "style.css", CSS + b"p { margin: 0; }\n")
+    response = await page.response(Headers({}))
+    assert page._asset is not rendered
+    assert page.static.url("/static", "style.css") in response.body.decode()
+    assert page.static.url("/static", "style.css") not in html
+
+
+async def test_page_is_rendered_again_when_the_template_changes(page, directory):
+    await page.response(Headers({}))
+
+    touch(directory / "index.html", b"<p>villain</p>")
+    response = await page.response(Headers({}))
+
+    assert response.body == b"<p>villain</p>"
+    assert response.headers["etag"] == page._asset.etag(None)
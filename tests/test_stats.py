@@ -0,0 +1,147 @@
+import pytest
+
+from unittest.mock import MagicMock
+from sqlalchemy import create_engine, insert
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.models import Hero, HeroStatsSummary
+from src.app._stats import (
+    POWERSTATS,
+    _publisher_averages_live,
+    _publisher_averages_summary,
+    hero_stats,
+)
+
+
+def row(**values):
+    result = MagicMock(**values)
+    result._asdict.return_value = values
+    return result
+
+
+def compiled(statement):
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+@pytest.fixture
+def stats_db():
+    db = MagicMock(spec=AsyncSession)
+    averages = [
+        row(
+            publisher="DC Comics",
+            hero_count=2,
+            intelligence=90.0,
+            strength=80.0,
+            speed=70.0,
+            power=100.0,
+        )
+    ]
+    percentiles = [
+        row(
+            publisher="DC Comics",
+            intelligence=[90.0, 95.0, 99.0],
+            strength=[80.0, 85.0, 89.0],
+            speed=[70.0, 75.0, 79.0],
+            power=None,
+        )
+    ]
+    alignments = [row(alignment="good", hero_count=2)]
+    top = [row(id=1, name="Superman", publisher="DC Comics", power=100.0)]
+
+    def execute(statement):
+        sql = compiled(statement)
+        if "percentile_cont" in sql:
+            return percentiles
+        if "alignment" in sql:
+            return alignments
+        if "ORDER BY heroes.power DESC" in sql:
+            return top
+        return averages
+
+    db.execute.side_effect = execute
+    return db
+
+
+@pytest.mark.asyncio
+async def test_hero_stats_reads_summary_table(stats_db):
+    result = await hero_stats(stats_db, top=5, percentiles=False, use_summary=True)
+
+    statements = [compiled(call.args[0]) for call in stats_db.execute.call_args_list]
+    assert len(statements) == 3
+    assert "FROM hero_stats_summary" in statements[0]
+    assert "FROM hero_stats_summary" in statements[1]
+    assert "LIMIT %(param_1)s" in statements[2]
+    assert result == {
+        "publishers": [
+            {
+                "publisher": "DC Comics",
+                "count": 2,
+                "avg": {
+                    "intelligence": 90.0,
+                    "strength": 80.0,
+                    "speed": 70.0,
+                    "power": 100.0,
+                },
+            }
+        ],
+        "alignments": [{"alignment": "good", "count": 2}],
+        "top_power": [
+            {"id": 1, "name": "Superman", "publisher": "DC Comics", "power": 100.0}
+        ],
+    }
+
+
+@pytest.mark.asyncio
+async def test_hero_stats_live_with_percentiles(stats_db):
+    result = await hero_stats(stats_db, top=5, percentiles=True, use_summary=False)
+
+    statements = [compiled(call.args[0]) for call in stats_db.execute.call_args_list]
+    assert all("hero_stats_summary" not in sql for sql in statements)
+    assert "WITHIN GROUP (ORDER BY heroes.power)" in statements[1]
+
+    percentiles = result["publishers"][0]["percentiles"]
+    assert percentiles["p90"]["intelligence"] == 95.0
+    assert percentiles["p99"]["speed"] == 79.0
+    assert percentiles["p50"]["power"] is None
+
+
+def test_summary_averages_skip_nulls_like_the_live_ones():
+    heroes = [
+        dict(zip(("id", "publisher", "alignment", "speed", "power"), values))
+        for values in [
+            (1, "DC", "good", 50.0, 90.0),
+            (2, "DC", "bad", None, None),
+            (3, "DC", "bad", 30.0, 60.0),
+            (4, None, None, 10.0, None),
+        ]
+    ]
+    for hero in heroes:
+        hero.update(name=f"Hero {hero['id']}", intelligence=None, strength=None)
+    # what the triggers keep in hero_stats_summary
+    summary = {}
+    for hero in heroes:
+        key = (hero["publisher"] or "", hero["alignment"] or "")
+        group = summary.setdefault(
+            key,
+            {"publisher": key[0], "alignment": key[1], "hero_count": 0}
+            | {f"sum_{stat}": 0.0 for stat in POWERSTATS}
+            | {f"count_{stat}": 0 for stat in POWERSTATS},
+        )
+        group["hero_count"] += 1
+        for stat in POWERSTATS:
+            if hero[stat] is not None:
+                group[f"sum_{stat}"] += hero[stat]
+                group[f"count_{stat}"] += 1
+    engine = create_engine("sqlite://")
+    Hero.__table__.create(engine)
+    HeroStatsSummary.__table__.create(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Hero.__table__), heroes)
+        conn.execute(insert(HeroStatsSummary.__table__), list(summary.values()))
+
+        live = conn.execute(_publisher_averages_live()).all()
+        from_summary = conn.execute(_publisher_averages_summary()).all()
+
+    assert from_summary == live
+    assert [(row.speed, row.power) for row in live] == [(10.0, None), (40.0, 75.0)]
@@ -0,0 +1,93 @@
+import httpx
+import pytest
+
+from unittest.mock import MagicMock, patch
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.models import SyncCheckpoint
+from src.app._sync import sync_catalog, _upsert
+
+
+def upstream(hero_id, catalog_size=5):
+    if hero_id > catalog_size:
+        return httpx.Response(200, json={"response": "error", "error": "invalid id"})
+    return httpx.Response(
+        200,
+        json={
+            "response": "success",
+            "id": str(hero_id),
+            "name": "Batman" if hero_id in (2, 3) else f"Hero {hero_id}",
+            "powerstats": {"power": "50"},
+        },
+    )
+
+
+@pytest.fixture
+def sync_db():
+    db = MagicMock(spec=AsyncSession)
+    db.checkpoint = SyncCheckpoint(job="catalog", last_id=0)
+    db.get.return_value = db.checkpoint
+    db.commits = []
+    db.commit.side_effect = lambda: db.commits.append(db.checkpoint.last_id)
+    return db
+
+
+@pytest.mark.asyncio
+async def test_sync_walks_ids_and_checkpoints_each_chunk(sync_db):
+    async def fake_call(endpoint, hero_id, use_cache):
+        return upstream(hero_id)
+
+    written = []
+
+    def fake_upsert(db, rows):
+        written.extend(row["upstream_id"] for row in rows)
+        return len(rows), 0
+
+    with patch("src.app._sync._call_api_method", side_effect=fake_call), patch(
+        "src.app._sync._upsert", side_effect=fake_upsert
+    ), patch("src.app._sync.settings.SYNC_STOP_AFTER_MISSES", 3):
+        stats = await sync_catalog(sync_db, chunk_size=3)
+
+    assert stats["completed"] is True
+    assert stats["inserted"] == 4
+    assert stats["missing"] == 4
+    # the second "Batman" (id 3) is dropped from its chunk
+    assert written == [1, 2, 4, 5]
+    assert sync_db.commits == [3, 6, 9, 0]
+
+
+@pytest.mark.asyncio
+async def test_sync_resumes_before_failed_id(sync_db):
+    sync_db.checkpoint.last_id = 2
+
+    async def fake_call(endpoint, hero_id, use_cache):
+        if hero_id == 4:
+            raise httpx.ConnectError("boom")
+        return upstream(hero_id)
+
+    with patch("src.app._sync._call_api_method", side_effect=fake_call) as api, patch(
+        "src.app._sync._upsert", return_value=(1, 0)
+    ):
+        stats = await sync_catalog(sync_db, chunk_size=3)
+
+    assert [call.kwargs["hero_id"] for call in api.await_args_list] == [3, 4, 5]
+    assert stats["completed"] is False
+    assert stats["errors"] == 1
+    assert sync_db.checkpoint.last_id == 3
+
+
+@pytest.mark.asyncio
+async def test_upsert_only_rewrites_changed_rows():
+    db = MagicMock(spec=AsyncSession)
+    db.execute.return_value = MagicMock()
+    db.execute.return_value.all.return_value = []
+
+    await _upsert(db, [{"name": "Batman", "upstream_id": 70, "power": 47.0}])
+
+    sql = str(db.execute.call_args[0][0].compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (name) DO UPDATE" in sql
+    assert "IS DISTINCT FROM" in sql
+    assert (
+        "heroes.upstream_id IS NULL OR heroes.upstream_id = excluded.upstream_id" in sql
+    )
@@ -1,12 +1,20 @@
 import json
+import httpx
+import asyncio
 import pytest
 
-from fastapi import HTTPException
+from fastapi import FastAPI, HTTPException
 from unittest.mock import MagicMock, patch
 
 from src.db.models import Hero
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.sql import operators
-from src.app.routers import create_hero, get_heroes
+from src.app.routers import create_hero, get_heroes, router
+from src.app._helpers import HERO_COLUMNS
+from src.app._cache import hero_list_cache
+from src.app._events import heroes_changed
+from src.app._singleflight import SingleFlight
+from src.helpers.models import HeroCreate, HeroCreated
 
 # for post -> /hero
 
@@ -82,9 +90,96 @@ async def test_create_hero_no_exact_match(mock_db, hero_data):
     assert "No exact match found" in exc_info.value.detail
 
 
+@pytest.mark.asyncio
+async def test_create_hero_upstream_timeout(mock_db, hero_data):
+    with patch(
+        "src.app.routers._call_api_method",
+        side_effect=httpx.ReadTimeout("timed out"),
+    ), pytest.raises(HTTPException) as exc_info:
+        await create_hero(hero_data, mock_db)
+
+    assert exc_info.value.status_code == 504
+    mock_db.add.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_create_hero_concurrent_same_name_single_flight(mock_db):
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_response.json.return_value = {
+        "response": "success",
+        "results": [{"name": "Superman", "powerstats": {}, "biography": {}}],
+    }
+
+    async def slow_search(*args, **kwargs):
+        await asyncio.sleep(0.05)
+        return mock_response
+
+    with patch("src.app.routers._call_api_method", side_effect=slow_search) as api_call:
+        results = await asyncio.gather(
+            *(
+                create_hero(HeroCreate(name=name), mock_db)
+                for name in ("Superman", "superman", "SUPERMAN", "Superman")
+            )
+        )
+
+    assert api_call.await_count == 1
+    mock_db.add.assert_called_once()
+    mock_db.commit.assert_called_once()
+    assert all(result is results[0] for result in results)
+    assert results[0]["hero"].name == "Superman"
+
+
+@pytest.mark.asyncio
+async def test_single_flight_survives_leader_cancellation():
+    flight = SingleFlight()
+    calls = []
+
+    async def work(caller):
+        calls.append(caller)
+        await asyncio.sleep(0.05)
+        return caller
+
+    leader = asyncio.create_task(flight.do("key", lambda: work("leader")))
+    await asyncio.sleep(0)
+    followers = [
+        asyncio.create_task(flight.do("key", lambda i=i: work(f"follower {i}")))
+        for i in range(3)
+    ]
+    await asyncio.sleep(0.01)
+    leader.cancel()
+
+    results = await asyncio.gather(*followers)
+
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    assert calls == ["leader", "follower 0"]
+    assert results == ["follower 0"] * 3
+    assert flight.in_flight() == 0
+
+
+@pytest.mark.asyncio
+async def test_create_hero_lost_insert_race(mock_db, hero_data):
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_response.json.return_value = {
+        "response": "success",
+        "results": [{"name": "Superman"}],
+    }
+    mock_db.commit.side_effect = IntegrityError("INSERT", {}, Exception("unique"))
+
+    with patch(
+        "src.app.routers._call_api_method", return_value=mock_response
+    ), pytest.raises(HTTPException) as exc_info:
+        await create_hero(hero_data, mock_db)
+
+    assert exc_info.value.status_code == 400
+    mock_db.rollback.assert_called_once()
+
+
 @pytest.mark.asyncio
 async def test_create_hero_duplicate(mock_db, hero_data):
-    mock_db.query.return_value.filter.return_value.first.return_value = MagicMock()
+    mock_db.scalar.return_value = MagicMock()
 
     with pytest.raises(HTTPException) as exc_info:
         await create_hero(hero_data, mock_db)
@@ -96,12 +191,24 @@ async def test_create_hero_duplicate(mock_db, hero_data):
 # for get -> /hero/
 
 
+def hero_row(**values):
+    """A row of `select(*HERO_COLUMNS)`, as the SQL read path gets it."""
+    return tuple(values.get(column.key) for column in HERO_COLUMNS)
+
+
+def hero_json(**values):
+    return {column.key: values.get(column.key) for column in HERO_COLUMNS}
+
+
+def executed_statement(db):
+    statement, *_ = db.execute.call_args[0]
+    return statement
+
+
 @pytest.mark.asyncio
 async def test_get_heroes_by_stats(db):
-    mock_hero = MagicMock()
-    db.query.return_value.filter.return_value.filter.return_value.filter.return_value.filter.return_value.all.return_value = [
-        mock_hero
-    ]
+    hero = hero_row(id=1, name="Vision", intelligence=90.0)
+    db.execute.return_value.all.return_value = [hero]
 
     filters = json.dumps(
         {
@@ -114,28 +221,193 @@ async def test_get_heroes_by_stats(db):
 
     result = await get_heroes(filters=filters, db=db)
 
-    assert result == [mock_hero]
-    assert db.query.return_value.filter.call_count == 4
+    assert json.loads(result.body) == [
+        hero_json(id=1, name="Vision", intelligence=90.0)
+    ]
+    (where,) = executed_statement(db)._where_criteria
+    assert where.operator == operators.and_
+    assert len(where.clauses) == 4
 
 
 @pytest.mark.asyncio
 async def test_get_heroes_by_name_and_stat(db):
     test_name = "Iron Man"
-    mock_hero = MagicMock()
-    db.query.return_value.filter.return_value.filter.return_value.all.return_value = [
-        mock_hero
-    ]
+    db.execute.return_value.all.return_value = [hero_row(id=1, name=test_name)]
 
     filters = json.dumps({"intelligence": {"gte": 90.0}})
     result = await get_heroes(name=test_name, filters=filters, db=db)
 
-    assert result == [mock_hero]
-    db.query.assert_called_once_with(Hero)
-    assert db.query.return_value.filter.call_count == 2
+    assert json.loads(result.body) == [hero_json(id=1, name=test_name)]
+    statement = executed_statement(db)
+    assert statement.column_descriptions[0]["entity"] is Hero
+    assert len(statement._where_criteria) == 2
+
+    first_filter, second_filter = statement._where_criteria
+    assert str(first_filter.left).lower() == "lower(heroes.name)"
+
+    assert str(second_filter.left) == "heroes.intelligence"
+    assert second_filter.operator == operators.ge
+
+
+@pytest.mark.asyncio
+async def test_get_heroes_keyset_page(db):
+    db.execute.return_value.all.return_value = [hero_row(id=i) for i in (11, 12, 13)]
+
+    result = await get_heroes(cursor=10, limit=2, db=db)
+
+    assert [hero["id"] for hero in json.loads(result.body)] == [11, 12]
+    assert result.headers["X-Next-Cursor"] == "12"
+    statement = executed_statement(db)
+    (cursor_filter,) = statement._where_criteria
+    assert str(cursor_filter) == "heroes.id > :id_1"
+    assert statement._limit == 3
 
-    first_filter_args, _ = db.query.return_value.filter.call_args_list[0]
-    assert str(first_filter_args[0].left).lower() == "lower(heroes.name)"
 
-    second_filter_args, _ = db.query.return_value.filter.call_args_list[1]
-    assert str(second_filter_args[0].left) == "heroes.intelligence"
-    assert second_filter_args[0].operator == operators.ge
+@pytest.mark.asyncio
+async def test_get_heroes_last_page_has_no_cursor(db):
+    db.execute.return_value.all.return_value = [hero_row(id=1)]
+
+    result = await get_heroes(db=db)
+
+    assert "X-Next-Cursor" not in result.headers
+
+
+@pytest.mark.asyncio
+async def test_get_heroes_projects_fields(db):
+    db.execute.return_value.all.return_value = [(1, 90.0)]
+
+    result = await get_heroes(fields="power,id", db=db)
+
+    assert json.loads(result.body) == [{"id": 1, "power": 90.0}]
+    assert [c["name"] for c in executed_statement(db).column_descriptions] == [
+        "id",
+        "power",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_get_heroes_rejects_unknown_fields(db):
+    with pytest.raises(HTTPException) as exc_info:
+        await get_heroes(fields="name,secret_identity", db=db)
+
+    assert exc_info.value.status_code == 400
+    assert "secret_identity" in exc_info.value.detail
+
+
+@pytest.mark.asyncio
+async def test_get_heroes_served_from_cache_for_equivalent_filters(db):
+    db.execute.return_value.all.return_value = [hero_row(id=1)]
+
+    first = await get_heroes(
+        name="Batman",
+        intelligence_gte=80,
+        filters=json.dumps({"power": {"gte": 90}, "speed": {"lte": 50.0}}),
+        db=db,
+    )
+    second = await get_heroes(
+        name="BATMAN",
+        filters=json.dumps(
+            {"speed": {"lte": 50}, "intelligence": {"gte": 80.0}, "power": {"gte": 90}}
+        ),
+        db=db,
+    )
+
+    assert db.execute.call_count == 1
+    assert second.body == first.body
+    assert second.headers["ETag"] == first.headers["ETag"]
+
+
+@pytest.mark.asyncio
+async def test_get_heroes_cache_invalidated_by_write(db):
+    db.execute.return_value.all.return_value = [hero_row(id=1)]
+    await get_heroes(db=db)
+
+    heroes_changed([2])
+    db.execute.return_value.all.return_value = [
+        hero_row(id=1),
+        hero_row(id=2),
+    ]
+    result = await get_heroes(db=db)
+
+    assert db.execute.call_count == 2
+    assert [hero["id"] for hero in json.loads(result.body)] == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_get_heroes_cache_invalidated_by_another_process(db):
+    db.execute.return_value.all.return_value = [hero_row(id=1)]
+    await get_heroes(db=db)
+    await get_heroes(db=db)
+
+    # e.g. sync-catalog wrote, seen by the background watch
+    hero_list_cache.observe(hero_list_cache.shared_version + 1)
+    db.execute.return_value.all.return_value = [hero_row(id=1), hero_row(id=2)]
+    result = await get_heroes(db=db)
+
+    assert db.execute.call_count == 2
+    assert [hero["id"] for hero in json.loads(result.body)] == [1, 2]
+    assert db.scalar.call_count == 0
+
+
+@pytest.mark.asyncio
+async def test_get_heroes_not_modified_for_matching_etag(db):
+    db.execute.return_value.all.return_value = [hero_row(id=1)]
+    etag = (await get_heroes(db=db)).headers["ETag"]
+
+    result = await get_heroes(if_none_match=f"W/{etag}", db=db)
+
+    assert result.status_code == 304
+    assert result.body == b""
+    assert result.headers["ETag"] == etag
+
+
+@pytest.mark.asyncio
+async def test_get_heroes_memory_engine_skips_sql(db, monkeypatch):
+    columns = MagicMock()
+    columns.select.return_value = ([{"id": 3, "power": 95.0}], None)
+
+    async def fake_columns(db):
+        return columns
+
+    monkeypatch.setattr("src.app.routers.settings.HERO_READ_ENGINE", "memory")
+    monkeypatch.setattr("src.app.routers.hero_index.columns", fake_columns)
+
+    result = await get_heroes(filters='{"power": {"gte": 90}}', fields="power", db=db)
+
+    assert json.loads(result.body) == [{"id": 3, "power": 95.0}]
+    # no round-trip to the database at all
+    assert db.method_calls == []
+    name, tree, cursor, limit, fields = columns.select.call_args[0]
+    assert tree == ("cmp", "power", "gte", 90.0)
+    assert fields == ["id", "power"]
+
+
+def test_openapi_documents_hero_models():
+    app = FastAPI()
+    app.include_router(router)
+    openapi = app.openapi()
+
+    def schema(path, method):
+        responses = openapi["paths"][path][method]["responses"]
+        return responses["200"]["content"]["application/json"]["schema"]
+
+    assert schema("/hero/", "get")["items"] == {"$ref": "#/components/schemas/HeroOut"}
+    assert schema("/hero", "post") == {"$ref": "#/components/schemas/HeroCreated"}
+    assert schema("/hero/search", "get")["items"] == {
+        "$ref": "#/components/schemas/HeroSearchResult"
+    }
+    assert openapi["components"]["schemas"]["HeroOut"]["required"] == ["id"]
+
+
+def test_hero_created_reads_orm_instances():
+    hero = Hero(id=1, name="Superman", power=100.0)
+
+    created = HeroCreated.model_validate(
+        {"message": "Hero successfully added", "hero": hero}
+    )
+
+    assert created.hero.model_dump(exclude_none=True) == {
+        "id": 1,
+        "name": "Superman",
+        "power": 100.0,
+    }